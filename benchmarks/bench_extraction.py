@@ -0,0 +1,90 @@
+# benchmarks/bench_extraction.py
+"""Benchmark: legacy BeautifulSoup extraction vs. the src/extraction.py backends.
+
+Builds a synthetic multi-megabyte page shaped like a Selenium page source (cookie banner, large nav menu,
+inline scripts/styles, a main-content block, sidebar and footer) and reports, per backend, the median
+extraction time and whether the returned text came from the main content or from page chrome.
+
+    python -m benchmarks.bench_extraction [--size-mb 3] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+from src.extraction import EXTRACTORS, extract_main_text
+
+CONTENT_MARKER = "Magnitude 6.1 earthquake"
+CHROME_MARKER = "Menu item"
+
+def legacy_extract(html_content: str, max_length: int = 1500) -> str:
+    """The pre-extraction-engine implementation of scraper.extract_text_from_html."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.decompose()
+    return soup.get_text(separator=' ', strip=True)[:max_length]
+
+def build_page(size_mb: float) -> str:
+    chrome = ['<div class="cookie-banner">We use cookies. <button>Accept</button></div>',
+              '<header><nav class="main-menu"><ul>']
+    chrome += [f'<li><a href="/section/{i}">{CHROME_MARKER} {i}</a></li>' for i in range(400)]
+    chrome.append('</ul></nav></header>')
+    script = '<script>window.__STATE__ = {' + ','.join(f'"k{i}": {i}' for i in range(2000)) + '};</script>'
+    style = '<style>' + ''.join(f'.c{i} {{ margin: {i}px; }}' for i in range(1000)) + '</style>'
+    item = ('<article class="event"><h3>{marker} near Region {i}</h3>'
+            '<p>Depth {depth} km. Reported {i} minutes ago. Tsunami advisory under evaluation.</p>'
+            '<div class="share-buttons">Share on social</div></article>')
+    sidebar = '<aside class="sidebar">' + ''.join(f'<p>Promo {i}</p>' for i in range(200)) + '</aside>'
+    footer = '<footer>' + ''.join(f'<a href="/f/{i}">Footer link {i}</a>' for i in range(300)) + '</footer>'
+
+    head = '<html><head><title>Events</title>' + style + script + '</head><body>' + ''.join(chrome)
+    tail = '</main>' + sidebar + footer + '</body></html>'
+    body = ['<main id="content">']
+    size = len(head) + len(tail)
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        block = item.format(marker=CONTENT_MARKER, i=i, depth=10 + i % 90)
+        if i % 50 == 0:
+            block += script # Inline scripts scattered through the content, as in real page sources
+        body.append(block)
+        size += len(block)
+        i += 1
+    return head + ''.join(body) + tail
+
+def time_call(fn, repeat: int) -> tuple[float, str]:
+    timings = []
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-length", type=int, default=1500)
+    args = parser.parse_args()
+
+    page = build_page(args.size_mb)
+    print(f"Page: {len(page) / 1024 / 1024:.1f} MB, max_length={args.max_length}, median of {args.repeat} runs\n")
+    candidates = [("legacy bs4 (html.parser, full get_text)", lambda: legacy_extract(page, args.max_length))]
+    candidates += [(f"extraction: {name}", lambda name=name: extract_main_text(page, max_length=args.max_length, backend=name))
+                   for name in EXTRACTORS]
+
+    baseline = None
+    print(f"{'implementation':<42} {'median':>10} {'speedup':>8}  content  chrome")
+    for label, fn in candidates:
+        seconds, text = time_call(fn, args.repeat)
+        baseline = baseline or seconds
+        print(f"{label:<42} {seconds * 1000:>8.1f}ms {baseline / seconds:>7.1f}x  "
+              f"{text.count(CONTENT_MARKER):>7}  {text.count(CHROME_MARKER):>6}")
+
+if __name__ == "__main__":
+    main()
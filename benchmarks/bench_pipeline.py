@@ -0,0 +1,329 @@
+# benchmarks/bench_pipeline.py
+"""Benchmark: IntelligentMonitor end to end, fully offline.
+
+Every cycle goes through the real pipeline (async ingestion, feed parsing, extraction, change detection,
+agent DAG, SQLite, Telegram alert) against local stand-ins:
+  - a local HTTP server serving fixtures/pages (news pages), fixtures/feeds (USGS/NWS/NHC) and
+    fixtures/fred (FRED observations, honouring observation_start), and accepting Telegram sendMessage;
+  - the fake LLM backend, with configurable latency and throughput.
+State (database, caches, FRED store) lives in a temporary data directory.
+
+Reports p50/p95 cycle latency, peak RSS and per-stage throughput (from the spans of src/telemetry.py),
+and compares them with a stored baseline: a regression beyond the tolerance exits with status 1.
+
+    python -m benchmarks.bench_pipeline [--cycles 8] [--warmup 1] [--mode full|incremental]
+                                        [--llm-latency 0.2] [--update-baseline]
+
+Baselines are machine-specific: record one with --update-baseline on the machine that runs the comparison.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'fixtures')
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'bench_pipeline.json')
+FEED_FIXTURES = {
+    "earthquake_usgs": "usgs_2.5_day.geojson",
+    "noaa_weather_alerts": "nws_alerts_active.atom",
+    "noaa_hurricanes": "nhc_index_at.xml",
+}
+# Allowed growth over the baseline: relative tolerance plus an absolute slack that absorbs timer noise
+CYCLE_SLACK_SECONDS = 0.05
+STAGE_SLACK_MS = 5.0
+RSS_SLACK_MB = 10.0
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the fixtures like the real hosts would (ETag revalidation included) and records Telegram messages."""
+    protocol_version = "HTTP/1.1" # Keep-alive, as with the real APIs
+    latency_seconds = 0.0
+    requests_served = {}
+    telegram_messages = []
+    lock = threading.Lock()
+
+    def _count(self, route: str):
+        with self.lock:
+            self.requests_served[route] = self.requests_served.get(route, 0) + 1
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_fixture(self, path: str, content_type: str):
+        if not os.path.isfile(path):
+            self._send(404)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+        else:
+            self._send(200, body, content_type, {"ETag": etag})
+
+    def _fred_observations(self, query: dict):
+        series_id = query.get("series_id", [""])[0]
+        path = os.path.join(FIXTURES_DIR, "fred", f"{os.path.basename(series_id)}.json")
+        if not os.path.isfile(path):
+            self._send(400, b'{"error_code": 400, "error_message": "Bad Request. The series does not exist."}')
+            return
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        start = query.get("observation_start", ["0000-00-00"])[0]
+        payload["observations"] = [obs for obs in payload["observations"] if obs["date"] >= start]
+        payload["count"] = len(payload["observations"])
+        self._send(200, json.dumps(payload).encode("utf-8"))
+
+    def do_GET(self):
+        time.sleep(self.latency_seconds)
+        url = urlparse(self.path)
+        if url.path.startswith("/pages/"):
+            self._count("pages")
+            self._send_fixture(os.path.join(FIXTURES_DIR, "pages", os.path.basename(url.path)), "text/html; charset=utf-8")
+        elif url.path.startswith("/feeds/"):
+            self._count("feeds")
+            self._send_fixture(os.path.join(FIXTURES_DIR, "feeds", os.path.basename(url.path)), "application/octet-stream")
+        elif url.path == "/fred/series/observations":
+            self._count("fred")
+            self._fred_observations(parse_qs(url.query))
+        else:
+            self._send(404)
+
+    def do_POST(self):
+        time.sleep(self.latency_seconds)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlparse(self.path).path.endswith("/sendMessage"):
+            self._count("telegram")
+            with self.lock:
+                self.telegram_messages.append(parse_qs(body.decode("utf-8")).get("text", [""])[0])
+            self._send(200, b'{"ok": true, "result": {}}')
+        else:
+            self._send(404)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in(latency_seconds: float) -> ThreadingHTTPServer:
+    StandInHandler.latency_seconds = latency_seconds
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stand-in", daemon=True).start()
+    return server
+
+def configure_environment(args, data_dir: str, base_url: str):
+    """Must run before anything from src is imported: src.config reads these at import time."""
+    os.environ.update({
+        "DISASTER_MONITOR_DATA_DIR": data_dir,
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_SECONDS": str(args.llm_latency),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "FAKE_LLM_RESPONSE_TOKENS": str(args.llm_response_tokens),
+        "LLM_REQUESTS_PER_MINUTE": str(args.llm_requests_per_minute),
+        "LLM_CACHE_BYPASS": "1", # Identical prompts every cycle; measure the model path, not the cache
+        "FRED_API_KEY": "benchmark",
+        "FRED_API_BASE_URL": base_url,
+        "TELEGRAM_BOT_TOKEN": "benchmark",
+        "TELEGRAM_CHAT_ID": "0",
+        "TELEGRAM_API_BASE_URL": base_url,
+        "TRIGGERS_ENABLED": "0", # Fast-path analyses would overlap the measured cycles
+        "METRICS_PORT": "0",
+    })
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100)."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB on Linux
+
+def stage_summary(rows: list, cycles: int) -> dict:
+    """Aggregates cycle_timings rows by stage (span name without labels)."""
+    stages = {}
+    for row in rows:
+        stage = row["span"].split("[")[0]
+        if stage == "cycle":
+            continue
+        entry = stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "max_ms": 0.0, "response_tokens": 0})
+        entry["calls"] += row["count"]
+        entry["seconds"] += row["total_seconds"]
+        entry["max_ms"] = max(entry["max_ms"], row["max_seconds"] * 1000)
+        entry["response_tokens"] += row["response_tokens"]
+    summary = {}
+    for stage, entry in sorted(stages.items()):
+        seconds = entry["seconds"]
+        summary[stage] = {
+            "calls_per_cycle": entry["calls"] / cycles,
+            "mean_ms": seconds / entry["calls"] * 1000 if entry["calls"] else 0.0,
+            "max_ms": entry["max_ms"],
+            "ops_per_second": entry["calls"] / seconds if seconds else float("inf"), # Per busy second of the stage
+        }
+        if entry["response_tokens"]:
+            summary[stage]["tokens_per_second"] = entry["response_tokens"] / seconds
+    return summary
+
+def run_benchmark(args) -> dict:
+    data_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    server = start_stand_in(args.http_latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    configure_environment(args, data_dir, base_url)
+
+    from src import config
+    from src.agent_system import IntelligentMonitor
+    from src.change_detection import ChangeDetector
+    from src.database import load_cycle_timings
+
+    # Point every source at the stand-in (in place: the ingestion code holds references to these dicts)
+    for name, fixture in FEED_FIXTURES.items():
+        config.FEED_SOURCES[name]["url"] = config.MONITORED_SOURCES[name] = f"{base_url}/feeds/{fixture}"
+    for name in config.SCRAPING_URLS:
+        config.SCRAPING_URLS[name] = config.MONITORED_SOURCES[name] = f"{base_url}/pages/{name}.html"
+
+    monitor = IntelligentMonitor()
+    if args.mode == "full":
+        # Stored analyses are never reused, so every cycle runs the whole agent DAG (worst case)
+        monitor.change_detector = ChangeDetector(max_reuse_seconds=-1)
+    latencies = []
+    try:
+        for i in range(args.warmup + args.cycles):
+            started = time.perf_counter()
+            monitor.run_monitoring_cycle()
+            elapsed = time.perf_counter() - started
+            if i >= args.warmup:
+                latencies.append(elapsed)
+            print(f"cycle {i + 1}/{args.warmup + args.cycles}: {elapsed:.3f}s{' (warm-up)' if i < args.warmup else ''}",
+                  file=sys.stderr)
+        rows = [row for row in load_cycle_timings(args.warmup + args.cycles) if row["kind"] == "regular"]
+    finally:
+        monitor.shutdown()
+        server.shutdown()
+    measured_ids = list(dict.fromkeys(row["cycle_id"] for row in rows))[args.warmup:]
+    rows = [row for row in rows if row["cycle_id"] in measured_ids]
+    return {
+        "settings": settings_of(args),
+        "metrics": {
+            "cycle_p50_seconds": percentile(latencies, 50),
+            "cycle_p95_seconds": percentile(latencies, 95),
+            "cycle_mean_seconds": statistics.fmean(latencies),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stage_summary(rows, len(measured_ids) or 1),
+        },
+        "stand_in": {"requests": dict(StandInHandler.requests_served), "telegram_messages": len(StandInHandler.telegram_messages)},
+    }
+
+def settings_of(args) -> dict:
+    """Parameters that change the workload; results are only comparable when these match."""
+    return {"mode": args.mode, "cycles": args.cycles, "warmup": args.warmup, "llm_latency": args.llm_latency,
+            "llm_tokens_per_second": args.llm_tokens_per_second, "llm_response_tokens": args.llm_response_tokens,
+            "http_latency": args.http_latency}
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Returns one message per metric that got worse than the baseline by more than the tolerance."""
+    regressions = []
+
+    def check(name: str, current: float, previous: float, slack: float, unit: str):
+        if previous is None or current != current: # Missing in the baseline, or NaN (no RSS on this platform)
+            return
+        limit = previous * (1 + tolerance) + slack
+        if current > limit:
+            regressions.append(f"{name}: {current:.3f}{unit} vs baseline {previous:.3f}{unit} (limit {limit:.3f}{unit})")
+
+    current, previous = result["metrics"], baseline["metrics"]
+    check("cycle p50", current["cycle_p50_seconds"], previous.get("cycle_p50_seconds"), CYCLE_SLACK_SECONDS, "s")
+    check("cycle p95", current["cycle_p95_seconds"], previous.get("cycle_p95_seconds"), CYCLE_SLACK_SECONDS, "s")
+    check("peak RSS", current["peak_rss_mb"], previous.get("peak_rss_mb"), RSS_SLACK_MB, " MB")
+    for stage, stats in current["stages"].items():
+        previous_stage = previous.get("stages", {}).get(stage)
+        if previous_stage:
+            check(f"stage {stage} mean", stats["mean_ms"], previous_stage["mean_ms"], STAGE_SLACK_MS, " ms")
+    return regressions
+
+def print_report(result: dict):
+    metrics = result["metrics"]
+    print(f"Cycles: {result['settings']['cycles']} measured ({result['settings']['mode']} mode, "
+          f"LLM {result['settings']['llm_latency']}s + {result['settings']['llm_tokens_per_second']:g} tokens/s)")
+    print(f"  p50 {metrics['cycle_p50_seconds']:.3f}s   p95 {metrics['cycle_p95_seconds']:.3f}s   "
+          f"mean {metrics['cycle_mean_seconds']:.3f}s   peak RSS {metrics['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':<18}{'calls/cycle':>12}{'mean ms':>10}{'max ms':>10}{'ops/s':>10}{'tokens/s':>10}")
+    for stage, stats in metrics["stages"].items():
+        tokens = f"{stats['tokens_per_second']:.0f}" if "tokens_per_second" in stats else "-"
+        print(f"{stage:<18}{stats['calls_per_cycle']:>12.1f}{stats['mean_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+              f"{stats['ops_per_second']:>10.1f}{tokens:>10}")
+    print(f"Stand-in: {result['stand_in']['requests']}, {result['stand_in']['telegram_messages']} Telegram message(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the monitoring pipeline.")
+    parser.add_argument("--cycles", type=int, default=8, help="Measured cycles")
+    parser.add_argument("--warmup", type=int, default=1, help="Cycles run first and left out (cold caches, FRED backfill)")
+    parser.add_argument("--mode", choices=("full", "incremental"), default="full",
+                        help="full: every agent runs each cycle; incremental: normal change detection")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=2000)
+    parser.add_argument("--llm-response-tokens", type=int, default=600)
+    parser.add_argument("--llm-requests-per-minute", type=float, default=100000,
+                        help="LLM scheduler quota (the production default would throttle the benchmark)")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Added to every stand-in response (s)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": result["settings"], "metrics": result["metrics"]}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["settings"] != result["settings"]:
+        print(f"Baseline was recorded with different settings ({baseline['settings']}); not comparable.", file=sys.stderr)
+        sys.exit(2)
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"PERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        sys.exit(1)
+    print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
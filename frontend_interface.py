@@ -2,6 +2,7 @@
 import sys
 import os
 import sqlite3
+import numpy as np
 import streamlit as st
 import pandas as pd
 
@@ -25,8 +26,9 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 try:
-    from src.config import DATABASE_PATH
+    from src.config import DATABASE_PATH, DASHBOARD_PAGE_SIZE
 except ImportError:
+    DASHBOARD_PAGE_SIZE = 20
     db_file_name = 'disaster_monitor.db'
     _project_root_from_frontend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DATABASE_PATH = os.path.join(_project_root_from_frontend, 'data', db_file_name)
@@ -47,102 +49,84 @@ if _db_path_warning_message:
 
 
 # === Load DB ===
-def load_scenarios():
-    if not os.path.exists(DATABASE_PATH):
-        st.error(f"Database file not found at {DATABASE_PATH}. Ensure the backend agent system has run and created it.")
-        return pd.DataFrame()
-    conn = None
+# Lightweight paginated queries from src.database; heavy texts are only fetched for the scenario on screen.
+from src.database import (use_readonly_connection, get_latest_scenario_id, list_scenarios, get_scenario,
+                          load_agent_outputs, search_scenarios, load_cycle_timings)
+# Read-only: the database runs in WAL mode, so this never blocks (or is blocked by) the agent system's writes
+use_readonly_connection()
+from src.timeseries import get_fred_store, derived_metrics
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_scenario_page(latest_id, before_id, page_size):
+    # `latest_id` is part of the cache key: a new scenario invalidates the cached pages
+    return list_scenarios(limit=page_size, before_id=before_id)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_fred_series(series_id, version):
+    # `version` (file mtime) invalidates the entry after each FRED sync
+    dates, values = get_fred_store().load(series_id)
+    metrics = derived_metrics(np.asarray(dates), np.asarray(values))
+    return pd.DataFrame({"valor": np.asarray(values), "yoy": metrics["yoy"], "zscore": metrics["zscore"]},
+                        index=pd.to_datetime(np.asarray(dates))).dropna(subset=["valor"])
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_search_results(latest_id, query):
+    # Full-text (FTS5/BM25) search; `latest_id` invalidates cached results when a scenario is added
+    return search_scenarios(query)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_scenario_detail(scenario_id):
+    # Stored scenarios never change, so their details can stay cached
+    return get_scenario(scenario_id), load_agent_outputs(scenario_id)
+
+@st.cache_data(show_spinner=False, ttl=60)
+def load_cycle_timings_frame(limit_cycles):
+    # Written by the agent system at the end of every cycle; a short TTL is enough to follow it
+    return pd.DataFrame(load_cycle_timings(limit_cycles))
+
+def run_query(load, *args, default=None):
+    # Read errors (locked, unmigrated database...) reach the dashboard in read-only mode; show them instead of failing
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        df = pd.read_sql_query("SELECT id, timestamp, summary, recommendation, agent_inputs FROM scenarios ORDER BY timestamp DESC", conn)
-        return df
+        return load(*args)
     except sqlite3.Error as e:
         st.error(f"SQLite error: {e}")
-        return pd.DataFrame()
-    finally:
-        if conn:
-            conn.close()
+        return default
 
 # === Simulated Strategy Engine ===
-# Idealmente, esta função viria de src.strategy_engine conforme discutimos
-# Mas para manter este arquivo autocontido por enquanto (ou se a importação falhar):
-try:
-    from src.strategy_engine import generate_simulated_strategy as generate_strategy
-    # Se a importação acima funcionar, a função generate_strategy abaixo não será usada.
-except ImportError:
-    st.error("Falha ao importar 'generate_simulated_strategy' de src.strategy_engine. Usando fallback interno.")
-    def generate_strategy(recommendation_text, capital_available):
-        short_assets = ['PETR4.SA', 'VALE3.SA'] 
-        long_assets = ['GOLD', 'AGRO3.SA']    
-
-        if recommendation_text:
-            lower_rec = recommendation_text.lower()
-            if "inflation" in lower_rec or "interest rates rising" in lower_rec:
-                long_assets.append('USDBRL') 
-                long_assets = list(set(long_assets)) 
-            if "recession" in lower_rec or "economic contraction" in lower_rec:
-                short_assets.extend(['IBOV', 'SPY']) 
-                short_assets = list(set(short_assets))
-            if "supply chain disruption" in lower_rec:
-                long_assets.append('COMMODITIES_INDEX_ETF') 
-                long_assets = list(set(long_assets))
-        
-        if not short_assets: short_assets = ['SPY'] 
-        if not long_assets: long_assets = ['GLD'] 
-
-        # Verifica se as listas de ativos não estão vazias para evitar divisão por zero
-        num_short = len(short_assets) if short_assets else 1
-        num_long = len(long_assets) if long_assets else 1
-
-        short_alloc_ratio = 0.30
-        long_alloc_ratio = 0.70
-
-        if not short_assets and long_assets:
-            short_alloc_ratio = 0.0
-            long_alloc_ratio = 1.0
-        elif short_assets and not long_assets:
-            short_alloc_ratio = 1.0
-            long_alloc_ratio = 0.0
-        elif not short_assets and not long_assets:
-             return {'short': {}, 'long': {}} # Retorna vazio se não houver ativos
-
-        allocation = {'short': {}, 'long': {}}
-        if short_assets:
-            allocation['short'] = {asset: capital_available * short_alloc_ratio / num_short for asset in short_assets}
-        if long_assets:
-            allocation['long'] = {asset: capital_available * long_alloc_ratio / num_long for asset in long_assets}
-        
-        return allocation
+from src.strategy_engine import generate_simulated_strategy as generate_strategy
 
 # === Main UI Logic ===
-scenarios_df = load_scenarios()
-
-if not scenarios_df.empty:
-    latest = scenarios_df.iloc[0]
-    st.subheader(f"🧠 Último Cenário Registrado (ID: {latest['id']})")
+latest_id = None
+if not os.path.exists(DATABASE_PATH):
+    st.error(f"Database file not found at {DATABASE_PATH}. Ensure the backend agent system has run and created it.")
+else:
+    latest_id = run_query(get_latest_scenario_id)
+
+latest, agent_outputs = None, {}
+if latest_id is not None:
+    # A new scenario resets the history view back to the newest page and scenario
+    if st.session_state.get("history_latest_id") != latest_id:
+        st.session_state["history_latest_id"] = latest_id
+        st.session_state["history_cursors"] = [None] # before_id of each visited page
+        st.session_state["selected_scenario_id"] = latest_id
+    selected_id = st.session_state["selected_scenario_id"]
+    latest, agent_outputs = run_query(load_scenario_detail, selected_id, default=(None, {}))
+    if latest is None:
+        latest, agent_outputs = run_query(load_scenario_detail, latest_id, default=(None, {}))
+
+if latest is not None:
+    titulo = "Último Cenário Registrado" if latest['id'] == latest_id else "Cenário Selecionado"
+    st.subheader(f"🧠 {titulo} (ID: {latest['id']})")
     st.markdown(f"**Data/Hora (UTC):** {latest['timestamp']}")
     
     st.markdown("### 📜 Recomendação Econômica Principal")
-    st.text_area("Recomendação", latest['recommendation'], height=200, key="rec_main")
+    st.text_area("Recomendação", latest['recommendation'], height=200, key=f"rec_main_{latest['id']}")
 
-    with st.expander("Ver Análise Completa dos Agentes (Sumário)"):
-        st.text_area("Sumário Detalhado", latest['summary'], height=400, key="sum_detail")
-    
-    if 'agent_inputs' in latest and latest['agent_inputs']:
-        with st.expander("Ver Dados Brutos dos Agentes (JSON)"):
-            try:
-                # Garante que é uma string antes de tentar carregar como JSON
-                agent_inputs_data = latest['agent_inputs']
-                if isinstance(agent_inputs_data, str):
-                    agent_data = pd.io.json.loads(agent_inputs_data)
-                    st.json(agent_data)
-                elif isinstance(agent_inputs_data, dict): # Se já for um dict (improvável do DB)
-                    st.json(agent_inputs_data)
-                else:
-                    st.text(str(agent_inputs_data))
-            except Exception as e:
-                st.text(str(latest['agent_inputs'])) 
-                st.warning(f"Could not parse agent_inputs as JSON: {e}")
+    if agent_outputs:
+        with st.expander("Ver Análise Completa dos Agentes (Sumário)"):
+            for agent_name, analysis in agent_outputs.items():
+                st.markdown(f"#### {agent_name.replace('_', ' ').title()}")
+                st.text_area(agent_name, analysis, height=250, key=f"agent_{latest['id']}_{agent_name}", label_visibility="collapsed")
 
 
     st.markdown("---")
@@ -172,9 +156,84 @@ if not scenarios_df.empty:
                     st.write("Nenhuma posição long sugerida.")
         else:
             st.warning("Não há recomendação econômica no último cenário para basear a estratégia.")
+
+    st.markdown("---")
+    st.subheader("🗂️ Histórico de Cenários")
+    cursors = st.session_state["history_cursors"]
+    page = run_query(load_scenario_page, latest_id, cursors[-1], DASHBOARD_PAGE_SIZE, default=[])
+    if page:
+        st.dataframe(pd.DataFrame(page).set_index("id"))
+        escolha = st.selectbox("Ver cenário", [row["id"] for row in page], format_func=lambda i: f"ID {i}")
+        if st.button("🔎 Abrir cenário"):
+            st.session_state["selected_scenario_id"] = escolha
+            st.rerun()
+    col_newer, col_older = st.columns(2)
+    with col_newer:
+        if len(cursors) > 1 and st.button("⬅️ Mais recentes"):
+            cursors.pop()
+            st.rerun()
+    with col_older:
+        if len(page) == DASHBOARD_PAGE_SIZE and st.button("Mais antigos ➡️"):
+            cursors.append(page[-1]["id"])
+            st.rerun()
+
+    st.markdown("---")
+    st.subheader("🔍 Buscar no Histórico")
+    busca = st.text_input("Termos (ex.: Mississippi flood, CME, \"supply chain\")", key="search_query")
+    if busca.strip():
+        resultados = run_query(load_search_results, latest_id, busca.strip(), default=[])
+        if resultados:
+            st.dataframe(pd.DataFrame(resultados).set_index("id")[["timestamp", "source", "snippet"]])
+            achado = st.selectbox("Ver cenário encontrado", [r["id"] for r in resultados], format_func=lambda i: f"ID {i}")
+            if st.button("🔎 Abrir cenário encontrado"):
+                st.session_state["selected_scenario_id"] = achado
+                st.rerun()
+        else:
+            st.info("Nenhum cenário encontrado para esses termos.")
 else:
     st.warning("Nenhum cenário disponível ainda. Aguarde o ciclo de monitoramento do sistema de agentes ou verifique os logs.")
 
+# === FRED time series (local store synced by the agent system) ===
+fred_store = get_fred_store()
+fred_series = fred_store.series_ids()
+if fred_series:
+    st.markdown("---")
+    st.subheader("📊 Indicadores FRED")
+    colunas = st.columns(len(fred_series))
+    for coluna, series_id in zip(colunas, fred_series):
+        serie = load_fred_series(series_id, fred_store.last_modified(series_id))
+        if serie.empty:
+            continue
+        ultimo = serie.iloc[-1]
+        with coluna:
+            yoy = "n/a" if np.isnan(ultimo["yoy"]) else f"{ultimo['yoy']:+.2%} YoY"
+            st.metric(f"{series_id} ({serie.index[-1].date()})", f"{ultimo['valor']:,.2f}", yoy)
+            if not np.isnan(ultimo["zscore"]):
+                st.caption(f"z-score: {ultimo['zscore']:+.2f}")
+            st.line_chart(serie["valor"], height=180)
+
+# === Per-cycle timings (spans recorded by src/telemetry.py) ===
+tempos = run_query(load_cycle_timings_frame, 30, default=pd.DataFrame()) if os.path.exists(DATABASE_PATH) else pd.DataFrame()
+if not tempos.empty:
+    st.markdown("---")
+    st.subheader("⏱️ Tempos por Ciclo")
+    tempos["ciclo"] = pd.to_datetime(tempos["started_at"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S") + " " + tempos["kind"]
+    tempos["etapa"] = tempos["span"].str.split("[").str[0]
+    duracao = tempos[tempos["etapa"] == "cycle"].set_index("ciclo")["total_seconds"]
+    ultimo = tempos[tempos["cycle_id"] == tempos["cycle_id"].iloc[-1]]
+    col_duracao, col_tokens = st.columns(2)
+    col_duracao.metric("Último ciclo", f"{ultimo.loc[ultimo['etapa'] == 'cycle', 'total_seconds'].sum():.1f} s")
+    col_tokens.metric("Tokens LLM (prompt / resposta)",
+                      f"{int(ultimo['prompt_tokens'].sum()):,} / {int(ultimo['response_tokens'].sum()):,}")
+    st.caption("Duração total de cada ciclo (s)")
+    st.bar_chart(duracao, height=180)
+    # Stages overlap (agents run in parallel and include their LLM calls), so these are cumulative times, not wall time
+    etapas = tempos[tempos["etapa"] != "cycle"].pivot_table(index="ciclo", columns="etapa", values="total_seconds",
+                                                           aggfunc="sum", sort=False).fillna(0)
+    if not etapas.empty:
+        st.caption("Tempo acumulado por etapa (s)")
+        st.bar_chart(etapas, height=240)
+
 st.sidebar.markdown("---")
 st.sidebar.info(f"Caminho do Banco de Dados: {DATABASE_PATH}")
 if _db_path_warning_message: # Adiciona o aviso na sidebar também
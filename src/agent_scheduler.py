@@ -0,0 +1,82 @@
+# src/agent_scheduler.py
+import contextvars
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def topological_order(dependencies: dict) -> list:
+    """Orders agents so each comes after everything it depends on (ties keep declaration order).
+
+    Raises ValueError on unknown dependencies or cycles.
+    """
+    for agent_name, deps in dependencies.items():
+        unknown = [dep for dep in deps if dep not in dependencies]
+        if unknown:
+            raise ValueError(f"Agent '{agent_name}' depends on unknown agent(s): {', '.join(unknown)}")
+    order = []
+    placed = set()
+    while len(order) < len(dependencies):
+        ready = [name for name, deps in dependencies.items() if name not in placed and all(dep in placed for dep in deps)]
+        if not ready:
+            cycle = sorted(set(dependencies) - placed)
+            raise ValueError(f"Agent dependencies contain a cycle among: {', '.join(cycle)}")
+        order.extend(ready)
+        placed.update(ready)
+    return order
+
+def transitive_upstreams(dependencies: dict) -> dict:
+    """Maps each agent to every agent it depends on, directly or indirectly."""
+    upstreams = {}
+    for agent_name in topological_order(dependencies):
+        closure = set()
+        for dep in dependencies[agent_name]:
+            closure.add(dep)
+            closure.update(upstreams[dep])
+        upstreams[agent_name] = closure
+    return upstreams
+
+def run_agent_dag(dependencies: dict, run_agent, max_workers: int) -> dict:
+    """Runs every agent as soon as all of its dependencies are available, up to `max_workers` at a time.
+
+    `run_agent(agent_name, upstream_outputs, mark_ready)` receives {dependency name: output} for its direct
+    dependencies and returns the agent's final output. A streaming agent may call `mark_ready(partial_output)`
+    once its partial output is enough for dependants, which then start with that partial text instead of
+    waiting for the full answer. Returns {agent_name: final output}.
+    Independent agents overlap, so the cycle takes as long as the critical path rather than the sum.
+    """
+    topological_order(dependencies) # Validate before starting any work
+    events = queue.Queue()
+    available = {} # Output dependants may use: partial (after mark_ready) or final
+    outputs = {}
+    pending = dict(dependencies)
+
+    def worker(agent_name: str, upstream_outputs: dict):
+        def mark_ready(partial_output: str):
+            events.put(("ready", agent_name, partial_output))
+        try:
+            events.put(("done", agent_name, run_agent(agent_name, upstream_outputs, mark_ready)))
+        except BaseException as e:
+            events.put(("error", agent_name, e))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent") as executor:
+        while len(outputs) < len(dependencies):
+            ready = [name for name, deps in pending.items() if all(dep in available for dep in deps)]
+            for agent_name in ready:
+                # Each agent runs in a copy of the caller's context (keeps the active telemetry cycle)
+                executor.submit(contextvars.copy_context().run, worker, agent_name,
+                                {dep: available[dep] for dep in pending[agent_name]})
+                del pending[agent_name]
+            kind, agent_name, payload = events.get()
+            if kind == "error":
+                raise payload
+            if kind == "ready":
+                if agent_name not in outputs:
+                    available.setdefault(agent_name, payload)
+                    logger.info(f"Agent {agent_name} produced enough output; starting its dependants early.")
+                continue
+            outputs[agent_name] = payload
+            available[agent_name] = payload
+            logger.debug(f"Agent {agent_name} finished; {len(pending)} agent(s) waiting.")
+    return outputs
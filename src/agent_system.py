@@ -1,73 +1,59 @@
 # src/agent_system.py
 import logging
+import threading
 import time
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
+from contextlib import contextmanager
 
-from src.config import AGENT_ROLES, SCRAPING_URLS, MONITORING_CYCLE_INTERVAL_SECONDS
-from src.database import init_db, store_scenario
-from src.llm_adapter import GeminiAdapter, generate_agent_prompt
-from src.scraper import get_page_content_selenium, extract_text_from_html, fetch_fred_data
+from src.agent_scheduler import topological_order, transitive_upstreams, run_agent_dag
+from src.config import (AGENT_ROLES, AGENT_MAX_PARALLELISM, MONITORED_SOURCES, FRED_SERIES, MONITORING_CYCLE_INTERVAL_SECONDS,
+                        LLM_STREAMING_ENABLED, LLM_STREAM_CHECKPOINT_CHARS, EARLY_ALERT_SEVERITIES,
+                        ANALYSIS_MIN_INTERVAL_SECONDS, SOURCE_INITIAL_FILL_TIMEOUT_SECONDS, TRIGGERS_ENABLED,
+                        METRICS_PORT, CYCLE_TIMINGS_RETENTION_DAYS, AGENT_CHECKPOINT_RETENTION_SECONDS)
+from src.change_detection import ChangeDetector
+from src.context_builder import build_source_context, compress_insights, estimate_tokens, key_observations_complete
+from src.database import (init_db, close_db, store_scenario, compose_summary, content_hash, checkpoint_agent_output,
+                          load_final_checkpoint, clear_agent_checkpoints, store_cycle_timings, transaction)
+from src.driver_pool import SeleniumDriverPool
+from src.fetch_planner import FetchPlanner
+from src.ingestion import AsyncIngestor, FRED_CONTEXT_KEY, is_failed_source_text
+from src.llm_adapter import create_llm_adapter, generate_agent_prompt, is_generation_failure, parse_headline
+from src.source_scheduler import SourceScheduler, next_slot
+from src.telemetry import get_telemetry, span, start_metrics_server
+from src.triggers import TriggerEngine, TRIGGER_CONTEXT_KEY, format_trigger_matches, group_matches
 from src.utils import send_telegram_alert
 
 logger = logging.getLogger(__name__)
 
 class IntelligentMonitor:
     def __init__(self):
-        self.llm_adapter = GeminiAdapter()
+        self.llm_adapter = create_llm_adapter() # LLM_BACKEND: gemini, fake or replay
+        self.driver_pool = SeleniumDriverPool() # Warm browsers reused across sources and cycles
+        self.fetch_planner = FetchPlanner(self.driver_pool) # Learns which sites really need a browser
+        self.ingestor = AsyncIngestor(self.fetch_planner) # Pages, FRED and alerts over one HTTP session
+        self.pending_alerts = [] # Single-run mode: alerts sent concurrently with the next ingestion (see _send_alert)
+        self.change_detector = ChangeDetector() # Skips agents whose inputs did not materially change
+        self.source_scheduler = SourceScheduler(self.ingestor) # Per-source cadences feeding a snapshot store
+        self.trigger_engine = TriggerEngine(self.run_targeted_analysis) # Fast path for rare, high-impact events
+        if TRIGGERS_ENABLED:
+            self.ingestor.event_listeners.append(self.trigger_engine.on_events)
+            self.ingestor.fred_listeners.append(self.trigger_engine.on_fred_update)
+        self.metrics_server = None # Prometheus /metrics endpoint, started with continuous monitoring
         init_db() # Ensure DB is ready
 
-    def _scrape_source(self, site_name: str, url: str) -> tuple[str, str]:
-        """Scrapes a single source. Uses Selenium for now.
-        Could be extended to choose scraper based on URL or site needs.
-        """
-        logger.info(f"Scraping {site_name} from {url}...")
-        # For now, default to Selenium. Could add logic to use requests for simpler sites.
-        # For "Toro Investimentos" or similar complex financial platforms,
-        # this would need significant enhancement:
-        # - Login handling (securely)
-        # - WebDriverWait for specific dynamic elements
-        # - Navigating through menus/tabs
-        # - Potentially handling CAPTCHAs (very advanced, often needs 3rd party services)
-        # - More robust error handling for site-specific issues
-        html_content = get_page_content_selenium(url)
-        if html_content:
-            text_content = extract_text_from_html(html_content)
-            return site_name, text_content
-        return site_name, f"Failed to retrieve content from {site_name}."
-
-    def gather_initial_context(self) -> str:
-        """Gathers initial context from web sources and APIs."""
+    def gather_source_texts(self) -> dict:
+        """Gathers the extracted text of every web source plus the FRED block, keyed by source name."""
         logger.info("Gathering initial context...")
-        contexts = {}
-        
-        # Web scraping with ThreadPoolExecutor for parallelism
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_url = {executor.submit(self._scrape_source, name, url): name for name, url in SCRAPING_URLS.items()}
-            for future in as_completed(future_to_url):
-                site_name = future_to_url[future]
-                try:
-                    _, content = future.result()
-                    contexts[site_name] = content
-                except Exception as exc:
-                    logger.error(f"{site_name} generated an exception during scraping: {exc}", exc_info=True)
-                    contexts[site_name] = f"Error scraping {site_name}."
-
-        # FRED Data
-        fred_gdp = fetch_fred_data("GDP")
-        fred_fedfunds = fetch_fred_data("FEDFUNDS")
-        fred_cpi = fetch_fred_data("CPIAUCSL") # Consumer Price Index
-
-        full_context = "Collected Real-Time Data:\n\n"
-        for source, text in contexts.items():
-            full_context += f"--- {source.upper()} ---\n{text}\n\n"
-        
-        full_context += f"--- FRED ECONOMIC DATA ---\n"
-        full_context += f"{fred_gdp}\n{fred_fedfunds}\n{fred_cpi}\n"
-        
+
+        # Static pages, FRED series and queued alerts run concurrently on the event loop;
+        # only browser-bound sources are handed to the Selenium pool.
+        notifications, self.pending_alerts = self.pending_alerts, []
+        with span("ingest"):
+            contexts, fred_texts = self.ingestor.run(MONITORED_SOURCES, FRED_SERIES, notifications)
+        contexts[FRED_CONTEXT_KEY] = "\n".join(fred_texts)
+
         logger.info("Initial context gathering complete.")
-        # logger.debug(f"Full context: {full_context[:1000]}...") # Log a snippet
-        return full_context
+        return contexts
 
     def run_agent_analysis(self, agent_name: str, agent_role: str, current_context: str, previous_insights_str: str) -> tuple[str, str]:
         """Runs a single agent's analysis."""
@@ -83,94 +69,301 @@ class IntelligentMonitor:
             logger.error(f"Error running agent {agent_name}: {e}", exc_info=True)
             return agent_name, f"Error in {agent_name} analysis: {str(e)}"
 
-    def run_monitoring_cycle(self):
-        """Executes one full monitoring and analysis cycle."""
-        logger.info("Starting new monitoring cycle...")
+    def run_agent_analysis_streaming(self, agent_name: str, agent_role: str, current_context: str, previous_insights_str: str,
+                                     cycle_id: str, on_progress=None, request_headline: bool = False) -> tuple[str, str]:
+        """Runs a single agent's analysis while streaming it.
+
+        Partial output is checkpointed to SQLite every LLM_STREAM_CHECKPOINT_CHARS characters and passed
+        to `on_progress(text_so_far)` after every chunk. A final output checkpointed for the same prompt by an
+        interrupted cycle is resumed instead of calling the LLM again.
+        """
+        logger.info(f"Running streaming analysis for agent: {agent_name} ({agent_role})")
+        prompt = generate_agent_prompt(agent_role, current_context, previous_insights_str, request_headline=request_headline)
+        input_hash = content_hash(prompt)
+        resumed = load_final_checkpoint(agent_name, input_hash)
+        if resumed is not None:
+            logger.info(f"Agent {agent_name}: resuming the final output of an interrupted cycle (same prompt).")
+            if on_progress:
+                on_progress(resumed)
+            return agent_name, resumed
+        chunks = []
+        length = 0
+        checkpointed_length = 0
+        try:
+            for chunk in self.llm_adapter.generate_text_stream(prompt):
+                chunks.append(chunk)
+                length += len(chunk)
+                text_so_far = "".join(chunks)
+                if length - checkpointed_length >= LLM_STREAM_CHECKPOINT_CHARS:
+                    checkpoint_agent_output(cycle_id, agent_name, text_so_far, input_hash)
+                    checkpointed_length = length
+                if on_progress:
+                    on_progress(text_so_far)
+            analysis = "".join(chunks)
+            checkpoint_agent_output(cycle_id, agent_name, analysis, input_hash, is_final=not is_generation_failure(analysis))
+            logger.info(f"Agent {agent_name} analysis received ({length} chars streamed).")
+            return agent_name, analysis
+        except Exception as e:
+            logger.error(f"Error running agent {agent_name}: {e}", exc_info=True)
+            if chunks:
+                checkpoint_agent_output(cycle_id, agent_name, "".join(chunks), input_hash) # Keep the partial text for inspection
+            return agent_name, f"Error in {agent_name} analysis: {str(e)}"
+
+    def _send_alert(self, message: str):
+        """Sends a Telegram alert without blocking the cycle thread: over the source scheduler's session in
+        continuous mode, otherwise queued for the next ingestion (or shutdown)."""
+        if self.source_scheduler.running:
+            self.source_scheduler.notify(message)
+        else:
+            self.pending_alerts.append(message)
+
+    def _send_early_alert(self, severity: str, headline: str):
+        """Fires the early high-severity alert without blocking the stream that produced it."""
+        message = (f"⚡ **Early Disaster Monitor Alert ({severity})** ⚡\n\n{headline}\n\n"
+                   f"Full analysis still being generated; scenario follows.")
+        threading.Thread(target=send_telegram_alert, args=(message,), daemon=True).start()
+
+    @contextmanager
+    def _traced_cycle(self, cycle_id: str, kind: str):
+        """Collects the span timings of one cycle and stores them in cycle_timings, even if the cycle fails."""
+        recorder = None
+        try:
+            with get_telemetry().cycle(cycle_id, kind) as recorder:
+                yield recorder
+        finally:
+            if recorder is not None:
+                logger.info(f"Cycle {cycle_id} ({kind}) took {recorder.duration:.1f}s.")
+                store_cycle_timings(cycle_id, kind, recorder.started_at, recorder.rows(),
+                                    prune_before=time.time() - CYCLE_TIMINGS_RETENTION_DAYS * 86400)
+
+    def run_monitoring_cycle(self, source_texts: dict = None):
+        """Executes one full monitoring and analysis cycle.
+        `source_texts` comes from the snapshot store in continuous mode; without it every source is fetched now.
+        """
+        cycle_id = uuid.uuid4().hex[:12]
+        with self._traced_cycle(cycle_id, "regular"):
+            self._run_monitoring_cycle(cycle_id, source_texts)
+
+    def _run_monitoring_cycle(self, cycle_id: str, source_texts: dict = None):
+        logger.info(f"Starting new monitoring cycle {cycle_id}...")
         
-        initial_context = self.gather_initial_context()
-        if not initial_context or initial_context.strip() == "Collected Real-Time Data:":
+        if source_texts is None:
+            source_texts = self.gather_source_texts()
+        web_texts = [text for source, text in source_texts.items() if source != FRED_CONTEXT_KEY]
+        if all(is_failed_source_text(text) for text in web_texts):
             logger.warning("Initial context is empty or minimal. Cycle might be ineffective.")
             # Potentially send an alert about data gathering issues
             # send_telegram_alert("Warning: Data gathering for monitoring cycle failed or yielded no data.")
             # return
 
-        agent_outputs = {}
-        aggregated_insights_for_next_agent = ""
+        agent_dependencies = {name: spec["depends_on"] for name, spec in AGENT_ROLES.items()}
+        agent_order = topological_order(agent_dependencies) # disaster_economist depends on everyone, so it comes last
 
-        # Define agent processing order if dependencies exist, or run in parallel if independent enough
-        # For now, sequential to allow later agents to build on earlier ones.
-        # The 'disaster_economist' should ideally run last to synthesize.
-        
-        agent_order = list(AGENT_ROLES.keys()) # Default order
-        if "disaster_economist" in agent_order: # Ensure economist is last
-            agent_order.remove("disaster_economist")
-            agent_order.append("disaster_economist")
-
-        for agent_name in agent_order:
-            agent_role = AGENT_ROLES[agent_name]
-            name, analysis = self.run_agent_analysis(agent_name, agent_role, initial_context, aggregated_insights_for_next_agent)
-            agent_outputs[name] = analysis
-            
-            # Append this agent's key findings for the next agent
-            # This is a simple aggregation; could be more sophisticated (e.g., LLM summarizes key points)
-            aggregated_insights_for_next_agent += f"\n--- Insights from {name} ---\n{analysis}\n"
+        # Only agents whose sources (or upstream agents) materially changed go back to the LLM
+        failed_sources = {source for source, text in source_texts.items() if is_failed_source_text(text)}
+        with span("change_detection"):
+            changed_sources = self.change_detector.detect_changes(source_texts, failed_sources)
+        agent_upstreams = transitive_upstreams(agent_dependencies)
+        agents_to_run, reusable_analyses = self.change_detector.plan_agents(agent_order, agent_upstreams, changed_sources)
+        if not agents_to_run:
+            self.change_detector.commit()
+            logger.info("No material changes in any source; skipping LLM analysis and scenario storage this cycle.")
+            return
+        logger.info(f"Changed sources: {sorted(changed_sources) or 'none'}. "
+                    f"Re-running agents: {[a for a in agent_order if a in agents_to_run]}; reusing: {sorted(reusable_analyses)}.")
+
+        failed_agents = []
+
+        early_alert_sent = False
+
+        def run_agent(agent_name: str, upstream_outputs: dict, mark_ready) -> str:
+            if agent_name in reusable_analyses:
+                return reusable_analyses[agent_name]
+            with span("agent", agent=agent_name):
+                return run_llm_agent(agent_name, upstream_outputs, mark_ready)
+
+        def run_llm_agent(agent_name: str, upstream_outputs: dict, mark_ready) -> str:
+            role_description = AGENT_ROLES[agent_name]["description"]
+            # Token-budgeted prompt: most relevant sources first, upstream analyses compressed to key points
+            agent_context = build_source_context(agent_name, role_description, source_texts,
+                                                 always_include=(FRED_CONTEXT_KEY,))
+            # A failed upstream (e.g. LLM outage after retries) must not leak its error text into this prompt
+            usable_upstreams = {name: text for name, text in upstream_outputs.items() if not is_generation_failure(text)}
+            previous_insights = compress_insights(usable_upstreams)
+            logger.info(f"Prompt budget for {agent_name}: ~{estimate_tokens(agent_context)} context tokens, "
+                        f"~{estimate_tokens(previous_insights)} insight tokens.")
+            if not LLM_STREAMING_ENABLED:
+                _, analysis = self.run_agent_analysis(agent_name, role_description, agent_context, previous_insights)
+            else:
+                is_economist = agent_name == "disaster_economist"
+                marked = False
+
+                def on_progress(text_so_far: str):
+                    nonlocal marked, early_alert_sent
+                    if not marked and key_observations_complete(text_so_far):
+                        marked = True
+                        mark_ready(text_so_far) # Dependants can start from the key observations
+                    if is_economist and not early_alert_sent:
+                        headline = parse_headline(text_so_far)
+                        if headline:
+                            early_alert_sent = True
+                            if headline[0] in EARLY_ALERT_SEVERITIES:
+                                logger.info(f"Economist headline is {headline[0]}; sending early alert.")
+                                self._send_early_alert(*headline)
+
+                _, analysis = self.run_agent_analysis_streaming(agent_name, role_description, agent_context,
+                                                                previous_insights, cycle_id, on_progress,
+                                                                request_headline=is_economist)
+            if is_generation_failure(analysis):
+                failed_agents.append(agent_name)
+            else:
+                self.change_detector.remember_analysis(agent_name, analysis)
+            return analysis
+
+        # Independent agents run concurrently; cycle latency follows the DAG's critical path
+        dag_outputs = run_agent_dag(agent_dependencies, run_agent, AGENT_MAX_PARALLELISM)
+        agent_outputs = {name: dag_outputs[name] for name in agent_order}
 
         # Synthesize final summary and recommendation (could be a dedicated LLM call)
-        # For now, use disaster_economist's output as primary recommendation
-        # and a concatenation of all outputs as the summary.
+        # For now, use disaster_economist's output as primary recommendation;
+        # the summary is the per-agent outputs, stored once each and joined on read (compose_summary).
 
-        final_summary_parts = []
-        for agent_name, output_text in agent_outputs.items():
-            final_summary_parts.append(f"--- {agent_name.upper()} ANALYSIS ---\n{output_text}\n")
-        
-        final_summary = "\n".join(final_summary_parts)
+        final_summary = compose_summary(agent_outputs)
         
         recommendation = agent_outputs.get("disaster_economist", "No economic recommendation generated.")
-        
-        if not final_summary.strip() or not recommendation.strip():
-            logger.error("Failed to generate a comprehensive summary or recommendation.")
-            send_telegram_alert("Critical Error: Monitoring cycle completed but failed to generate summary/recommendation.")
-            return
+        generated = bool(final_summary.strip() and recommendation.strip()) and not is_generation_failure(recommendation)
 
-        # Store in DB
+        # End-of-cycle writes (source baselines, scenario, checkpoint cleanup) share one transaction and one commit
         try:
-            # Storing raw agent outputs as JSON string for review
-            agent_inputs_json = json.dumps(agent_outputs, indent=2)
-            store_scenario(final_summary, recommendation, agent_inputs_json)
+            with transaction():
+                if not failed_agents:
+                    self.change_detector.commit() # Otherwise the same changes are picked up again next cycle
+                # Agent outputs and the source texts they saw go to normalized, deduplicated tables
+                if generated and store_scenario(recommendation, agent_outputs, source_texts) is not None:
+                    # Stored for good: this cycle has nothing left to resume
+                    clear_agent_checkpoints(cycle_id, prune_before=time.time() - AGENT_CHECKPOINT_RETENTION_SECONDS)
         except Exception as e:
-            logger.error(f"Failed to store scenario in database: {e}", exc_info=True)
+            logger.error(f"Failed to store cycle results in database: {e}", exc_info=True)
             # Decide if this is critical enough to halt or just log
 
+        if not generated:
+            logger.error("Failed to generate a comprehensive summary or recommendation.")
+            self._send_alert("Critical Error: Monitoring cycle completed but failed to generate summary/recommendation.")
+            return
+
         # Send Telegram Alert
         alert_message = f"🚨 **New Disaster Monitor Scenario** 🚨\n\n**Economic Recommendation:**\n{recommendation[:800]}...\n\n[🔍 Check dashboard for full details](https://disastermon.streamlit.app)"
-        send_telegram_alert(alert_message)
+        self._send_alert(alert_message)
         
         logger.info("Monitoring cycle complete.")
         # logger.debug(f"Final Summary (snippet): {final_summary[:500]}...")
         # logger.debug(f"Recommendation (snippet): {recommendation[:500]}...")
 
+    def run_targeted_analysis(self, agent_names: list, matches: list):
+        """Fast path: analysis by `agent_names` only, on the triggering events plus the current snapshots.
+        Runs outside the regular cycle and leaves change detection untouched, so normal cycles are unaffected."""
+        with self._traced_cycle(uuid.uuid4().hex[:12], "fast_path"):
+            self._run_targeted_analysis(agent_names, matches)
+
+    def _run_targeted_analysis(self, agent_names: list, matches: list):
+        rules = ", ".join(dict.fromkeys(match.rule for match in matches))
+        logger.info(f"Fast-path analysis for {rules} with agents {agent_names}.")
+        source_texts = {TRIGGER_CONTEXT_KEY: format_trigger_matches(matches)}
+        source_texts.update({source: text for source, text in self.source_scheduler.store.source_texts().items()
+                             if not is_failed_source_text(text)})
+        # Dependencies outside the reduced set are dropped, e.g. the economist works from the seismologist alone
+        dependencies = {name: [dep for dep in AGENT_ROLES[name]["depends_on"] if dep in agent_names] for name in agent_names}
+
+        def run_agent(agent_name: str, upstream_outputs: dict, mark_ready) -> str:
+            role_description = AGENT_ROLES[agent_name]["description"]
+            agent_context = build_source_context(agent_name, role_description, source_texts,
+                                                 always_include=(TRIGGER_CONTEXT_KEY, FRED_CONTEXT_KEY))
+            usable_upstreams = {name: text for name, text in upstream_outputs.items() if not is_generation_failure(text)}
+            with span("agent", agent=agent_name):
+                _, analysis = self.run_agent_analysis(agent_name, role_description, agent_context,
+                                                      compress_insights(usable_upstreams))
+            return analysis
+
+        dag_outputs = run_agent_dag(dependencies, run_agent, AGENT_MAX_PARALLELISM)
+        agent_outputs = {name: dag_outputs[name] for name in topological_order(dependencies)}
+        recommendation = agent_outputs[list(agent_outputs)[-1]] # The most downstream agent (the economist when selected)
+        if is_generation_failure(recommendation):
+            logger.error(f"Fast-path analysis for {rules} produced no recommendation.")
+            return
+        try:
+            store_scenario(recommendation, agent_outputs, source_texts)
+        except Exception as e:
+            logger.error(f"Failed to store fast-path scenario in database: {e}", exc_info=True)
+        events = "\n".join(f"• {description}" for _, description in group_matches(matches)[:5])
+        self._send_alert(f"⚡ **Disaster Monitor Fast-Path Alert** ⚡\n\n**Trigger:** {rules}\n{events}\n\n"
+                         f"**Economic Recommendation:**\n{recommendation[:800]}...")
+
     def start_continuous_monitoring(self):
-        """Starts the monitoring loop."""
+        """Starts the monitoring loop.
+
+        Sources refresh on their own cadences in the background (SourceScheduler). Agent analysis runs on the
+        current snapshots whenever one of them changed, at most every ANALYSIS_MIN_INTERVAL_SECONDS, and at
+        least every MONITORING_CYCLE_INTERVAL_SECONDS on a fixed grid (cycle duration does not shift it).
+        """
         logger.info("Intelligent Disaster Monitor starting continuous monitoring...")
-        send_telegram_alert("📈 Intelligent Disaster Monitor activated. Starting monitoring cycles.")
+        if METRICS_PORT:
+            self.metrics_server = start_metrics_server()
+        snapshots = self.source_scheduler.store
+        self.source_scheduler.start()
+        # Goes out over the scheduler's session instead of blocking startup
+        self.source_scheduler.notify("📈 Intelligent Disaster Monitor activated. Starting monitoring cycles.")
+        if not snapshots.wait_until_complete(SOURCE_INITIAL_FILL_TIMEOUT_SECONDS):
+            logger.warning("Not every source has a snapshot yet; starting analysis with what is available.")
+
+        anchor = time.monotonic()
+        next_forced = anchor
+        analyzed_version = None
         while True:
+            version = snapshots.version
+            now = time.monotonic()
+            if version == analyzed_version and now < next_forced:
+                snapshots.wait_for_change(version, timeout=next_forced - now)
+                continue
+            started = now
+            analyzed_version = version
             try:
-                self.run_monitoring_cycle()
+                self.run_monitoring_cycle(snapshots.source_texts())
             except Exception as e:
                 logger.critical(f"Critical error in monitoring loop: {e}", exc_info=True)
-                send_telegram_alert(f"🆘 CRITICAL ERROR in Disaster Monitor: {e}. System may need attention.")
-            
-            logger.info(f"Next monitoring cycle in {MONITORING_CYCLE_INTERVAL_SECONDS} seconds.")
-            time.sleep(MONITORING_CYCLE_INTERVAL_SECONDS)
+                self._send_alert(f"🆘 CRITICAL ERROR in Disaster Monitor: {e}. System may need attention.")
+
+            next_forced = next_slot(anchor, MONITORING_CYCLE_INTERVAL_SECONDS, time.monotonic())
+            pause = started + ANALYSIS_MIN_INTERVAL_SECONDS - time.monotonic()
+            logger.info(f"Next analysis on fresh snapshots in >= {max(pause, 0):.0f}s; "
+                        f"scheduled one in {next_forced - time.monotonic():.0f}s.")
+            if pause > 0:
+                time.sleep(pause)
+
+    def shutdown(self):
+        """Releases long-lived resources (trigger worker, source scheduler, metrics endpoint, pooled browsers,
+        browser worker threads, the database connection)."""
+        self.trigger_engine.stop()
+        for message in self.pending_alerts: # Single-run mode: nothing else will send them
+            send_telegram_alert(message)
+        self.pending_alerts = []
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        self.source_scheduler.stop()
+        self.ingestor.close()
+        self.driver_pool.close()
+        close_db()
 
 def main():
     """Entry point for the agent system."""
+    monitor = None
     try:
         monitor = IntelligentMonitor()
         # For a single run:
         # monitor.run_monitoring_cycle()
         # For continuous monitoring:
         monitor.start_continuous_monitoring()
+    except KeyboardInterrupt:
+        logger.info("Disaster Monitor interrupted by user. Shutting down.")
     except Exception as e:
         logger.critical(f"Failed to initialize or start IntelligentMonitor: {e}", exc_info=True)
         # Attempt to send a startup failure alert if possible
@@ -178,6 +371,9 @@ def main():
             send_telegram_alert(f"🆘 CRITICAL STARTUP FAILURE for Disaster Monitor: {e}. System is DOWN.")
         except Exception as alert_e:
             logger.error(f"Failed to send startup failure alert: {alert_e}")
+    finally:
+        if monitor is not None:
+            monitor.shutdown()
 
 if __name__ == "__main__":
     # This allows running the agent system directly, e.g., in Docker or as a background service
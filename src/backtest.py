@@ -0,0 +1,186 @@
+# src/backtest.py
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import BACKTEST_PRICES_PATH, BACKTEST_HOLDING_DAYS, BACKTEST_MAX_WORKERS, BACKTEST_CHUNK_SIZE
+from src.database import load_scenario_recommendations
+from src.strategy_engine import DEFAULT_CAPITAL_FOR_ALERTS, score_recommendations
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ("close", "adj_close", "adj close", "price", "value") # First one present is used
+PRICE_FILE_EXTENSIONS = (".csv", ".parquet")
+
+class BacktestResult(NamedTuple):
+    trades: pd.DataFrame # One row per scenario: entry/exit dates, long/short/total P&L, return on capital
+    summary: dict
+
+def _read_price_file(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path) # Needs pyarrow or fastparquet
+    return pd.read_csv(path)
+
+def _price_column(frame: pd.DataFrame, path: str) -> str:
+    columns = {column.lower(): column for column in frame.columns}
+    for name in PRICE_COLUMNS:
+        if name in columns:
+            return columns[name]
+    raise ValueError(f"No price column ({', '.join(PRICE_COLUMNS)}) in {path}")
+
+def _date_column(frame: pd.DataFrame, path: str) -> str:
+    for column in frame.columns:
+        if column.lower() in ("date", "timestamp", "datetime"):
+            return column
+    raise ValueError(f"No date column in {path}")
+
+def load_prices(path: str = BACKTEST_PRICES_PATH) -> pd.DataFrame:
+    """Daily prices as a wide frame (sorted date index, one column per asset).
+
+    `path` is either one file — long format (date, asset/symbol, close) or already wide (date + one column
+    per asset) — or a directory with one file per asset named after it (e.g. `SPY.csv` with date, close).
+    """
+    if os.path.isdir(path):
+        series = {}
+        for name in sorted(os.listdir(path)):
+            asset, extension = os.path.splitext(name)
+            if extension.lower() not in PRICE_FILE_EXTENSIONS:
+                continue
+            file_path = os.path.join(path, name)
+            frame = _read_price_file(file_path)
+            dates = pd.to_datetime(frame[_date_column(frame, file_path)]).dt.normalize()
+            asset_prices = pd.Series(frame[_price_column(frame, file_path)].to_numpy(dtype=np.float64), index=dates)
+            series[asset] = asset_prices[~asset_prices.index.duplicated(keep="last")] # Repeated dates would break the alignment below
+        if not series:
+            raise ValueError(f"No price files ({', '.join(PRICE_FILE_EXTENSIONS)}) in {path}")
+        prices = pd.DataFrame(series)
+    else:
+        frame = _read_price_file(path)
+        date_column = _date_column(frame, path)
+        asset_column = next((c for c in frame.columns if c.lower() in ("asset", "symbol", "ticker")), None)
+        frame[date_column] = pd.to_datetime(frame[date_column]).dt.normalize()
+        if asset_column:
+            prices = frame.pivot_table(index=date_column, columns=asset_column, values=_price_column(frame, path), aggfunc="last")
+        else:
+            prices = frame.set_index(date_column).astype(np.float64)
+    prices = prices[~prices.index.duplicated(keep="last")].sort_index()
+    return prices.ffill() # Holidays of one market do not void the others' trades
+
+def _score_chunk(args: tuple) -> tuple:
+    texts, capital = args
+    matrix = score_recommendations(texts, capital)
+    return matrix.assets, matrix.long, matrix.short
+
+def score_in_parallel(texts: list, capital: float, max_workers: int = BACKTEST_MAX_WORKERS,
+                      chunk_size: int = BACKTEST_CHUNK_SIZE) -> tuple:
+    """(assets, long matrix, short matrix) for all `texts`; large batches are scored in worker processes."""
+    chunks = [(texts[i:i + chunk_size], capital) for i in range(0, len(texts), chunk_size)]
+    if max_workers <= 1 or len(chunks) <= 1:
+        results = [_score_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = list(executor.map(_score_chunk, chunks))
+    if not results:
+        return [], np.zeros((0, 0)), np.zeros((0, 0))
+    return results[0][0], np.vstack([r[1] for r in results]), np.vstack([r[2] for r in results])
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Largest peak-to-trough fall of a cumulative P&L curve (as a positive amount)."""
+    if not len(equity):
+        return 0.0
+    curve = np.concatenate(([0.0], equity))
+    return float(np.max(np.maximum.accumulate(curve) - curve))
+
+def run_backtest(prices: pd.DataFrame, scenarios: list, holding_days: int = BACKTEST_HOLDING_DAYS,
+                 capital: float = DEFAULT_CAPITAL_FOR_ALERTS, max_workers: int = BACKTEST_MAX_WORKERS) -> BacktestResult:
+    """Replays [(id, timestamp, recommendation)] through the strategy engine against `prices`.
+
+    Each scenario enters at the first close strictly after its (UTC) date — no look-ahead — and exits
+    `holding_days` trading days later. Longs earn the price change, shorts its opposite; assets without
+    prices over the window are left out of that trade.
+    """
+    ids = np.array([row[0] for row in scenarios], dtype=np.int64)
+    timestamps = pd.to_datetime([row[1] for row in scenarios]).normalize()
+    assets, long_alloc, short_alloc = score_in_parallel([row[2] or "" for row in scenarios], capital, max_workers)
+
+    price_matrix = prices.reindex(columns=assets).to_numpy(dtype=np.float64) # Unknown assets -> NaN column
+    dates = prices.index.to_numpy(dtype="datetime64[ns]")
+    entry_index = np.searchsorted(dates, timestamps.to_numpy(dtype="datetime64[ns]"), side="right")
+    exit_index = entry_index + holding_days
+    complete = exit_index < len(dates) # Scenarios too recent for a full holding period are skipped
+
+    entry_prices = np.full((len(ids), len(assets)), np.nan)
+    exit_prices = np.full((len(ids), len(assets)), np.nan)
+    entry_prices[complete] = price_matrix[entry_index[complete]]
+    exit_prices[complete] = price_matrix[exit_index[complete]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = exit_prices / entry_prices - 1
+    priced = np.isfinite(returns)
+    returns = np.where(priced, returns, 0.0)
+
+    long_pnl = (long_alloc * returns).sum(axis=1)
+    short_pnl = -(short_alloc * returns).sum(axis=1)
+    deployed = ((long_alloc + short_alloc) * priced).sum(axis=1)
+    pnl = long_pnl + short_pnl
+    traded = complete & (deployed > 0)
+
+    trades = pd.DataFrame({
+        "scenario_id": ids,
+        "timestamp": timestamps,
+        "entry_date": pd.to_datetime(np.where(complete, dates[np.minimum(entry_index, len(dates) - 1)], np.datetime64("NaT"))),
+        "exit_date": pd.to_datetime(np.where(complete, dates[np.minimum(exit_index, len(dates) - 1)], np.datetime64("NaT"))),
+        "deployed": deployed,
+        "long_pnl": long_pnl,
+        "short_pnl": short_pnl,
+        "pnl": pnl,
+        "return": np.divide(pnl, deployed, out=np.zeros_like(pnl), where=deployed > 0),
+        "traded": traded,
+    })
+
+    traded_pnl = pnl[traded]
+    equity = np.cumsum(traded_pnl)
+    missing_assets = [asset for asset in assets if asset not in prices.columns]
+    summary = {
+        "scenarios": int(len(ids)),
+        "traded": int(traded.sum()),
+        "total_pnl": float(traded_pnl.sum()),
+        "mean_return": float(trades.loc[traded, "return"].mean()) if traded.any() else 0.0,
+        "hit_rate": float((traded_pnl > 0).mean()) if traded.any() else 0.0,
+        "max_drawdown": max_drawdown(equity),
+        "holding_days": holding_days,
+        "assets_without_prices": missing_assets,
+    }
+    return BacktestResult(trades, summary)
+
+def backtest_stored_scenarios(prices_path: str = BACKTEST_PRICES_PATH, holding_days: int = BACKTEST_HOLDING_DAYS,
+                              capital: float = DEFAULT_CAPITAL_FOR_ALERTS, max_workers: int = BACKTEST_MAX_WORKERS) -> BacktestResult:
+    """Backtests every scenario in the database against the local price files."""
+    scenarios = load_scenario_recommendations()
+    prices = load_prices(prices_path)
+    logger.info(f"Backtesting {len(scenarios)} scenarios against {prices.shape[1]} assets "
+                f"({prices.index.min().date()} to {prices.index.max().date()}).")
+    return run_backtest(prices, scenarios, holding_days, capital, max_workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the simulated strategy over stored scenarios.")
+    parser.add_argument("--prices", default=BACKTEST_PRICES_PATH, help="Price CSV/Parquet file or directory")
+    parser.add_argument("--holding-days", type=int, default=BACKTEST_HOLDING_DAYS)
+    parser.add_argument("--capital", type=float, default=DEFAULT_CAPITAL_FOR_ALERTS)
+    parser.add_argument("--workers", type=int, default=BACKTEST_MAX_WORKERS)
+    parser.add_argument("--output", help="Optional CSV path for the per-scenario trades")
+    args = parser.parse_args()
+
+    result = backtest_stored_scenarios(args.prices, args.holding_days, args.capital, args.workers)
+    for key, value in result.summary.items():
+        print(f"{key}: {value}")
+    if args.output:
+        result.trades.to_csv(args.output, index=False)
+        print(f"Trades written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# src/change_detection.py
+import hashlib
+import json
+import logging
+import re
+import time
+
+from src.config import (AGENT_INPUT_SOURCES, CHANGE_SIMILARITY_THRESHOLD, CHANGE_MAX_REUSE_SECONDS,
+                        MINHASH_PERMUTATIONS, MINHASH_SHINGLE_SIZE)
+from src.database import (load_source_fingerprints, store_source_fingerprints, load_agent_analyses,
+                          store_agent_analysis)
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+def _permutation_params(num_perm: int) -> list[tuple[int, int]]:
+    """Deterministic (a, b) pairs for the universal hashes (a*x + b) mod p; stable across restarts."""
+    params = []
+    for i in range(num_perm):
+        digest = hashlib.sha256(f"minhash-{i}".encode()).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:16], "big") % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+_PERMUTATIONS = _permutation_params(MINHASH_PERMUTATIONS)
+
+def normalize_text(text: str) -> str:
+    """Lowercases and collapses whitespace so cosmetic changes do not alter the fingerprint."""
+    return " ".join(text.lower().split())
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def minhash_sketch(text: str, shingle_size: int = MINHASH_SHINGLE_SIZE) -> list[int]:
+    """MinHash signature over word shingles; the share of equal slots estimates Jaccard similarity."""
+    words = _WORD_RE.findall(text.lower())
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+def estimate_similarity(sketch_a: list[int], sketch_b: list[int]) -> float:
+    if not sketch_a or len(sketch_a) != len(sketch_b):
+        return 0.0
+    return sum(1 for x, y in zip(sketch_a, sketch_b) if x == y) / len(sketch_a)
+
+class ChangeDetector:
+    """Decides which agents must re-run by comparing each source's text with its stored baseline.
+
+    A source counts as materially changed when its normalized hash differs and its MinHash similarity
+    to the baseline drops below CHANGE_SIMILARITY_THRESHOLD. The baseline only moves on material changes,
+    so slow drift (e.g. rotating timestamps) still accumulates into a change eventually.
+    """
+    def __init__(self, similarity_threshold: float = CHANGE_SIMILARITY_THRESHOLD,
+                 max_reuse_seconds: float = CHANGE_MAX_REUSE_SECONDS):
+        self.similarity_threshold = similarity_threshold
+        self.max_reuse_seconds = max_reuse_seconds
+        self._pending_baselines = {}
+
+    def detect_changes(self, source_texts: dict, failed_sources: set = frozenset()) -> set:
+        """Returns the sources whose content materially changed.
+
+        New baselines are only persisted by `commit()`, once the agents depending on them succeeded.
+        Failed fetches are never treated as changes: re-analysing an error placeholder is wasted work.
+        """
+        baselines = load_source_fingerprints()
+        changed = set()
+        new_baselines = {}
+        for source, text in source_texts.items():
+            if source in failed_sources:
+                continue
+            new_hash = content_hash(text)
+            baseline = baselines.get(source)
+            if baseline and baseline[0] == new_hash:
+                continue
+            sketch = minhash_sketch(text)
+            if baseline:
+                similarity = estimate_similarity(sketch, json.loads(baseline[1]))
+                if similarity >= self.similarity_threshold:
+                    logger.info(f"Source {source} changed cosmetically (similarity {similarity:.2f}); ignoring.")
+                    continue
+                logger.info(f"Source {source} changed materially (similarity {similarity:.2f}).")
+            changed.add(source)
+            new_baselines[source] = (new_hash, json.dumps(sketch))
+        self._pending_baselines = new_baselines
+        return changed
+
+    def commit(self):
+        """Persists the baselines found by the last `detect_changes` call."""
+        if self._pending_baselines:
+            store_source_fingerprints(self._pending_baselines)
+            self._pending_baselines = {}
+
+    def plan_agents(self, agent_order: list, agent_upstreams: dict, changed_sources: set) -> tuple[set, dict]:
+        """Returns (agents to run, {agent: reusable analysis}) for the given order.
+
+        An agent re-runs when one of its AGENT_INPUT_SOURCES changed, an upstream agent re-runs,
+        or its stored analysis is missing or older than CHANGE_MAX_REUSE_SECONDS.
+        """
+        stored = load_agent_analyses()
+        now = time.time()
+        to_run = set()
+        reusable = {}
+        for agent_name in agent_order:
+            sources = AGENT_INPUT_SOURCES.get(agent_name) # None means every source
+            inputs_changed = bool(changed_sources) if sources is None else bool(changed_sources.intersection(sources))
+            upstream_changed = any(upstream in to_run for upstream in agent_upstreams.get(agent_name, ()))
+            previous = stored.get(agent_name)
+            too_old = previous is None or previous[1] is None or now - previous[1] > self.max_reuse_seconds
+            if inputs_changed or upstream_changed or too_old:
+                to_run.add(agent_name)
+            else:
+                reusable[agent_name] = previous[0]
+        return to_run, reusable
+
+    def remember_analysis(self, agent_name: str, analysis: str):
+        store_agent_analysis(agent_name, analysis)
@@ -10,56 +10,260 @@ GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 FRED_API_KEY = os.getenv('FRED_API_KEY')
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# API endpoints; overridable to point at a proxy or a local stand-in (benchmarks/bench_pipeline.py)
+FRED_API_BASE_URL = os.getenv('FRED_API_BASE_URL', 'https://api.stlouisfed.org').rstrip('/')
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org').rstrip('/')
+
+# Local state (database, caches, FRED store, learned site profiles)
+DATA_DIR = os.getenv('DISASTER_MONITOR_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', 'data'))
 
 # --- Database ---
 DATABASE_NAME = 'disaster_monitor.db'
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', DATABASE_NAME) # Store in data/ folder
+DATABASE_PATH = os.path.join(DATA_DIR, DATABASE_NAME)
+DATABASE_BUSY_TIMEOUT_MS = 5000 # How long a writer/reader waits on a lock before failing (WAL makes this rare)
 
 # --- Scraping ---
 HEADLESS_BROWSER = True # Set to False for debugging scraper
 SELENIUM_TIMEOUT = 90 # seconds to wait for page elements
+SELENIUM_POOL_SIZE = 3 # Max concurrent Chrome instances (caps peak memory)
+SELENIUM_MAX_PAGES_PER_DRIVER = 25 # Recycle a browser after this many page loads to contain leaks
+SELENIUM_DRIVER_IDLE_SECONDS = 4 * 3600 # Quit browsers unused for this long (keeps them warm across hourly cycles)
+SELENIUM_REAP_INTERVAL_SECONDS = 5 * 60 # How often the pool checks for idle browsers
+
+# Adaptive fetch planner: try plain `requests` first, fall back to Selenium when the static page is too thin
+SITE_PROFILES_PATH = os.path.join(DATA_DIR, 'site_profiles.json') # Learned per-site strategies
+STATIC_FETCH_MIN_TEXT_CHARS = 600 # Extracted text shorter than this means the page needs JavaScript
+STATIC_FETCH_REPROBE_EVERY = 24 # Re-try the static path for browser-bound sites every N fetches
 
 SCRAPING_URLS = {
-    "earthquake_usgs": "https://earthquake.usgs.gov/earthquakes/map/?extent=-85.22099,-175.78125&extent=85.22099,-20.03906", # More specific map view
-    "noaa_hurricanes": "https://www.nhc.noaa.gov/",
-    "noaa_weather_alerts": "https://www.weather.gov/alerts", # For US weather alerts
     "marketwatch_news": "https://www.marketwatch.com/latest-news",
     "investing_news": "https://www.investing.com/news/stock-market-news", # More specific news
     # Add more specific URLs, e.g., for Mississippi basin if available
     # "mississippi_flood_status": "https://water.weather.gov/ahps2/index.php?wfo=meg" # Example for a specific region
 }
 
+# Machine-readable event feeds (src/feeds.py), parsed into structured events instead of rendering the
+# USGS map / NOAA pages in a browser. Formats: "usgs_geojson", "cap_atom" (NWS alerts), "nhc_rss".
+FEED_SOURCES = {
+    "earthquake_usgs": {"url": "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/2.5_day.geojson", "format": "usgs_geojson"},
+    "noaa_hurricanes": {"url": "https://www.nhc.noaa.gov/index-at.xml", "format": "nhc_rss"},
+    "noaa_weather_alerts": {"url": "https://api.weather.gov/alerts/active.atom?status=actual", "format": "cap_atom"},
+}
+FEED_MIN_MAGNITUDE = 4.5 # Smaller quakes are dropped unless USGS flags them (PAGER alert, tsunami)
+FEED_MIN_SEVERITY = {"earthquake": "Minor", "alert": "Severe", "cyclone": "Minor"} # CAP scale: Minor < Moderate < Severe < Extreme
+FEED_MAX_EVENTS_PER_SOURCE = 25 # Most severe, then most recent, events listed for the agents
+FEED_SEEN_RETENTION_SECONDS = 14 * 24 * 3600 # Deduplication memory (the feeds cover at most a few days)
+
+# Every text source the agents see, in context order: structured feeds first, then scraped pages
+MONITORED_SOURCES = {**{name: feed["url"] for name, feed in FEED_SOURCES.items()}, **SCRAPING_URLS}
+
+# On-disk HTTP cache (requests + aiohttp paths). Honours ETag/Last-Modified and Cache-Control;
+# overrides (seconds) are keyed by source name, or "fred:<SERIES_ID>" for FRED series.
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, 'http_cache')
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024 # LRU eviction above this size
+HTTP_CACHE_DEFAULT_TTL_SECONDS = 0 # No explicit freshness from the server: always revalidate (cheap 304)
+HTTP_CACHE_TTL_OVERRIDES = {
+    "fred:GDP": 12 * 3600, # Quarterly series, published rarely
+    "fred:CPIAUCSL": 6 * 3600, # Monthly
+    "fred:FEDFUNDS": 6 * 3600, # Monthly
+}
+
+# Per-site readiness rules for Selenium (replace the old fixed 5s sleep). Types:
+#   "selector": wait until a CSS selector exists; "network_idle": no new resource loads for quiet_seconds;
+#   "dom_stable": element count/text length unchanged for quiet_seconds. Timeouts are in seconds.
+PAGE_READY_DEFAULT_RULE = {"type": "dom_stable", "quiet_seconds": 1.0, "timeout": 15}
+PAGE_READY_RULES = {
+    "marketwatch_news": {"type": "selector", "selector": "div.article__content, h3.article__headline", "timeout": 20},
+    "investing_news": {"type": "network_idle", "quiet_seconds": 1.0, "timeout": 20},
+}
+
+# HTML -> text extraction (src/extraction.py). Backend: "auto" picks the fastest installed parser
+# (selectolax > lxml > bs4). The first selector that matches is the content root; boilerplate inside it is dropped.
+EXTRACTION_BACKEND = os.getenv('EXTRACTION_BACKEND', 'auto').lower()
+EXTRACTION_MAX_CHARS = 1500 # Text kept per page; the tree walk stops once this much is collected
+CONTENT_SELECTORS = {
+    "marketwatch_news": ["div.collection__elements", "div.column--primary"],
+    "investing_news": ["#leftColumn", "section#leftColumn", "div.largeTitle"],
+}
+DEFAULT_CONTENT_SELECTORS = ["main", "article", "[role=main]", "#content", ".content", "body"]
+
+# Async ingestion (aiohttp): one keep-alive session per cycle shared by pages, FRED and Telegram
+HTTP_MAX_CONNECTIONS = 20 # Total open connections in the shared session
+HTTP_MAX_CONNECTIONS_PER_HOST = 2 # Politeness/concurrency limit per host
+HTTP_TIMEOUT_SECONDS = 30
+FRED_SERIES = ["GDP", "FEDFUNDS", "CPIAUCSL"] # CPIAUCSL: Consumer Price Index
+# Local FRED time-series store (memory-mapped .npy columns); each cycle only fetches observations since the last stored date
+FRED_STORE_DIR = os.path.join(DATA_DIR, 'fred')
+FRED_HISTORY_START = "2000-01-01" # First sync of a series backfills from here
+FRED_ZSCORE_WINDOW = 40 # Trailing observations for the z-score
+FRED_PROMPT_RECENT_OBSERVATIONS = 5 # Raw observations quoted in the prompt next to the derived metrics
+
 # --- LLM (Google Gemini) ---
+# Backend from the adapter registry in llm_adapter.py: "gemini" (real API), "fake" (deterministic local stub
+# for load tests/benchmarks) or "replay" (answers recorded from earlier runs). Only "gemini" needs GOOGLE_API_KEY.
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini').lower()
 GEMINI_MODEL_NAME = "gemini-1.5-flash" # Or other compatible models like gemini-1.5-flash
 GEMINI_TEMPERATURE = 0.3 # better for precise high value more "creative"
 GEMINI_MAX_OUTPUT_TOKENS = 2048
 
+# Request scheduler in front of the LLM: rate limits, retries, bounded concurrency, circuit breaker
+LLM_REQUESTS_PER_MINUTE = float(os.getenv('LLM_REQUESTS_PER_MINUTE', '15')) # Keep at or below the project's Gemini quota
+LLM_TOKENS_PER_MINUTE = 1_000_000 # Input + output tokens
+LLM_EXPECTED_OUTPUT_TOKENS = 1024 # Reserved per request on top of the prompt estimate
+LLM_MAX_CONCURRENCY = 4 # In-flight requests (streams hold their slot until done)
+LLM_MAX_RETRIES = 4 # Retries for 429/5xx/timeouts, with full-jitter exponential backoff
+LLM_RETRY_BASE_DELAY_SECONDS = 2
+LLM_RETRY_MAX_DELAY_SECONDS = 60
+LLM_CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive transient failures before requests are short-circuited
+LLM_CIRCUIT_RESET_SECONDS = 120 # Then one trial request is let through
+LLM_ACQUIRE_TIMEOUT_SECONDS = 300 # Max time a caller waits for quota/slots (backpressure) before failing
+
+# Offline backends
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv('FAKE_LLM_LATENCY_SECONDS', '0.5')) # Time to first token
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '80')) # Generation throughput after that
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv('FAKE_LLM_RESPONSE_TOKENS', '600')) # Approximate answer length
+LLM_REPLAY_PATH = os.getenv('LLM_REPLAY_PATH', os.path.join(DATA_DIR, 'llm_replay.jsonl'))
+LLM_RECORD_RESPONSES = os.getenv('LLM_RECORD', '').lower() in ('1', 'true', 'yes') # Append live answers to LLM_REPLAY_PATH
+
+# Persistent prompt/response cache (keyed on model, generation config and normalized prompt hash)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_BYPASS', '').lower() not in ('1', 'true', 'yes') # Set LLM_CACHE_BYPASS=1 to disable
+LLM_CACHE_PATH = os.path.join(DATA_DIR, 'llm_cache.db')
+LLM_CACHE_TTL_SECONDS = 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 2000 # LRU eviction above this
+
 # --- Agent System ---
+# Each agent declares the agents whose output it needs ("depends_on"). Agents without pending
+# dependencies run concurrently; an agent starts as soon as all of its dependencies finished.
 AGENT_ROLES = {
-    "climatologist": "Expert in atmospheric patterns, flood risks, and extreme weather, focusing on events with potential economic impact, especially in the Mississippi River Basin.",
-    "solar_specialist": "Expert in Coronal Mass Ejections (CME), solar flares, and their potential to disrupt communication, power grids, and financial systems.",
-    "seismologist": "Expert in earthquake risk, tectonic shifts, and real-time seismic alerts, assessing impact on infrastructure and economic activity.",
-    "insurance_analyst": "Models potential insurance claims, risk exposure, and reinsurance market impacts based on predicted disaster scenarios.",
-    "disaster_economist": "Evaluates macroeconomic impacts of disasters, predicts market reactions, supply chain disruptions, and likely central bank/government responses. Synthesizes all agent inputs into a final economic recommendation."
+    "climatologist": {
+        "description": "Expert in atmospheric patterns, flood risks, and extreme weather, focusing on events with potential economic impact, especially in the Mississippi River Basin.",
+        "depends_on": [],
+    },
+    "solar_specialist": {
+        "description": "Expert in Coronal Mass Ejections (CME), solar flares, and their potential to disrupt communication, power grids, and financial systems.",
+        "depends_on": [],
+    },
+    "seismologist": {
+        "description": "Expert in earthquake risk, tectonic shifts, and real-time seismic alerts, assessing impact on infrastructure and economic activity.",
+        "depends_on": [],
+    },
+    "insurance_analyst": {
+        "description": "Models potential insurance claims, risk exposure, and reinsurance market impacts based on predicted disaster scenarios.",
+        "depends_on": ["climatologist", "solar_specialist", "seismologist"],
+    },
+    "disaster_economist": {
+        "description": "Evaluates macroeconomic impacts of disasters, predicts market reactions, supply chain disruptions, and likely central bank/government responses. Synthesizes all agent inputs into a final economic recommendation.",
+        "depends_on": ["climatologist", "solar_specialist", "seismologist", "insurance_analyst"],
+    },
 }
+AGENT_MAX_PARALLELISM = 3 # Concurrent LLM calls while walking the agent DAG
+# Prompt size control: each agent gets the most relevant sources within a token budget, and upstream
+# analyses are compressed to key points, so prompts stay bounded as sources and agents are added
+AGENT_CONTEXT_TOKEN_BUDGET = 2500 # Real-time data block per agent
+AGENT_INSIGHTS_TOKEN_BUDGET = 1200 # Shared by all upstream agents' key points
+INSIGHT_MAX_POINTS_PER_AGENT = 6
+CHARS_PER_TOKEN = 4 # Rough estimate used for budgeting
+# Streaming: dependants start once an upstream agent finished its Key Observations (or wrote this many chars),
+# partial outputs are checkpointed to SQLite (final ones are resumed by the next cycle if it sends the same prompt),
+# and a HIGH-severity economist headline is alerted immediately
+LLM_STREAMING_ENABLED = True
+AGENT_EARLY_START_MIN_CHARS = 2500
+LLM_STREAM_CHECKPOINT_CHARS = 400 # Checkpoint partial output every N new characters
+AGENT_CHECKPOINT_RETENTION_SECONDS = 24 * 3600 # Checkpoints of cycles that never stored a scenario are pruned after this
+EARLY_ALERT_SEVERITIES = ["HIGH"]
+
+# Change detection: agents only re-run when the sources they depend on materially changed
+AGENT_INPUT_SOURCES = { # None = all sources; "fred_economic_data" is the FRED block
+    "climatologist": ["noaa_hurricanes", "noaa_weather_alerts"],
+    "solar_specialist": ["marketwatch_news", "investing_news"], # No dedicated space-weather feed yet
+    "seismologist": ["earthquake_usgs"],
+    "insurance_analyst": ["earthquake_usgs", "noaa_hurricanes", "noaa_weather_alerts"],
+    "disaster_economist": None,
+}
+CHANGE_SIMILARITY_THRESHOLD = 0.9 # MinHash Jaccard estimate at/above which a change is cosmetic
+CHANGE_MAX_REUSE_SECONDS = 6 * 3600 # Re-run an agent at least this often even if nothing changed
+MINHASH_PERMUTATIONS = 64
+MINHASH_SHINGLE_SIZE = 3 # Words per shingle
+
+# --- Backtesting (src/backtest.py) ---
+BACKTEST_PRICES_PATH = os.path.join(DATA_DIR, 'prices') # CSV/Parquet file or directory
+BACKTEST_HOLDING_DAYS = 5 # Trading days each scenario's allocation is held
+BACKTEST_MAX_WORKERS = os.cpu_count() or 1 # Processes scoring scenario chunks
+BACKTEST_CHUNK_SIZE = 2000 # Recommendations per worker task
+
+# --- Dashboard ---
+DASHBOARD_PAGE_SIZE = 20 # Scenarios per history page (keyset-paginated)
 
 # --- Logging ---
 LOGGING_LEVEL = logging.INFO
 LOGGING_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 # --- System ---
-MONITORING_CYCLE_INTERVAL_SECONDS = 3600 # 1 hour, adjust as needed
+MONITORING_CYCLE_INTERVAL_SECONDS = 3600 # Agent analysis runs at least this often (anchored, no drift)
+
+# Per-source scheduling (src/source_scheduler.py). Keys are MONITORED_SOURCES names or "fred:<SERIES_ID>".
+SOURCE_DEFAULT_REFRESH_SECONDS = 3600
+SOURCE_REFRESH_SECONDS = {
+    "earthquake_usgs": 2 * 60, # Hot feeds: minutes fresh (USGS regenerates its feeds every minute)
+    "noaa_weather_alerts": 10 * 60,
+    "noaa_hurricanes": 15 * 60,
+    "marketwatch_news": 15 * 60,
+    "investing_news": 15 * 60,
+    "fred:FEDFUNDS": 6 * 3600,
+    "fred:CPIAUCSL": 6 * 3600,
+    "fred:GDP": 24 * 3600, # Quarterly
+}
+SOURCE_REFRESH_JITTER = 0.1 # Each run is shifted by up to +/- this fraction of the interval (off the fixed grid)
+SOURCE_DEFAULT_DEADLINE_SECONDS = 180 # A fetch still running after this is abandoned and counted as failed
+SOURCE_DEADLINE_SECONDS = {
+    "earthquake_usgs": 60, # A feed download, not a page render
+    "noaa_weather_alerts": 60,
+    "noaa_hurricanes": 60,
+}
+SOURCE_RETRY_SECONDS = 120 # A failed fetch is retried this soon (never later than its normal interval)
+SNAPSHOT_MAX_AGE_SECONDS = 6 * 3600 # A failed fetch keeps serving the last good snapshot up to this age
+SOURCE_INITIAL_FILL_TIMEOUT_SECONDS = 600 # At startup, analysis waits this long for every source's first snapshot
+ANALYSIS_MIN_INTERVAL_SECONDS = 10 * 60 # Fresh snapshots trigger agent analysis at most this often
+
+# Event-driven fast path (src/triggers.py): cheap rules over newly ingested feed events and FRED observations.
+# A match launches an immediate analysis by the rule's agents only (their dependencies outside the list are skipped).
+# Rule keys: "kind" (earthquake/alert/cyclone/fred), "min_magnitude", "min_severity", "min_abs_zscore",
+# "min_abs_pct_change", "agents", optional "cooldown_seconds".
+TRIGGERS_ENABLED = os.getenv('TRIGGERS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+TRIGGER_RULES = [
+    {"name": "major_earthquake", "kind": "earthquake", "min_magnitude": 6.5,
+     "agents": ["seismologist", "insurance_analyst", "disaster_economist"]},
+    {"name": "earthquake_pager_alert", "kind": "earthquake", "min_severity": "Severe",
+     "agents": ["seismologist", "insurance_analyst", "disaster_economist"]},
+    {"name": "hurricane_advisory", "kind": "cyclone", "min_severity": "Severe",
+     "agents": ["climatologist", "insurance_analyst", "disaster_economist"]},
+    {"name": "extreme_weather_alert", "kind": "alert", "min_severity": "Extreme",
+     "agents": ["climatologist", "insurance_analyst", "disaster_economist"], "cooldown_seconds": 3 * 3600},
+    {"name": "fred_jump", "kind": "fred", "min_abs_zscore": 3.0, "agents": ["disaster_economist"]},
+]
+TRIGGER_COOLDOWN_SECONDS = 30 * 60 # Per rule, between two fast-path analyses
+TRIGGER_MAX_EVENT_AGE_SECONDS = 3 * 3600 # Older events (e.g. the backlog seen at first startup) never trigger
+
+# Tracing (src/telemetry.py): span latencies and LLM token counts, served Prometheus-style on /metrics
+# and stored per cycle in the cycle_timings table for the dashboard.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108')) # 0 disables the /metrics endpoint
+CYCLE_TIMINGS_RETENTION_DAYS = 30
 
 # --- Validation ---
 def validate_config():
     required_vars = {
-        "GOOGLE_API_KEY": GOOGLE_API_KEY,
         "FRED_API_KEY": FRED_API_KEY,
         "TELEGRAM_BOT_TOKEN": TELEGRAM_BOT_TOKEN,
         "TELEGRAM_CHAT_ID": TELEGRAM_CHAT_ID,
     }
+    if LLM_BACKEND == "gemini":
+        required_vars = {"GOOGLE_API_KEY": GOOGLE_API_KEY, **required_vars}
     missing = [key for key, value in required_vars.items() if not value]
-    if missing:
+    if missing and LLM_BACKEND != "gemini":
+        # Offline runs (fake/replay LLM): FRED and Telegram already degrade to "not available"/skipped
+        logging.warning(f"Running with LLM_BACKEND={LLM_BACKEND}; missing {', '.join(missing)} will be skipped.")
+    elif missing:
         msg = f"Missing critical environment variables: {', '.join(missing)}. Please check your .env file."
         logging.critical(msg)
         raise ValueError(msg)
@@ -69,9 +273,8 @@ logging.basicConfig(level=LOGGING_LEVEL, format=LOGGING_FORMAT)
 logger = logging.getLogger(__name__)
 
 # Ensure data directory exists
-data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-if not os.path.exists(data_dir):
-    os.makedirs(data_dir)
-    logger.info(f"Created data directory: {data_dir}")
+if not os.path.exists(DATA_DIR):
+    os.makedirs(DATA_DIR)
+    logger.info(f"Created data directory: {DATA_DIR}")
 
 validate_config()
@@ -0,0 +1,120 @@
+# src/context_builder.py
+import logging
+import math
+import re
+
+from src.config import (AGENT_INPUT_SOURCES, AGENT_CONTEXT_TOKEN_BUDGET, AGENT_INSIGHTS_TOKEN_BUDGET,
+                        CHARS_PER_TOKEN, INSIGHT_MAX_POINTS_PER_AGENT, AGENT_EARLY_START_MIN_CHARS)
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z]{4,}")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_HEADING_RE = re.compile(r"^\s*(?:\d+\.\s*)?\*\*(.+?)\*\*\s*:?\s*$") # e.g. "1.  **Key Observations:**"
+_PLACEHOLDER_RE = re.compile(r"^\[.*\]$")
+# Sections of generate_agent_prompt's output format that carry the most reusable signal, best first
+PRIORITY_SECTIONS = ("key observations", "economic & financial market implications", "probable scenarios")
+_STOPWORDS = {"with", "from", "that", "this", "their", "into", "based", "especially", "potential", "expert",
+              "focusing", "events", "likely", "final", "other", "inputs", "impact", "impacts"}
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return f"{cut} [...]"
+
+def role_terms(role_description: str) -> set:
+    return {word for word in _WORD_RE.findall(role_description.lower()) if word not in _STOPWORDS}
+
+def rank_sources(agent_name: str, role_description: str, source_texts: dict) -> list:
+    """Orders sources by relevance to an agent: declared inputs first, then by role-term overlap."""
+    declared = AGENT_INPUT_SOURCES.get(agent_name)
+    terms = role_terms(role_description)
+    scored = []
+    for source, text in source_texts.items():
+        words = _WORD_RE.findall(text.lower())
+        overlap = sum(1 for word in words if word in terms) / max(1, len(words))
+        is_declared = declared is None or source in declared
+        scored.append((is_declared, overlap, source))
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [source for _, _, source in scored]
+
+def build_source_context(agent_name: str, role_description: str, source_texts: dict,
+                         budget_tokens: int = AGENT_CONTEXT_TOKEN_BUDGET, always_include: tuple = ()) -> str:
+    """Assembles the data block of an agent's prompt within `budget_tokens`.
+
+    Sources are added in relevance order; the first ones get their full text while the budget lasts,
+    later ones are truncated and the rest dropped. `always_include` sources (small, e.g. FRED) are added first.
+    """
+    ranked = rank_sources(agent_name, role_description, source_texts)
+    ranked = [s for s in always_include if s in source_texts] + [s for s in ranked if s not in always_include]
+    parts = ["Collected Real-Time Data:\n"]
+    remaining = budget_tokens - estimate_tokens(parts[0])
+    dropped = []
+    for source in ranked:
+        header = f"--- {source.upper()} ---\n"
+        available = remaining - estimate_tokens(header)
+        if available < 50: # Not worth a header for a handful of words
+            dropped.append(source)
+            continue
+        body = _truncate_to_tokens(source_texts[source], available)
+        parts.append(f"{header}{body}\n")
+        remaining -= estimate_tokens(header) + estimate_tokens(body)
+    if dropped:
+        logger.debug(f"Context for {agent_name} dropped low-relevance sources: {dropped}")
+    return "\n".join(parts)
+
+def extract_key_points(analysis: str, max_points: int = INSIGHT_MAX_POINTS_PER_AGENT) -> list:
+    """Pulls bullet points out of an agent analysis, preferring the most informative sections."""
+    sections = {}
+    current = ""
+    for line in analysis.splitlines():
+        heading = _HEADING_RE.match(line)
+        if heading:
+            current = heading.group(1).strip().lower().rstrip(":")
+            continue
+        if _BULLET_RE.match(line):
+            point = _BULLET_RE.sub("", line).strip()
+            if point and not _PLACEHOLDER_RE.match(point):
+                sections.setdefault(current, []).append(point)
+
+    ordered = []
+    for wanted in PRIORITY_SECTIONS:
+        for name, points in sections.items():
+            if name.startswith(wanted):
+                ordered.extend(points)
+    for name, points in sections.items():
+        if not name.startswith(PRIORITY_SECTIONS):
+            ordered.extend(points)
+    if not ordered: # Unstructured answer: fall back to its first sentences
+        ordered = [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+", analysis) if sentence.strip()]
+    return ordered[:max_points]
+
+def key_observations_complete(partial_analysis: str, min_chars: int = AGENT_EARLY_START_MIN_CHARS) -> bool:
+    """True once a streaming analysis has moved past its first section (Key Observations),
+    or has at least `min_chars` of text when the model ignores the section layout."""
+    headings = sum(1 for line in partial_analysis.splitlines() if _HEADING_RE.match(line))
+    return headings >= 2 or len(partial_analysis) >= min_chars
+
+def compress_insights(upstream_outputs: dict, budget_tokens: int = AGENT_INSIGHTS_TOKEN_BUDGET) -> str:
+    """Turns full upstream analyses into per-agent key points sharing `budget_tokens`."""
+    if not upstream_outputs:
+        return ""
+    per_agent_budget = max(1, budget_tokens // len(upstream_outputs))
+    blocks = []
+    for name, analysis in upstream_outputs.items():
+        lines = [f"--- Key points from {name} ---"]
+        used = estimate_tokens(lines[0])
+        for point in extract_key_points(analysis):
+            bullet = f"- {_truncate_to_tokens(point, 60)}"
+            if used + estimate_tokens(bullet) > per_agent_budget:
+                break
+            lines.append(bullet)
+            used += estimate_tokens(bullet)
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
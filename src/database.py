@@ -1,37 +1,576 @@
 # src/database.py
+import hashlib
+import json
 import sqlite3
 import logging
-from src.config import DATABASE_PATH
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from src.config import DATABASE_PATH, DATABASE_BUSY_TIMEOUT_MS
+from src.telemetry import timed
 
 logger = logging.getLogger(__name__)
 
-def init_db():
-    """Initializes the database and creates tables if they don't exist."""
-    try:
-        with sqlite3.connect(DATABASE_PATH) as conn:
-            c = conn.cursor()
-            c.execute('''CREATE TABLE IF NOT EXISTS scenarios (
-                            id INTEGER PRIMARY KEY,
-                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                            summary TEXT,
-                            recommendation TEXT,
-                            agent_inputs TEXT
+# Schema history: each entry upgrades PRAGMA user_version by one. Never edit a released step; append a new one.
+MIGRATIONS = [
+    # 1: original scenario log
+    ['''CREATE TABLE IF NOT EXISTS scenarios (
+            id INTEGER PRIMARY KEY,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            summary TEXT,
+            recommendation TEXT,
+            agent_inputs TEXT
+        )'''],
+    # 2: change detection state (baseline fingerprint per source, last analysis per agent)
+    #    and partial (streaming) agent outputs, so an interrupted cycle still leaves its analysis behind
+    ['''CREATE TABLE IF NOT EXISTS source_fingerprints (
+            source TEXT PRIMARY KEY,
+            content_hash TEXT,
+            sketch TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )''',
+     '''CREATE TABLE IF NOT EXISTS agent_checkpoints (
+            cycle_id TEXT,
+            agent_name TEXT,
+            analysis TEXT,
+            is_final INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (cycle_id, agent_name)
+        )''',
+     '''CREATE TABLE IF NOT EXISTS agent_analyses (
+            agent_name TEXT PRIMARY KEY,
+            analysis TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )'''],
+    # 3: every scenario query orders by timestamp
+    ["CREATE INDEX IF NOT EXISTS idx_scenarios_timestamp ON scenarios(timestamp)"],
+    # 4: normalized agent outputs and source snapshots (see _normalize_scenarios)
+    lambda conn: _normalize_scenarios(conn),
+    # 5: full-text index over recommendations and agent outputs (see _create_search_index)
+    lambda conn: _create_search_index(conn),
+    # 6: feed events already ingested (id + version), so restarts do not replay them as new
+    ['''CREATE TABLE IF NOT EXISTS seen_events (
+            event_id TEXT PRIMARY KEY,
+            source TEXT,
+            updated TEXT,
+            seen_at REAL
+        )''',
+     "CREATE INDEX IF NOT EXISTS idx_seen_events_seen_at ON seen_events(seen_at)"],
+    # 7: per-cycle span timings (see src/telemetry.py), charted by the dashboard
+    ['''CREATE TABLE IF NOT EXISTS cycle_timings (
+            cycle_id TEXT,
+            kind TEXT,
+            started_at REAL,
+            span TEXT,
+            count INTEGER,
+            total_seconds REAL,
+            max_seconds REAL,
+            prompt_tokens INTEGER DEFAULT 0,
+            response_tokens INTEGER DEFAULT 0,
+            PRIMARY KEY (cycle_id, span)
+        )''',
+     "CREATE INDEX IF NOT EXISTS idx_cycle_timings_started_at ON cycle_timings(started_at)"],
+    # 8: agent checkpoints become compressed and keyed by prompt hash, so an interrupted cycle's final outputs
+    #    can be resumed (see load_final_checkpoint); the older rows were never read
+    ["DELETE FROM agent_checkpoints",
+     "ALTER TABLE agent_checkpoints ADD COLUMN input_hash TEXT",
+     "CREATE INDEX IF NOT EXISTS idx_agent_checkpoints_input ON agent_checkpoints(agent_name, input_hash)",
+     "CREATE INDEX IF NOT EXISTS idx_agent_checkpoints_updated_at ON agent_checkpoints(updated_at)"],
+]
+
+_lock = threading.RLock() # One writer at a time on the shared connection; re-entrant for nested transactions
+_conn = None
+_conn_key = None
+_tx_depth = 0
+_readonly = False # Set by use_readonly_connection() in processes that only read (the dashboard)
+
+def _open_connection(path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        # mode=ro never creates the file and leaves the journal mode (WAL, set by the agent system) alone
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False,
+                               timeout=DATABASE_BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA busy_timeout={int(DATABASE_BUSY_TIMEOUT_MS)}")
+        return conn
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=DATABASE_BUSY_TIMEOUT_MS / 1000)
+    # WAL lets the dashboard read while the agent system writes; NORMAL sync is durable enough under WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DATABASE_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+def get_connection(readonly: bool = None) -> sqlite3.Connection:
+    """Returns the process-wide connection, (re)opening it if DATABASE_PATH changed.
+
+    `readonly` defaults to the process mode (see use_readonly_connection); a read-only connection
+    never creates the database file nor changes its journal mode.
+    """
+    global _conn, _conn_key
+    readonly = _readonly if readonly is None else readonly
+    with _lock:
+        if _conn is None or _conn_key != (DATABASE_PATH, readonly):
+            if _conn is not None:
+                _conn.close()
+            _conn = _open_connection(DATABASE_PATH, readonly)
+            _conn_key = (DATABASE_PATH, readonly)
+        return _conn
+
+def use_readonly_connection():
+    """Switches this process to a read-only connection whose read errors propagate to the caller.
+
+    Meant for the dashboard, which must neither create nor migrate the agent system's database
+    and shows SQLite errors (locked, missing or unmigrated database) instead of empty results.
+    """
+    global _readonly
+    _readonly = True
+
+def _read_failed(what: str, e: sqlite3.Error):
+    """Logs a failed read; in read-only mode re-raises it so the dashboard can show it."""
+    if _readonly:
+        raise
+    logger.error(f"Error {what}: {e}", exc_info=True)
+
+def close_db():
+    """Closes the shared connection (checkpointing the WAL); the next call reopens it."""
+    global _conn, _conn_key
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+            _conn_key = None
+
+@contextmanager
+def transaction():
+    """Groups writes into one transaction on the shared connection.
+
+    Nested uses join the outermost transaction, which commits (or rolls back) once at the end,
+    so callers can batch several store_* calls into a single fsync. Each nested use is a savepoint:
+    a store_* call that fails (and logs) rolls back only its own writes, not the whole batch.
+    """
+    global _tx_depth
+    with _lock:
+        conn = get_connection()
+        _tx_depth += 1
+        savepoint = f"tx{_tx_depth}"
+        try:
+            if _tx_depth == 1:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN") # Explicit, so a nested savepoint never opens (and commits) it instead
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            yield conn
+            if _tx_depth == 1:
+                conn.commit()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        except BaseException:
+            if _tx_depth == 1:
+                conn.rollback()
+            elif conn.in_transaction:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        finally:
+            _tx_depth -= 1
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Applies pending MIGRATIONS (SQL lists or callables taking the connection) and returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        if callable(step):
+            step(conn)
+        else:
+            for statement in step:
+                conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+        logger.info(f"Database migrated to schema version {number}.")
+    return max(version, len(MIGRATIONS))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _put_blob(conn: sqlite3.Connection, text: str) -> str:
+    """Stores `text` zlib-compressed under its SHA-256 (once) and returns the hash."""
+    digest = content_hash(text)
+    conn.execute("INSERT OR IGNORE INTO content_blobs (hash, data, size) VALUES (?, ?, ?)",
+                 (digest, zlib.compress(text.encode("utf-8")), len(text)))
+    return digest
+
+def _get_blob(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+def _insert_scenario_rows(conn: sqlite3.Connection, scenario_id: int, agent_outputs: dict, source_texts: dict = None):
+    conn.executemany("INSERT INTO agent_outputs (scenario_id, agent_name, position, content_hash) VALUES (?, ?, ?, ?)",
+                     [(scenario_id, name, position, _put_blob(conn, text or ""))
+                      for position, (name, text) in enumerate(agent_outputs.items())])
+    if source_texts:
+        conn.executemany("INSERT INTO source_snapshots (scenario_id, source, content_hash) VALUES (?, ?, ?)",
+                         [(scenario_id, source, _put_blob(conn, text or "")) for source, text in source_texts.items()])
+
+def _normalize_scenarios(conn: sqlite3.Connection):
+    """Moves agent outputs out of the per-scenario JSON blob (and the summary that repeated it)
+    into compressed, content-addressed rows. Old rows keep their id, timestamp and recommendation."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS content_blobs (
+                        hash TEXT PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        size INTEGER
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS agent_outputs (
+                        scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+                        agent_name TEXT NOT NULL,
+                        position INTEGER,
+                        content_hash TEXT NOT NULL REFERENCES content_blobs(hash),
+                        PRIMARY KEY (scenario_id, agent_name)
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_outputs_agent ON agent_outputs(agent_name, scenario_id)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS source_snapshots (
+                        scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+                        source TEXT NOT NULL,
+                        content_hash TEXT NOT NULL REFERENCES content_blobs(hash),
+                        PRIMARY KEY (scenario_id, source)
+                    )''')
+    rows = conn.execute("SELECT id, summary, agent_inputs FROM scenarios "
+                        "WHERE summary IS NOT NULL OR agent_inputs IS NOT NULL").fetchall()
+    for scenario_id, summary, agent_inputs in rows:
+        try:
+            agent_outputs = json.loads(agent_inputs) if agent_inputs else {}
+        except ValueError:
+            agent_outputs = {}
+        if not isinstance(agent_outputs, dict) or not agent_outputs:
+            agent_outputs = {"summary": summary or agent_inputs or ""} # Unparseable legacy row: keep its text
+        _insert_scenario_rows(conn, scenario_id, {name: str(text) for name, text in agent_outputs.items()})
+    conn.execute("UPDATE scenarios SET summary = NULL, agent_inputs = NULL")
+    if rows:
+        logger.info(f"Normalized {len(rows)} legacy scenario(s) into agent_outputs.")
+
+def _has_search_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'scenario_fts'").fetchone() is not None
+
+def _index_scenario(conn: sqlite3.Connection, scenario_id: int, recommendation: str, agent_outputs: dict):
+    """Adds a scenario's texts to the full-text index (one document per agent, plus the recommendation
+    when it is not simply one of the agent outputs)."""
+    documents = [(scenario_id, agent_name, text) for agent_name, text in agent_outputs.items() if text]
+    if recommendation and recommendation not in agent_outputs.values():
+        documents.append((scenario_id, "recommendation", recommendation))
+    conn.executemany("INSERT INTO scenario_fts (scenario_id, source, body) VALUES (?, ?, ?)", documents)
+
+def _create_search_index(conn: sqlite3.Connection):
+    """FTS5 index ranked with BM25; `source` is the agent name or "recommendation". Backfills existing scenarios."""
+    try:
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS scenario_fts USING fts5(
+                            scenario_id UNINDEXED,
+                            source UNINDEXED,
+                            body,
+                            tokenize = 'porter unicode61 remove_diacritics 2'
                         )''')
-            conn.commit()
-        logger.info(f"Database initialized successfully at {DATABASE_PATH}")
+    except sqlite3.OperationalError as e: # SQLite built without FTS5: everything but search keeps working
+        logger.warning(f"Full-text search unavailable ({e}); scenario search is disabled.")
+        return
+    scenario_rows = conn.execute("SELECT id, recommendation FROM scenarios ORDER BY id").fetchall()
+    for scenario_id, recommendation in scenario_rows:
+        rows = conn.execute("SELECT o.agent_name, b.data FROM agent_outputs o JOIN content_blobs b ON b.hash = o.content_hash "
+                            "WHERE o.scenario_id = ? ORDER BY o.position", (scenario_id,)).fetchall()
+        _index_scenario(conn, scenario_id, recommendation, {agent_name: _get_blob(data) for agent_name, data in rows})
+    if scenario_rows:
+        logger.info(f"Indexed {len(scenario_rows)} existing scenario(s) for full-text search.")
+
+_SEARCH_TERM_RE = re.compile(r'"([^"]+)"|(\w+)')
+
+def to_fts_query(text: str) -> str:
+    """Turns free text into an FTS5 query: every word (or "quoted phrase") must appear, operators are not interpreted."""
+    terms = []
+    for phrase, word in _SEARCH_TERM_RE.findall(text):
+        term = " ".join(re.findall(r"\w+", phrase)) if phrase else word
+        if term:
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+def compose_summary(agent_outputs: dict) -> str:
+    """The per-agent analyses as one text, in the format scenarios used to store as `summary`."""
+    return "\n".join(f"--- {agent_name.upper()} ANALYSIS ---\n{output_text}\n" for agent_name, output_text in agent_outputs.items())
+
+def init_db():
+    """Initializes the database and applies pending schema migrations."""
+    try:
+        with transaction() as conn:
+            version = migrate(conn)
+        logger.info(f"Database initialized successfully at {DATABASE_PATH} (schema version {version})")
     except sqlite3.Error as e:
         logger.error(f"Database initialization error: {e}", exc_info=True)
         raise
 
-def store_scenario(summary: str, recommendation: str, agent_inputs: str):
-    """Stores a new scenario in the database."""
+@timed("db.write", op="store_scenario")
+def store_scenario(recommendation: str, agent_outputs: dict, source_texts: dict = None) -> int:
+    """Stores a new scenario (recommendation, each agent's output and the source texts it saw); returns its id.
+
+    Texts are kept once per distinct content, compressed, so unchanged sources or reused agent
+    analyses add only a row of references per cycle.
+    """
     try:
-        with sqlite3.connect(DATABASE_PATH) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO scenarios (summary, recommendation, agent_inputs) VALUES (?, ?, ?)",
-                      (summary, recommendation, agent_inputs))
-            conn.commit()
+        with transaction() as conn:
+            cur = conn.execute("INSERT INTO scenarios (recommendation) VALUES (?)", (recommendation,))
+            _insert_scenario_rows(conn, cur.lastrowid, agent_outputs, source_texts)
+            if _has_search_index(conn):
+                _index_scenario(conn, cur.lastrowid, recommendation, agent_outputs)
         logger.info("New scenario stored in the database.")
+        return cur.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error storing scenario in DB: {e}", exc_info=True)
         # Optionally, re-raise or handle gracefully
+
+def get_latest_scenario_id() -> int:
+    """Id of the newest scenario (None if there is none). Cheap enough to call on every dashboard rerun."""
+    try:
+        with _lock:
+            return get_connection().execute("SELECT MAX(id) FROM scenarios").fetchone()[0]
+    except sqlite3.Error as e:
+        _read_failed("loading latest scenario id", e)
+        return None
+
+def list_scenarios(limit: int = 20, before_id: int = None, preview_chars: int = 200) -> list:
+    """One page of scenarios, newest first, without the heavy text columns.
+
+    Keyset pagination: pass the last id of a page as `before_id` to get the next (older) page,
+    so every page costs the same regardless of how deep into the history it is.
+    Returns [{"id", "timestamp", "preview"}], where preview is the start of the recommendation.
+    """
+    query = "SELECT id, timestamp, substr(recommendation, 1, ?) FROM scenarios"
+    params = [preview_chars]
+    if before_id is not None:
+        query += " WHERE id < ?"
+        params.append(before_id)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    try:
+        with _lock:
+            rows = get_connection().execute(query, params).fetchall()
+        return [{"id": scenario_id, "timestamp": timestamp, "preview": preview} for scenario_id, timestamp, preview in rows]
+    except sqlite3.Error as e:
+        _read_failed("listing scenarios", e)
+        return []
+
+def load_scenario_recommendations(after_id: int = None) -> list:
+    """[(id, timestamp, recommendation)] in id order (optionally only after `after_id`), for batch replays."""
+    query = "SELECT id, timestamp, recommendation FROM scenarios"
+    params = []
+    if after_id is not None:
+        query += " WHERE id > ?"
+        params.append(after_id)
+    try:
+        with _lock:
+            return get_connection().execute(query + " ORDER BY id", params).fetchall()
+    except sqlite3.Error as e:
+        _read_failed("loading scenario recommendations", e)
+        return []
+
+def get_scenario(scenario_id: int) -> dict:
+    """Detail of one scenario ({"id", "timestamp", "recommendation"}), or None; agent outputs via load_agent_outputs."""
+    try:
+        with _lock:
+            row = get_connection().execute("SELECT id, timestamp, recommendation FROM scenarios WHERE id = ?",
+                                           (scenario_id,)).fetchone()
+        return None if row is None else {"id": row[0], "timestamp": row[1], "recommendation": row[2]}
+    except sqlite3.Error as e:
+        _read_failed(f"loading scenario {scenario_id}", e)
+        return None
+
+def search_scenarios(query: str, limit: int = 20) -> list:
+    """Full-text search over recommendations and agent outputs, best BM25 match first.
+
+    Returns one entry per scenario: [{"id", "timestamp", "source", "snippet", "rank"}], where source is
+    the agent (or "recommendation") whose text matched best and snippet marks the hits with [brackets].
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return []
+    try:
+        with _lock:
+            conn = get_connection()
+            if not _has_search_index(conn):
+                return []
+            # Rank first (cheap), then build snippets and fetch timestamps only for the documents shown
+            ranked = conn.execute("SELECT rowid, scenario_id, source, rank FROM scenario_fts WHERE scenario_fts MATCH ? "
+                                  "ORDER BY rank LIMIT ?", (fts_query, limit * 5)).fetchall() # Several documents per scenario may match
+            best = {}
+            for rowid, scenario_id, source, rank in ranked:
+                if scenario_id not in best and len(best) < limit:
+                    best[scenario_id] = (rowid, source, rank)
+            if not best:
+                return []
+            rowids = [rowid for rowid, _, _ in best.values()]
+            marks = ",".join("?" * len(best))
+            snippets = dict(conn.execute(f"SELECT rowid, snippet(scenario_fts, 2, '[', ']', ' … ', 16) FROM scenario_fts "
+                                         f"WHERE scenario_fts MATCH ? AND rowid IN ({marks})", [fts_query, *rowids]).fetchall())
+            timestamps = dict(conn.execute(f"SELECT id, timestamp FROM scenarios WHERE id IN ({marks})", list(best)).fetchall())
+    except sqlite3.Error as e:
+        _read_failed(f"searching scenarios for {query!r}", e)
+        return []
+    return [{"id": scenario_id, "timestamp": timestamps.get(scenario_id), "source": source,
+             "snippet": snippets.get(rowid, ""), "rank": rank}
+            for scenario_id, (rowid, source, rank) in best.items()]
+
+def load_agent_outputs(scenario_id: int) -> dict:
+    """Returns {agent_name: output} for one scenario, in the order the agents were stored."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT o.agent_name, b.data FROM agent_outputs o "
+                                            "JOIN content_blobs b ON b.hash = o.content_hash "
+                                            "WHERE o.scenario_id = ? ORDER BY o.position", (scenario_id,)).fetchall()
+        return {agent_name: _get_blob(data) for agent_name, data in rows}
+    except sqlite3.Error as e:
+        _read_failed(f"loading agent outputs of scenario {scenario_id}", e)
+        return {}
+
+def load_agent_history(agent_name: str, limit: int = 20) -> list:
+    """Returns [(scenario_id, timestamp, output)] for one agent, newest first, without touching other agents."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT s.id, s.timestamp, b.data FROM agent_outputs o "
+                                            "JOIN scenarios s ON s.id = o.scenario_id "
+                                            "JOIN content_blobs b ON b.hash = o.content_hash "
+                                            "WHERE o.agent_name = ? ORDER BY o.scenario_id DESC LIMIT ?",
+                                            (agent_name, limit)).fetchall()
+        return [(scenario_id, timestamp, _get_blob(data)) for scenario_id, timestamp, data in rows]
+    except sqlite3.Error as e:
+        _read_failed(f"loading history of agent {agent_name}", e)
+        return []
+
+def load_source_snapshots(scenario_id: int) -> dict:
+    """Returns {source: text} as collected for one scenario."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT s.source, b.data FROM source_snapshots s "
+                                            "JOIN content_blobs b ON b.hash = s.content_hash "
+                                            "WHERE s.scenario_id = ? ORDER BY s.source", (scenario_id,)).fetchall()
+        return {source: _get_blob(data) for source, data in rows}
+    except sqlite3.Error as e:
+        _read_failed(f"loading source snapshots of scenario {scenario_id}", e)
+        return {}
+
+def load_source_fingerprints() -> dict:
+    """Returns {source: (content_hash, sketch_json)} for every fingerprinted source."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT source, content_hash, sketch FROM source_fingerprints").fetchall()
+        return {source: (content_hash, sketch) for source, content_hash, sketch in rows}
+    except sqlite3.Error as e:
+        _read_failed("loading source fingerprints", e)
+        return {}
+
+@timed("db.write", op="store_source_fingerprints")
+def store_source_fingerprints(fingerprints: dict):
+    """Upserts {source: (content_hash, sketch_json)}."""
+    try:
+        with transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO source_fingerprints (source, content_hash, sketch, updated_at) "
+                             "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+                             [(source, content_hash, sketch) for source, (content_hash, sketch) in fingerprints.items()])
+    except sqlite3.Error as e:
+        logger.error(f"Error storing source fingerprints: {e}", exc_info=True)
+
+def load_agent_analyses() -> dict:
+    """Returns {agent_name: (analysis, updated_at as unix seconds)} for the last stored analysis of each agent."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT agent_name, analysis, CAST(strftime('%s', updated_at) AS INTEGER) "
+                                            "FROM agent_analyses").fetchall()
+        return {agent_name: (analysis, updated_at) for agent_name, analysis, updated_at in rows}
+    except sqlite3.Error as e:
+        _read_failed("loading agent analyses", e)
+        return {}
+
+@timed("db.write", op="store_agent_analysis")
+def store_agent_analysis(agent_name: str, analysis: str):
+    """Keeps the latest analysis of an agent so unchanged inputs can reuse it."""
+    try:
+        with transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO agent_analyses (agent_name, analysis, updated_at) "
+                         "VALUES (?, ?, CURRENT_TIMESTAMP)", (agent_name, analysis))
+    except sqlite3.Error as e:
+        logger.error(f"Error storing analysis for agent {agent_name}: {e}", exc_info=True)
+
+@timed("db.write", op="checkpoint_agent_output")
+def checkpoint_agent_output(cycle_id: str, agent_name: str, analysis: str, input_hash: str = None, is_final: bool = False):
+    """Upserts the (partial or final) streamed output of an agent for the given cycle, zlib-compressed.
+    `input_hash` identifies the prompt it answers, so a final output can be resumed by a later cycle."""
+    try:
+        with transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO agent_checkpoints (cycle_id, agent_name, analysis, input_hash, is_final, "
+                         "updated_at) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                         (cycle_id, agent_name, zlib.compress(analysis.encode("utf-8")), input_hash, int(is_final)))
+    except sqlite3.Error as e:
+        logger.error(f"Error checkpointing output of agent {agent_name}: {e}", exc_info=True)
+
+def load_final_checkpoint(agent_name: str, input_hash: str) -> str:
+    """Final output of `agent_name` for the same prompt, left by a cycle that never stored its scenario, or None."""
+    try:
+        with _lock:
+            row = get_connection().execute("SELECT analysis FROM agent_checkpoints "
+                                           "WHERE agent_name = ? AND input_hash = ? AND is_final = 1 "
+                                           "ORDER BY updated_at DESC LIMIT 1", (agent_name, input_hash)).fetchone()
+        return None if row is None else _get_blob(row[0])
+    except sqlite3.Error as e:
+        _read_failed(f"loading checkpoint of agent {agent_name}", e)
+        return None
+
+@timed("db.write", op="clear_agent_checkpoints")
+def clear_agent_checkpoints(cycle_id: str, prune_before: float = None):
+    """Drops the checkpoints of a cycle whose scenario is stored, and any written before `prune_before` (unix seconds)."""
+    try:
+        with transaction() as conn:
+            conn.execute("DELETE FROM agent_checkpoints WHERE cycle_id = ?", (cycle_id,))
+            if prune_before is not None:
+                conn.execute("DELETE FROM agent_checkpoints WHERE updated_at < datetime(?, 'unixepoch')", (prune_before,))
+    except sqlite3.Error as e:
+        logger.error(f"Error clearing checkpoints of cycle {cycle_id}: {e}", exc_info=True)
+
+def load_seen_events(since: float) -> dict:
+    """Returns {event_id: updated} for feed events seen at or after `since` (unix seconds)."""
+    try:
+        with _lock:
+            rows = get_connection().execute("SELECT event_id, updated FROM seen_events WHERE seen_at >= ?", (since,)).fetchall()
+        return dict(rows)
+    except sqlite3.Error as e:
+        _read_failed("loading seen feed events", e)
+        return {}
+
+@timed("db.write", op="store_seen_events")
+def store_seen_events(events: list, seen_at: float, prune_before: float = None):
+    """Upserts [(event_id, source, updated)] and drops entries last seen before `prune_before`."""
+    try:
+        with transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO seen_events (event_id, source, updated, seen_at) VALUES (?, ?, ?, ?)",
+                             [(event_id, source, updated, seen_at) for event_id, source, updated in events])
+            if prune_before is not None:
+                conn.execute("DELETE FROM seen_events WHERE seen_at < ?", (prune_before,))
+    except sqlite3.Error as e:
+        logger.error(f"Error storing seen feed events: {e}", exc_info=True)
+
+def store_cycle_timings(cycle_id: str, kind: str, started_at: float, rows: list, prune_before: float = None):
+    """Stores the span totals of one cycle: [(span, count, total_seconds, max_seconds, prompt_tokens, response_tokens)]."""
+    try:
+        with transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO cycle_timings (cycle_id, kind, started_at, span, count, total_seconds, "
+                             "max_seconds, prompt_tokens, response_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(cycle_id, kind, started_at, *row) for row in rows])
+            if prune_before is not None:
+                conn.execute("DELETE FROM cycle_timings WHERE started_at < ?", (prune_before,))
+    except sqlite3.Error as e:
+        logger.error(f"Error storing timings of cycle {cycle_id}: {e}", exc_info=True)
+
+def load_cycle_timings(limit_cycles: int = 30) -> list:
+    """Span rows of the most recent `limit_cycles` cycles, oldest first: dicts with the cycle_timings columns."""
+    columns = ("cycle_id", "kind", "started_at", "span", "count", "total_seconds", "max_seconds",
+               "prompt_tokens", "response_tokens")
+    try:
+        with _lock:
+            rows = get_connection().execute(
+                f"SELECT {', '.join(columns)} FROM cycle_timings WHERE cycle_id IN "
+                "(SELECT cycle_id FROM cycle_timings GROUP BY cycle_id ORDER BY MAX(started_at) DESC LIMIT ?) "
+                "ORDER BY started_at, span", (limit_cycles,)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+    except sqlite3.Error as e:
+        _read_failed("loading cycle timings", e)
+        return []
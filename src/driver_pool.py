@@ -0,0 +1,173 @@
+# src/driver_pool.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config import (SELENIUM_POOL_SIZE, SELENIUM_MAX_PAGES_PER_DRIVER, SELENIUM_DRIVER_IDLE_SECONDS,
+                        SELENIUM_REAP_INTERVAL_SECONDS)
+from src.scraper import get_selenium_driver
+
+logger = logging.getLogger(__name__)
+
+class _PooledDriver:
+    """A WebDriver plus the bookkeeping the pool needs to decide when to recycle it."""
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.last_used = time.monotonic()
+
+class SeleniumDriverPool:
+    """Bounded pool of warm Chrome instances shared by the scraping threads.
+
+    At most `max_size` browsers are alive at once; callers block in `lease()` until one is free.
+    Drivers are recycled after `max_pages` page loads or as soon as a lease ends with an error.
+    Drivers idle for longer than `idle_seconds` are quit by a background reaper (started with the first
+    browser) even when no lease ever happens again, e.g. once every site has moved to static fetching.
+    """
+    def __init__(self, max_size: int = SELENIUM_POOL_SIZE,
+                 max_pages: int = SELENIUM_MAX_PAGES_PER_DRIVER,
+                 idle_seconds: float = SELENIUM_DRIVER_IDLE_SECONDS,
+                 reap_interval: float = SELENIUM_REAP_INTERVAL_SECONDS):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.idle_seconds = idle_seconds
+        self.reap_interval = min(reap_interval, idle_seconds)
+        self._idle = [] # LIFO so the warmest driver is reused first
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._reaper = None
+        self._stopping = threading.Event()
+
+    @property
+    def size(self) -> int:
+        with self._cond:
+            return len(self._idle) + self._in_use
+
+    def _is_healthy(self, pooled: _PooledDriver) -> bool:
+        """Cheap liveness probe: any round-trip to chromedriver fails if the browser died."""
+        try:
+            pooled.driver.execute_script("return 1;")
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled WebDriver failed health check, discarding it: {e}")
+            return False
+
+    def _quit(self, pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error while quitting WebDriver: {e}")
+
+    def _reap_idle_locked(self) -> list:
+        """Removes drivers idle for too long. Must be called with the lock held; returns drivers to quit."""
+        now = time.monotonic()
+        expired = [p for p in self._idle if now - p.last_used > self.idle_seconds]
+        if expired:
+            self._idle = [p for p in self._idle if p not in expired]
+            logger.info(f"Closing {len(expired)} idle WebDriver(s).")
+        return expired
+
+    def reap_idle(self) -> int:
+        """Quits drivers idle for longer than `idle_seconds`; returns how many were closed."""
+        with self._cond:
+            expired = self._reap_idle_locked()
+        for stale in expired:
+            self._quit(stale)
+        return len(expired)
+
+    def _reap_periodically(self):
+        while not self._stopping.wait(self.reap_interval):
+            self.reap_idle()
+
+    def _start_reaper_locked(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_periodically, name="driver-reaper", daemon=True)
+            self._reaper.start()
+
+    def _acquire(self) -> _PooledDriver:
+        while True:
+            expired = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("SeleniumDriverPool is closed.")
+                    expired.extend(self._reap_idle_locked())
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        self._in_use += 1
+                        create = False
+                        break
+                    if self._in_use < self.max_size:
+                        pooled = None
+                        self._in_use += 1
+                        create = True
+                        self._start_reaper_locked()
+                        break
+                    self._cond.wait()
+            # Browser start/stop and health checks happen outside the lock
+            for stale in expired:
+                self._quit(stale)
+            if create:
+                try:
+                    logger.info("Starting a new pooled Selenium WebDriver.")
+                    return _PooledDriver(get_selenium_driver())
+                except Exception:
+                    self._release_slot()
+                    raise
+            if self._is_healthy(pooled):
+                return pooled
+            self._quit(pooled)
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _release(self, pooled: _PooledDriver, broken: bool):
+        pooled.pages_served += 1
+        pooled.last_used = time.monotonic()
+        recycle = broken or pooled.pages_served >= self.max_pages
+        with self._cond:
+            self._in_use -= 1
+            if not recycle and not self._closed:
+                self._idle.append(pooled)
+            expired = self._reap_idle_locked()
+            self._cond.notify()
+        if recycle:
+            reason = "after an error" if broken else f"after {pooled.pages_served} pages"
+            logger.info(f"Recycling pooled WebDriver {reason}.")
+            self._quit(pooled)
+        elif self._closed:
+            self._quit(pooled)
+        for stale in expired:
+            self._quit(stale)
+
+    @contextmanager
+    def lease(self):
+        """Borrows a driver for the duration of the `with` block.
+
+        Any exception raised inside the block marks the driver as broken so it is quit instead of reused.
+        """
+        pooled = self._acquire()
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    def close(self):
+        """Quits every idle driver and refuses new leases. Leased drivers are quit when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        self._stopping.set()
+        for pooled in idle:
+            self._quit(pooled)
+        logger.info("Selenium driver pool closed.")
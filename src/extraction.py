@@ -0,0 +1,165 @@
+# src/extraction.py
+import logging
+import re
+
+from src.config import EXTRACTION_BACKEND, EXTRACTION_MAX_CHARS, CONTENT_SELECTORS, DEFAULT_CONTENT_SELECTORS
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError: # Optional C parser (fastest)
+    LexborHTMLParser = None
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError: # Optional C parser; CSS selectors need cssselect
+    lxml = None
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+# Elements that never carry the page's main content
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "nav", "footer",
+                    "aside", "form", "button", "select")
+# <header> is site chrome at page level, but holds the headline inside these
+CONTENT_TAGS = ("article", "main")
+# class/id fragments of navigation chrome, consent banners, share widgets and ads
+BOILERPLATE_ATTR_RE = re.compile(r"cookie|consent|banner|newsletter|subscribe|share|social|menu|breadcrumb|"
+                                 r"advert|(^|[-_ ])ads?([-_ ]|$)|promo|popup|modal|sidebar|footer|(^|[-_ ])nav", re.I)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def _is_boilerplate_attr(class_value: str, id_value: str) -> bool:
+    return bool(BOILERPLATE_ATTR_RE.search(f"{class_value or ''} {id_value or ''}"))
+
+def _is_boilerplate_tag(tag: str, in_content: bool) -> bool:
+    return tag in BOILERPLATE_TAGS or (tag == "header" and not in_content)
+
+def _collect(fragments, max_length: int) -> str:
+    """Joins text fragments until `max_length` characters, then stops pulling from the (lazy) iterator.
+    Whitespace is collapsed and repeated fragments (e.g. "Read more") are kept once."""
+    parts = []
+    seen = set()
+    length = 0
+    for fragment in fragments:
+        fragment = _WHITESPACE_RE.sub(" ", fragment).strip()
+        if not fragment or fragment in seen:
+            continue
+        seen.add(fragment)
+        parts.append(fragment)
+        length += len(fragment) + 1
+        if length >= max_length:
+            break # Early exit: the rest of the document is never walked
+    return " ".join(parts)[:max_length]
+
+class SelectolaxExtractor:
+    name = "selectolax"
+
+    def extract(self, html_content: str, selectors: list, max_length: int) -> str:
+        tree = LexborHTMLParser(html_content)
+        root = next((node for node in (tree.css_first(s) for s in selectors) if node is not None), None) or tree.body
+        if root is None:
+            return ""
+        return _collect(self._texts(root, self._in_content(root)), max_length)
+
+    @staticmethod
+    def _in_content(node) -> bool:
+        while node is not None:
+            if node.tag in CONTENT_TAGS:
+                return True
+            node = node.parent
+        return False
+
+    def _texts(self, node, in_content: bool):
+        for child in node.iter(include_text=True):
+            if child.tag == "-text":
+                yield child.text_content or ""
+            elif not _is_boilerplate_tag(child.tag, in_content) and not child.tag.startswith(("-", "!")):
+                attributes = child.attributes
+                if not _is_boilerplate_attr(attributes.get("class"), attributes.get("id")):
+                    yield from self._texts(child, in_content or child.tag in CONTENT_TAGS)
+
+class LxmlExtractor:
+    name = "lxml"
+
+    def __init__(self):
+        self._selectors = {}
+
+    def _css(self, selector: str):
+        if selector not in self._selectors:
+            self._selectors[selector] = CSSSelector(selector)
+        return self._selectors[selector]
+
+    def extract(self, html_content: str, selectors: list, max_length: int) -> str:
+        document = lxml.html.document_fromstring(html_content)
+        root = None
+        for selector in selectors:
+            matches = self._css(selector)(document)
+            if matches:
+                root = matches[0]
+                break
+        if root is None:
+            root = document.find("body") if document.find("body") is not None else document
+        in_content = any(element.tag in CONTENT_TAGS for element in root.iterancestors()) or root.tag in CONTENT_TAGS
+        return _collect(self._texts(root, in_content), max_length)
+
+    def _texts(self, element, in_content: bool):
+        """Text of `element`'s subtree in document order, skipping boilerplate subtrees (but not their tails)."""
+        if element.text:
+            yield element.text
+        for child in element:
+            if isinstance(child.tag, str) and not _is_boilerplate_tag(child.tag, in_content) and \
+                    not _is_boilerplate_attr(child.get("class"), child.get("id")):
+                yield from self._texts(child, in_content or child.tag in CONTENT_TAGS)
+            if child.tail:
+                yield child.tail
+
+class BeautifulSoupExtractor:
+    """Pure-Python fallback (html.parser), always available. Boilerplate subtrees are skipped while walking,
+    so nothing past the early exit is visited."""
+    name = "bs4"
+
+    def _texts(self, node, in_content: bool):
+        for child in node.children:
+            if isinstance(child, Tag):
+                classes = child.get("class")
+                if _is_boilerplate_tag(child.name, in_content) or _is_boilerplate_attr(
+                        " ".join(classes) if isinstance(classes, list) else classes, child.get("id")):
+                    continue
+                yield from self._texts(child, in_content or child.name in CONTENT_TAGS)
+            elif type(child) is NavigableString: # Skips comments, CDATA, doctypes
+                yield str(child)
+
+    def extract(self, html_content: str, selectors: list, max_length: int) -> str:
+        soup = BeautifulSoup(html_content, "html.parser")
+        root = next((node for node in (soup.select_one(s) for s in selectors) if node is not None), None) or soup.body or soup
+        in_content = root.name in CONTENT_TAGS or root.find_parent(CONTENT_TAGS) is not None
+        return _collect(self._texts(root, in_content), max_length)
+
+EXTRACTORS = {}
+if LexborHTMLParser is not None:
+    EXTRACTORS["selectolax"] = SelectolaxExtractor
+if lxml is not None:
+    EXTRACTORS["lxml"] = LxmlExtractor
+EXTRACTORS["bs4"] = BeautifulSoupExtractor
+BACKEND_PREFERENCE = ("selectolax", "lxml", "bs4")
+
+_extractors = {}
+
+def get_extractor(backend: str = EXTRACTION_BACKEND):
+    """Extractor for `backend`, or the fastest installed one for "auto"."""
+    if backend == "auto":
+        backend = next(name for name in BACKEND_PREFERENCE if name in EXTRACTORS)
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Extraction backend '{backend}' is not available. Installed: {', '.join(EXTRACTORS)}")
+    if backend not in _extractors:
+        _extractors[backend] = EXTRACTORS[backend]()
+        logger.info(f"HTML extraction backend: {backend}")
+    return _extractors[backend]
+
+def extract_main_text(html_content: str, site_name: str = None, max_length: int = EXTRACTION_MAX_CHARS,
+                      backend: str = EXTRACTION_BACKEND) -> str:
+    """Main-content text of a page: the site's CONTENT_SELECTORS (then generic ones) pick the content root,
+    boilerplate elements are dropped and text is collected only up to `max_length` characters."""
+    if not html_content:
+        return ""
+    selectors = CONTENT_SELECTORS.get(site_name, []) + DEFAULT_CONTENT_SELECTORS
+    return get_extractor(backend).extract(html_content, selectors, max_length)
@@ -0,0 +1,287 @@
+# src/feeds.py
+import argparse
+import io
+import json
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple
+
+from src.config import (FEED_SOURCES, FEED_MIN_MAGNITUDE, FEED_MIN_SEVERITY, FEED_MAX_EVENTS_PER_SOURCE,
+                        FEED_SEEN_RETENTION_SECONDS)
+from src.database import load_seen_events, store_seen_events
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = ("Unknown", "Minor", "Moderate", "Severe", "Extreme") # CAP 1.2 scale, lowest first
+SEVERITY_RANK = {level: rank for rank, level in enumerate(SEVERITY_LEVELS)}
+USGS_ALERT_SEVERITY = {"green": "Minor", "yellow": "Moderate", "orange": "Severe", "red": "Extreme"} # PAGER levels
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+CAP_NS = "{urn:oasis:names:tc:emergency:cap:1.2}"
+NHC_NS = "{https://www.nhc.noaa.gov}"
+
+class FeedEvent(NamedTuple):
+    """One earthquake, weather alert or tropical cyclone advisory, reduced to what the agents use."""
+    event_id: str
+    kind: str # "earthquake", "alert" or "cyclone"
+    source: str
+    title: str
+    time: str # ISO 8601, UTC
+    updated: str # Changes whenever the publisher revises the event (new advisory, magnitude review...)
+    severity: str # One of SEVERITY_LEVELS
+    area: str = ""
+    magnitude: float = None # Earthquakes
+    depth_km: float = None # Earthquakes
+    wind_mph: float = None # Cyclones (maximum sustained wind)
+    latitude: float = None
+    longitude: float = None
+    details: str = "" # Compact extras: tsunami flag, urgency/certainty, movement/pressure...
+    url: str = ""
+
+def severity_rank(severity: str) -> int:
+    return SEVERITY_RANK.get(severity, 0)
+
+def _iso_utc(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _iso_from_text(text: str) -> str:
+    """ISO 8601 (with offset) or RFC 822 date -> ISO 8601 UTC; unparsable text is returned as is."""
+    if not text:
+        return ""
+    try:
+        return _iso_utc(datetime.fromisoformat(text.replace("Z", "+00:00")))
+    except ValueError:
+        pass
+    try:
+        return _iso_utc(parsedate_to_datetime(text))
+    except (TypeError, ValueError):
+        return text
+
+def _to_bytes(payload) -> bytes:
+    return payload.encode("utf-8") if isinstance(payload, str) else payload
+
+def _number(text: str) -> float:
+    """Leading number of strings like "85 mph" or "977 mb"."""
+    try:
+        return float(text.split()[0])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def _quake_severity(magnitude: float, alert: str, tsunami: int) -> str:
+    if magnitude is None:
+        by_magnitude = "Unknown"
+    elif magnitude >= 7:
+        by_magnitude = "Extreme"
+    elif magnitude >= 6:
+        by_magnitude = "Severe"
+    elif magnitude >= 5:
+        by_magnitude = "Moderate"
+    else:
+        by_magnitude = "Minor"
+    levels = [by_magnitude, USGS_ALERT_SEVERITY.get(alert or "", "Unknown"), "Severe" if tsunami else "Unknown"]
+    return max(levels, key=severity_rank)
+
+def parse_usgs_geojson(payload, source: str = "earthquake_usgs"):
+    """Yields FeedEvents from a USGS GeoJSON summary feed (earthquakes only; blasts etc. are skipped)."""
+    data = json.loads(payload)
+    for feature in data.get("features", []):
+        props = feature.get("properties") or {}
+        if props.get("type", "earthquake") != "earthquake":
+            continue
+        coordinates = (feature.get("geometry") or {}).get("coordinates") or [None, None, None]
+        magnitude = props.get("mag")
+        details = [f"{props.get('magType') or ''} {props.get('status') or ''}".strip()]
+        if props.get("tsunami"):
+            details.append("tsunami info issued")
+        if props.get("alert"):
+            details.append(f"PAGER {props['alert']}")
+        if props.get("felt"):
+            details.append(f"felt by {props['felt']}")
+        yield FeedEvent(
+            event_id=feature.get("id") or props.get("code", ""),
+            kind="earthquake",
+            source=source,
+            title=props.get("title") or f"M {magnitude} - {props.get('place')}",
+            time=_iso_utc(datetime.fromtimestamp(props["time"] / 1000, timezone.utc)) if props.get("time") else "",
+            updated=str(props.get("updated") or props.get("time") or ""),
+            severity=_quake_severity(magnitude, props.get("alert"), props.get("tsunami")),
+            area=props.get("place") or "",
+            magnitude=magnitude,
+            depth_km=coordinates[2] if len(coordinates) > 2 else None,
+            latitude=coordinates[1],
+            longitude=coordinates[0],
+            details="; ".join(d for d in details if d),
+            url=props.get("url") or "",
+        )
+
+def _iter_elements(payload, tag: str):
+    """Streams the `tag` elements of an XML document, freeing each one once the caller is done with it."""
+    for _, element in ET.iterparse(io.BytesIO(_to_bytes(payload)), events=("end",)):
+        if element.tag == tag:
+            yield element
+            element.clear()
+
+def parse_cap_atom(payload, source: str = "noaa_weather_alerts"):
+    """Yields FeedEvents from an NWS CAP Atom feed (api.weather.gov/alerts/active.atom); test/exercise messages are skipped."""
+    for entry in _iter_elements(payload, f"{ATOM_NS}entry"):
+        cap = lambda name: (entry.findtext(f"{CAP_NS}{name}") or "").strip()
+        if cap("status") and cap("status") != "Actual":
+            continue
+        details = [f"{cap('msgType')}", f"urgency {cap('urgency')}", f"certainty {cap('certainty')}"]
+        if cap("expires"):
+            details.append(f"expires {_iso_from_text(cap('expires'))}")
+        severity = cap("severity")
+        link = entry.find(f"{ATOM_NS}link")
+        yield FeedEvent(
+            event_id=(entry.findtext(f"{ATOM_NS}id") or "").strip(),
+            kind="alert",
+            source=source,
+            title=cap("event") or (entry.findtext(f"{ATOM_NS}title") or "").strip(),
+            time=_iso_from_text(cap("effective") or entry.findtext(f"{ATOM_NS}published")),
+            updated=(entry.findtext(f"{ATOM_NS}updated") or "").strip(),
+            severity=severity if severity in SEVERITY_RANK else "Unknown",
+            area=cap("areaDesc"),
+            details="; ".join(d for d in details if d.split()[-1:] != ["Unknown"]),
+            url=link.get("href", "") if link is not None else "",
+        )
+
+def _cyclone_severity(storm_type: str, wind_mph: float) -> str:
+    storm_type = storm_type.upper()
+    if "HURRICANE" in storm_type:
+        return "Extreme" if wind_mph is not None and wind_mph >= 111 else "Severe" # Category 3+ is a major hurricane
+    if "TROPICAL STORM" in storm_type:
+        return "Moderate"
+    return "Minor" # Depressions, potential/post-tropical cyclones
+
+def parse_nhc_rss(payload, source: str = "noaa_hurricanes"):
+    """Yields one FeedEvent per active cyclone of an NHC basin RSS feed (index-at.xml, index-ep.xml...).
+    Product links (advisories, outlooks) without an nhc:Cyclone block are skipped."""
+    for item in _iter_elements(payload, "item"):
+        cyclone = item.find(f"{NHC_NS}Cyclone")
+        if cyclone is None:
+            continue
+        nhc = lambda name: (cyclone.findtext(f"{NHC_NS}{name}") or "").strip()
+        wind_mph = _number(nhc("wind"))
+        latitude = longitude = None
+        try:
+            latitude, longitude = (float(part) for part in nhc("center").split(","))
+        except ValueError:
+            pass
+        storm_type = nhc("type").title()
+        published = _iso_from_text((item.findtext("pubDate") or "").strip())
+        details = [f"moving {nhc('movement')}" if nhc("movement") else "", f"pressure {nhc('pressure')}" if nhc("pressure") else "",
+                   nhc("headline").strip(". ")]
+        yield FeedEvent(
+            event_id=nhc("atcf") or nhc("wallet"),
+            kind="cyclone",
+            source=source,
+            title=f"{storm_type} {nhc('name')}",
+            time=published,
+            updated=f"{published} {nhc('datetime')}".strip(), # New advisory -> new version
+            severity=_cyclone_severity(storm_type, wind_mph),
+            area=nhc("center"),
+            wind_mph=wind_mph,
+            latitude=latitude,
+            longitude=longitude,
+            details="; ".join(d for d in details if d),
+            url=(item.findtext("link") or "").strip(),
+        )
+
+FEED_PARSERS = {
+    "usgs_geojson": parse_usgs_geojson,
+    "cap_atom": parse_cap_atom,
+    "nhc_rss": parse_nhc_rss,
+}
+
+def parse_feed(payload, feed_format: str, source: str = None):
+    """Streams FeedEvents out of a raw feed body (str or bytes)."""
+    if feed_format not in FEED_PARSERS:
+        raise ValueError(f"Unknown feed format '{feed_format}'. Available: {', '.join(FEED_PARSERS)}")
+    return FEED_PARSERS[feed_format](payload, source) if source else FEED_PARSERS[feed_format](payload)
+
+def filter_events(events, min_magnitude: float = FEED_MIN_MAGNITUDE, min_severity: dict = FEED_MIN_SEVERITY):
+    """Drops quakes below `min_magnitude` (unless USGS rates them Severe or worse) and events below
+    the per-kind minimum severity."""
+    for event in events:
+        if severity_rank(event.severity) < severity_rank(min_severity.get(event.kind, "Unknown")):
+            continue
+        if event.kind == "earthquake" and (event.magnitude is None or event.magnitude < min_magnitude) \
+                and severity_rank(event.severity) < SEVERITY_RANK["Severe"]:
+            continue
+        yield event
+
+def format_event(event: FeedEvent) -> str:
+    parts = [f"[{event.severity}] {event.title}"]
+    if event.kind == "earthquake":
+        if event.depth_km is not None:
+            parts.append(f"depth {event.depth_km:g} km")
+    elif event.kind == "cyclone":
+        if event.wind_mph is not None:
+            parts.append(f"winds {event.wind_mph:g} mph")
+        parts.append(f"at {event.area}")
+    else:
+        parts.append(event.area)
+    parts.append(event.time)
+    if event.details:
+        parts.append(event.details)
+    return " | ".join(part for part in parts if part)
+
+def format_events(source: str, events: list, limit: int = FEED_MAX_EVENTS_PER_SOURCE) -> str:
+    """Dense, deterministic agent text: most severe first, then most recent."""
+    if not events:
+        return f"No significant events in the {source} feed."
+    ranked = sorted(events, key=lambda e: (severity_rank(e.severity), e.time), reverse=True)
+    lines = [format_event(event) for event in ranked[:limit]]
+    more = f" (showing {limit})" if len(events) > limit else ""
+    return f"{len(events)} significant event(s) from {source}{more}:\n" + "\n".join(lines)
+
+class EventDeduplicator:
+    """Remembers which (event id, version) pairs were already ingested, across cycles and restarts
+    (persisted in SQLite). `new_events` returns only events never seen or revised since."""
+    def __init__(self, retention_seconds: float = FEED_SEEN_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._seen = None
+        self._lock = threading.Lock()
+
+    def new_events(self, events: list) -> list:
+        now = time.time()
+        with self._lock:
+            if self._seen is None:
+                self._seen = load_seen_events(now - self.retention_seconds)
+            fresh = [event for event in events if self._seen.get(event.event_id) != event.updated]
+            for event in fresh:
+                self._seen[event.event_id] = event.updated
+        if fresh:
+            store_seen_events([(event.event_id, event.source, event.updated) for event in fresh], now,
+                              prune_before=now - self.retention_seconds)
+        return fresh
+
+def process_feed(source: str, payload, deduplicator: EventDeduplicator = None) -> tuple[list, list]:
+    """Parses and filters the body of a FEED_SOURCES feed.
+    Returns (significant events, those new or revised since last seen)."""
+    events = list(filter_events(parse_feed(payload, FEED_SOURCES[source]["format"], source)))
+    new = deduplicator.new_events(events) if deduplicator else events
+    return events, new
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a saved USGS/NWS/NHC feed file and print its events.")
+    parser.add_argument("path", help="Feed file (e.g. fixtures/feeds/usgs_2.5_day.geojson)")
+    parser.add_argument("--format", required=True, choices=sorted(FEED_PARSERS))
+    parser.add_argument("--all", action="store_true", help="Skip magnitude/severity filtering")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as f:
+        events = parse_feed(f.read(), args.format)
+    if not args.all:
+        events = filter_events(events)
+    events = list(events)
+    print(format_events(args.path, events))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# src/fetch_planner.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from src.config import SITE_PROFILES_PATH, STATIC_FETCH_MIN_TEXT_CHARS, STATIC_FETCH_REPROBE_EVERY
+from src.scraper import get_page_content_selenium, extract_text_from_html, get_page_ready_timings
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_REQUESTS = "requests"
+STRATEGY_SELENIUM = "selenium"
+
+# Phrases typical of SPA shells / bot walls served to clients without JavaScript
+JS_REQUIRED_MARKERS = (
+    "enable javascript",
+    "javascript is required",
+    "javascript is disabled",
+    "please turn on javascript",
+    "checking your browser",
+    "loading...",
+)
+
+class SiteProfileStore:
+    """Per-site fetch profiles persisted as a small JSON file, so learned strategies survive restarts."""
+    def __init__(self, path: str = SITE_PROFILES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._profiles = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read site profiles from {self.path}, starting fresh: {e}")
+            return {}
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._profiles, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path) # Atomic, so a crash never leaves a truncated file
+        except OSError as e:
+            logger.error(f"Could not persist site profiles to {self.path}: {e}")
+
+    def get(self, site_name: str) -> dict:
+        with self._lock:
+            return dict(self._profiles.get(site_name, {}))
+
+    def update(self, site_name: str, **fields) -> dict:
+        with self._lock:
+            profile = self._profiles.setdefault(site_name, {})
+            profile.update(fields)
+            profile["updated_at"] = time.time()
+            self._save_locked()
+            return dict(profile)
+
+class FetchPlanner:
+    """Chooses between the cheap `requests` path and headless Chrome for each site.
+
+    Static HTML is tried first; if its extracted text scores too low the page is re-fetched with Selenium
+    and the site is remembered as browser-bound. Browser-bound sites are re-probed with `requests`
+    every STATIC_FETCH_REPROBE_EVERY fetches in case the site changed.
+    """
+    def __init__(self, driver_pool=None, profile_store: SiteProfileStore = None,
+                 min_text_chars: int = STATIC_FETCH_MIN_TEXT_CHARS,
+                 reprobe_every: int = STATIC_FETCH_REPROBE_EVERY):
+        self.driver_pool = driver_pool
+        self.profiles = profile_store or SiteProfileStore()
+        self.min_text_chars = min_text_chars
+        self.reprobe_every = reprobe_every
+        self._extraction_memo = {} # site_name -> (html digest, text); unchanged (cached/304) pages are not re-parsed
+
+    def score_text(self, text: str) -> float:
+        """Scores extracted text from 0 (unusable) to 1 (enough real content)."""
+        if not text:
+            return 0.0
+        score = min(1.0, len(text) / self.min_text_chars)
+        lower_text = text.lower()
+        if any(marker in lower_text for marker in JS_REQUIRED_MARKERS):
+            score *= 0.25
+        return score
+
+    def score_is_usable(self, score: float) -> bool:
+        return score >= 1.0
+
+    def should_try_static(self, site_name: str) -> bool:
+        profile = self.profiles.get(site_name)
+        if profile.get("strategy") != STRATEGY_SELENIUM:
+            return True
+        return profile.get("fetches_since_probe", 0) >= self.reprobe_every
+
+    def record_result(self, site_name: str, strategy: str = None, static_score: float = None):
+        """Stores the strategy that produced usable content (and the static score, if probed).
+
+        A `strategy` of None only updates the counters and keeps whatever was learned before.
+        """
+        profile = self.profiles.get(site_name)
+        strategy = strategy or profile.get("strategy")
+        fields = {
+            "strategy": strategy,
+            "fetches": profile.get("fetches", 0) + 1,
+            "fetches_since_probe": 0 if static_score is not None else profile.get("fetches_since_probe", 0) + 1,
+        }
+        if static_score is not None:
+            fields["last_static_score"] = round(static_score, 3)
+        if strategy and profile.get("strategy") != strategy:
+            logger.info(f"Fetch strategy for {site_name} is now '{strategy}'.")
+        self.profiles.update(site_name, **fields)
+
+    def evaluate_static(self, site_name: str, html_content: str) -> tuple[str, float]:
+        """Extracts and scores statically fetched HTML. Records the site as static when usable.
+
+        Returns (text, score); the score is None when nothing was fetched (network/HTTP error),
+        which says nothing about whether the site needs a browser.
+        """
+        if not html_content:
+            return "", None
+        digest = hashlib.sha1(html_content.encode("utf-8", "replace")).hexdigest()
+        memo = self._extraction_memo.get(site_name)
+        if memo and memo[0] == digest:
+            text_content = memo[1]
+        else:
+            text_content = extract_text_from_html(html_content, site_name=site_name)
+            self._extraction_memo[site_name] = (digest, text_content)
+        static_score = self.score_text(text_content)
+        if self.score_is_usable(static_score):
+            self.record_result(site_name, STRATEGY_REQUESTS, static_score)
+        else:
+            logger.info(f"Static fetch of {site_name} not usable (score {static_score:.2f}); falling back to Selenium.")
+        return text_content, static_score
+
+    def fetch_with_browser(self, site_name: str, url: str, static_score: float = None, tried_static: bool = True) -> str:
+        """Fetches and extracts a site's text through the Selenium pool and updates its profile."""
+        html_content = get_page_content_selenium(url, driver_pool=self.driver_pool, site_name=site_name)
+        text_content = extract_text_from_html(html_content, site_name=site_name)
+        page_ready = get_page_ready_timings().get(site_name)
+        if page_ready:
+            self.profiles.update(site_name, page_ready=page_ready) # Persist measured time-to-ready
+        if text_content:
+            # Only learn "selenium" when the static page was actually judged, not after a transient error
+            learned = STRATEGY_SELENIUM if static_score is not None or not tried_static else None
+            self.record_result(site_name, learned, static_score)
+        return text_content
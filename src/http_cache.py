@@ -0,0 +1,214 @@
+# src/http_cache.py
+import email.utils
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from src.config import (HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_DEFAULT_TTL_SECONDS,
+                        HTTP_CACHE_TTL_OVERRIDES)
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that must never end up in cache keys or on disk
+SECRET_PARAMS = {"api_key"}
+
+def _parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+    return directives
+
+class CacheLookup:
+    """Result of `HTTPCache.prepare`: a fresh body to use directly, or headers for a conditional request."""
+    def __init__(self, key: str, url: str, source: str, body: str = None, conditional_headers: dict = None,
+                 stale: bool = False):
+        self.key = key
+        self.url = url
+        self.source = source
+        self.body = body # Set when the entry is still fresh: no request needed at all
+        self.conditional_headers = conditional_headers or {}
+        self.stale = stale # An expired entry exists; counted as a miss unless the server answers 304
+
+class HTTPCache:
+    """On-disk HTTP cache for scraped pages and API responses.
+
+    Bodies live in files under `directory`; validators, expiry and access times live in a SQLite index.
+    Honours ETag/Last-Modified (conditional requests), Cache-Control (no-store, no-cache, max-age) and Expires,
+    with per-source TTL overrides. When the total size exceeds `max_bytes`, least recently used entries are evicted.
+    """
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 default_ttl: float = HTTP_CACHE_DEFAULT_TTL_SECONDS, ttl_overrides: dict = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_overrides = HTTP_CACHE_TTL_OVERRIDES if ttl_overrides is None else ttl_overrides
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                                key TEXT PRIMARY KEY,
+                                url TEXT,
+                                etag TEXT,
+                                last_modified TEXT,
+                                expires_at REAL,
+                                size INTEGER,
+                                last_access REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(url: str, params: dict = None) -> tuple[str, str]:
+        """Returns (key, display url) with secret query parameters removed."""
+        safe_params = sorted((k, v) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+        display_url = f"{url}?{urlencode(safe_params)}" if safe_params else url
+        return hashlib.sha256(display_url.encode("utf-8")).hexdigest(), display_url
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.body")
+
+    def _freshness_lifetime(self, headers, source: str) -> float:
+        """Seconds the response may be served without revalidation. None means do not store."""
+        directives = _parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" in directives:
+            return None
+        if source in self.ttl_overrides:
+            return self.ttl_overrides[source]
+        if "no-cache" in directives:
+            return 0
+        if "max-age" in directives:
+            try:
+                return max(0, int(directives["max-age"]))
+            except ValueError:
+                pass
+        expires = headers.get("Expires")
+        if expires:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(expires).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return 0
+        return self.default_ttl
+
+    def prepare(self, url: str, params: dict = None, source: str = None) -> CacheLookup:
+        """Looks up a request. Counts a hit when a fresh body is returned."""
+        key, display_url = self.make_key(url, params)
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified, expires_at FROM entries WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return CacheLookup(key, display_url, source)
+            etag, last_modified, expires_at = row
+            if expires_at is not None and expires_at > time.time():
+                body = self._read_body_locked(key)
+                if body is None:
+                    self.stats["misses"] += 1
+                    return CacheLookup(key, display_url, source)
+                self.stats["hits"] += 1
+                logger.debug(f"HTTP cache hit for {display_url}")
+                return CacheLookup(key, display_url, source, body=body)
+        conditional_headers = {}
+        if etag:
+            conditional_headers["If-None-Match"] = etag
+        if last_modified:
+            conditional_headers["If-Modified-Since"] = last_modified
+        return CacheLookup(key, display_url, source, conditional_headers=conditional_headers, stale=True)
+
+    def _read_body_locked(self, key: str) -> str:
+        try:
+            with open(self._body_path(key), "r", encoding="utf-8") as f:
+                body = f.read()
+        except OSError:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return body
+
+    def revalidated(self, lookup: CacheLookup, headers) -> str:
+        """Handles a 304 Not Modified: refreshes expiry and returns the stored body (None if it vanished)."""
+        lifetime = self._freshness_lifetime(headers, lookup.source)
+        with self._lock:
+            body = self._read_body_locked(lookup.key)
+            if body is None:
+                return None
+            self.stats["revalidated"] += 1
+            expires_at = time.time() + (lifetime or 0)
+            self._conn.execute("UPDATE entries SET expires_at = ? WHERE key = ?", (expires_at, lookup.key))
+            self._conn.commit()
+        logger.debug(f"HTTP cache revalidated {lookup.url} (304)")
+        return body
+
+    def store(self, lookup: CacheLookup, body: str, headers):
+        """Stores a 200 response unless it is marked no-store, then enforces the size bound."""
+        if lookup.stale:
+            with self._lock:
+                self.stats["misses"] += 1 # Stale entry that the server says has changed
+        lifetime = self._freshness_lifetime(headers, lookup.source)
+        if lifetime is None:
+            return
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if lifetime == 0 and not etag and not last_modified:
+            return # Could never be reused: no freshness and nothing to revalidate with
+        data = body.encode("utf-8")
+        now = time.time()
+        with self._lock:
+            tmp_path = f"{self._body_path(lookup.key)}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._body_path(lookup.key))
+            except OSError as e:
+                logger.warning(f"Could not write HTTP cache entry for {lookup.url}: {e}")
+                return
+            self._conn.execute("INSERT OR REPLACE INTO entries (key, url, etag, last_modified, expires_at, size, last_access) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (lookup.key, lookup.url, etag, last_modified, now + lifetime, len(data), now))
+            self._conn.commit()
+            self.stats["stores"] += 1
+            self._evict_locked()
+
+    def _evict_locked(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+        self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters plus current size. hit_rate counts 304 revalidations as hits."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            stats = dict(self.stats, entries=entries, size_bytes=size)
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["revalidated"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_http_cache() -> HTTPCache:
+    """Process-wide cache shared by the blocking and async fetch paths."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
@@ -0,0 +1,202 @@
+# src/ingestion.py
+import asyncio
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from src.config import (HTTP_MAX_CONNECTIONS, HTTP_MAX_CONNECTIONS_PER_HOST, HTTP_TIMEOUT_SECONDS,
+                        SELENIUM_POOL_SIZE, FRED_API_KEY, FEED_SOURCES)
+from src.feeds import EventDeduplicator, process_feed, format_events
+from src.fetch_planner import STRATEGY_REQUESTS, STRATEGY_SELENIUM
+from src.http_cache import get_http_cache
+from src.scraper import USER_AGENT, FRED_OBSERVATIONS_URL, FRED_TIMEOUT, build_fred_params
+from src.telemetry import span
+from src.timeseries import get_fred_store
+from src.utils import send_telegram_alert_async
+
+logger = logging.getLogger(__name__)
+
+FRED_CONTEXT_KEY = "fred_economic_data"
+FAILED_SOURCE_PREFIXES = ("Failed to retrieve content from", "Error scraping")
+FAILED_FRED_PREFIXES = ("FRED data not available", "Error fetching FRED data", "Error processing FRED data")
+
+def is_failed_source_text(text: str) -> bool:
+    """True for the placeholders stored in place of a source that could not be fetched."""
+    return not text or text.startswith(FAILED_SOURCE_PREFIXES)
+
+class AsyncIngestor:
+    """Concurrent ingestion of web sources, FRED series and pending notifications.
+
+    Everything HTTP goes through one aiohttp session (keep-alive, per-host connection limits).
+    Only sources the fetch planner considers browser-bound are handed to the Selenium pool,
+    on a small thread pool sized like the driver pool so browser work never blocks the event loop.
+    """
+    def __init__(self, fetch_planner, max_browser_workers: int = SELENIUM_POOL_SIZE, http_cache=None):
+        self.fetch_planner = fetch_planner
+        self.http_cache = http_cache or get_http_cache()
+        self.event_deduplicator = EventDeduplicator() # New/revised feed events, across cycles and restarts
+        self.event_listeners = [] # Called as listener(source, new_events) with new/revised feed events
+        self.fred_listeners = [] # Called as listener(series_id) when a FRED series gained observations
+        self._browser_executor = ThreadPoolExecutor(max_workers=max_browser_workers, thread_name_prefix="browser")
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS),
+            headers={'User-Agent': USER_AGENT},
+        )
+
+    async def _cached_get(self, session: aiohttp.ClientSession, url: str, params: dict = None,
+                          source: str = None, timeout: aiohttp.ClientTimeout = None) -> str:
+        """GET through the on-disk HTTP cache: fresh entries skip the network, stale ones revalidate (304)."""
+        lookup = self.http_cache.prepare(url, params, source)
+        if lookup.body is not None:
+            return lookup.body
+        async with session.get(url, params=params, headers=lookup.conditional_headers, timeout=timeout) as response:
+            if response.status == 304:
+                body = self.http_cache.revalidated(lookup, response.headers)
+                if body is not None:
+                    return body
+            else:
+                response.raise_for_status()
+                body = await response.text()
+                self.http_cache.store(lookup, body, response.headers)
+                return body
+        # Cached body vanished after a 304; refetch in full
+        async with session.get(url, params=params, timeout=timeout) as response:
+            response.raise_for_status()
+            body = await response.text()
+        self.http_cache.store(lookup, body, response.headers)
+        return body
+
+    async def _get_text(self, session: aiohttp.ClientSession, url: str, source: str = None) -> str:
+        try:
+            with span("http", source=source or url):
+                html_content = await self._cached_get(session, url, source=source)
+            logger.info(f"Successfully fetched content from {url} using aiohttp.")
+            return html_content
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error fetching page {url} with aiohttp: {e}")
+            return ""
+
+    def _notify(self, listeners: list, *args):
+        for listener in listeners:
+            try:
+                listener(*args)
+            except Exception as e:
+                logger.error(f"Ingestion listener {listener} failed: {e}", exc_info=True)
+
+    async def fetch_feed(self, session: aiohttp.ClientSession, source: str) -> str:
+        """Downloads a FEED_SOURCES feed and turns it into a dense list of significant events."""
+        body = await self._get_text(session, FEED_SOURCES[source]["url"], source=source)
+        if not body:
+            return f"Failed to retrieve content from {source}."
+        try:
+            with span("feed.parse", source=source):
+                events, new_events = await asyncio.to_thread(process_feed, source, body, self.event_deduplicator)
+        except Exception as e: # Malformed JSON/XML
+            logger.error(f"Error parsing feed {source}: {e}", exc_info=True)
+            return f"Error scraping {source}: unreadable feed."
+        if new_events:
+            logger.info(f"{source}: {len(new_events)} new or revised event(s) of {len(events)} significant.")
+            self._notify(self.event_listeners, source, new_events)
+        return format_events(source, events)
+
+    async def fetch_source(self, session: aiohttp.ClientSession, site_name: str, url: str) -> tuple[str, str]:
+        """Static-first fetch of one source; falls back to the Selenium pool (FetchPlanner.fetch_with_browser).
+        Structured feeds (FEED_SOURCES) are parsed directly instead."""
+        with span("scrape", source=site_name):
+            return await self._fetch_source(session, site_name, url)
+
+    async def _fetch_source(self, session: aiohttp.ClientSession, site_name: str, url: str) -> tuple[str, str]:
+        if site_name in FEED_SOURCES:
+            return site_name, await self.fetch_feed(session, site_name)
+        loop = asyncio.get_running_loop()
+        planner = self.fetch_planner
+        static_score = None
+        tried_static = planner.should_try_static(site_name)
+        if tried_static:
+            html_content = await self._get_text(session, url, source=site_name)
+            # HTML parsing is CPU-bound; keep it off the event loop
+            text_content, static_score = await asyncio.to_thread(planner.evaluate_static, site_name, html_content)
+            if static_score is not None and planner.score_is_usable(static_score):
+                logger.info(f"Scraped {site_name} using {STRATEGY_REQUESTS}.")
+                return site_name, text_content
+
+        with span("browser", source=site_name):
+            # run_in_executor does not carry the context over (to_thread does); the active telemetry cycle needs it
+            text_content = await loop.run_in_executor(
+                self._browser_executor, contextvars.copy_context().run,
+                planner.fetch_with_browser, site_name, url, static_score, tried_static)
+        if text_content:
+            logger.info(f"Scraped {site_name} using {STRATEGY_SELENIUM}.")
+            return site_name, text_content
+        return site_name, f"Failed to retrieve content from {site_name}."
+
+    async def fetch_fred(self, session: aiohttp.ClientSession, series_id: str) -> str:
+        with span("fred", series=series_id):
+            return await self._fetch_fred(session, series_id)
+
+    async def _fetch_fred(self, session: aiohttp.ClientSession, series_id: str) -> str:
+        if not FRED_API_KEY:
+            logger.warning("FRED_API_KEY not set. Skipping FRED data.")
+            return "FRED data not available (API key missing)."
+        store = get_fred_store() # Only observations newer than the last stored date are requested
+        try:
+            body = await self._cached_get(session, FRED_OBSERVATIONS_URL,
+                                          params=build_fred_params(series_id, store.sync_start(series_id)),
+                                          source=f"fred:{series_id}", timeout=aiohttp.ClientTimeout(total=FRED_TIMEOUT))
+            if store.merge_payload(series_id, json.loads(body)):
+                self._notify(self.fred_listeners, series_id)
+            logger.info(f"Fetched FRED data for {series_id}")
+            return store.describe(series_id)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error fetching FRED data for {series_id}: {e}")
+            return f"Error fetching FRED data for {series_id}."
+        except Exception as e:
+            logger.error(f"Unexpected error processing FRED data for {series_id}: {e}", exc_info=True)
+            return f"Error processing FRED data for {series_id}."
+
+    async def gather(self, sources: dict, fred_series: list, notifications: list = ()) -> tuple[dict, list]:
+        """Fetches all sources and FRED series (and sends queued alerts) concurrently.
+
+        Returns ({site_name: text}, [FRED text per series, in the order requested]).
+        """
+        async with self.create_session() as session:
+            source_tasks = [self.fetch_source(session, name, url) for name, url in sources.items()]
+            fred_tasks = [self.fetch_fred(session, series_id) for series_id in fred_series]
+            alert_tasks = [send_telegram_alert_async(session, message) for message in notifications]
+            results = await asyncio.gather(*source_tasks, *fred_tasks, *alert_tasks, return_exceptions=True)
+
+        source_results = results[:len(source_tasks)]
+        fred_results = results[len(source_tasks):len(source_tasks) + len(fred_tasks)]
+
+        contexts = {}
+        for site_name, result in zip(sources, source_results):
+            if isinstance(result, BaseException):
+                logger.error(f"{site_name} generated an exception during scraping: {result}", exc_info=result)
+                contexts[site_name] = f"Error scraping {site_name}."
+            else:
+                contexts[site_name] = result[1]
+
+        logger.info(f"HTTP cache stats: {self.http_cache.get_stats()}")
+
+        fred_texts = []
+        for series_id, result in zip(fred_series, fred_results):
+            if isinstance(result, BaseException):
+                logger.error(f"FRED fetch for {series_id} raised: {result}", exc_info=result)
+                fred_texts.append(f"Error fetching FRED data for {series_id}.")
+            else:
+                fred_texts.append(result)
+        return contexts, fred_texts
+
+    def run(self, sources: dict, fred_series: list, notifications: list = ()) -> tuple[dict, list]:
+        """Blocking entry point for the (synchronous) monitoring cycle."""
+        return asyncio.run(self.gather(sources, fred_series, notifications))
+
+    def close(self):
+        self._browser_executor.shutdown(wait=False)
@@ -1,49 +1,345 @@
 # src/llm_adapter.py
+import contextlib
+import hashlib
+import itertools
+import json
 import logging
-import google.generativeai as genai
-from src.config import GOOGLE_API_KEY, GEMINI_MODEL_NAME, GEMINI_TEMPERATURE, GEMINI_MAX_OUTPUT_TOKENS
+import os
+import random
+import re
+import threading
+import time
+from src.config import (GOOGLE_API_KEY, GEMINI_MODEL_NAME, GEMINI_TEMPERATURE, GEMINI_MAX_OUTPUT_TOKENS, LLM_CACHE_ENABLED,
+                        LLM_EXPECTED_OUTPUT_TOKENS, CHARS_PER_TOKEN, LLM_BACKEND, FAKE_LLM_LATENCY_SECONDS,
+                        FAKE_LLM_TOKENS_PER_SECOND, FAKE_LLM_RESPONSE_TOKENS, LLM_REPLAY_PATH, LLM_RECORD_RESPONSES)
+from src.llm_cache import LLMResponseCache, make_cache_key, prompt_hash
+from src.llm_scheduler import get_llm_scheduler, LLMRequestError
+from src.telemetry import get_telemetry, span
 
 logger = logging.getLogger(__name__)
 
-class GeminiAdapter:
+# Texts that stand in for a real analysis (blocked/empty responses, or an agent's error placeholder);
+# callers use is_generation_failure() to tell them apart. API errors are raised as LLMRequestError instead.
+GENERATION_FAILURE_PREFIXES = ("Content generation blocked", "No content generated", "Error in ")
+
+def is_generation_failure(text: str) -> bool:
+    return not text or text.startswith(GENERATION_FAILURE_PREFIXES)
+
+HEADLINE_INSTRUCTION = ("Begin your response with a single line in the form "
+                        "`HEADLINE: [SEVERITY: LOW|MEDIUM|HIGH] <one-sentence summary>` before the analysis.")
+_HEADLINE_RE = re.compile(r"^\s*\**HEADLINE:?\**:?\s*\[?SEVERITY:\s*(LOW|MEDIUM|HIGH)\]?\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+
+def parse_headline(text: str) -> tuple[str, str]:
+    """Returns (severity, headline) once the headline line is complete in (possibly partial) output, else None."""
+    match = _HEADLINE_RE.search(text)
+    if not match or "\n" not in text[match.start():]:
+        return None # Not there yet, or the line is still streaming
+    return match.group(1).upper(), match.group(2).strip()
+
+LLM_BACKENDS = {} # Backend name -> adapter class, filled by @register_llm_backend
+
+def register_llm_backend(name: str):
+    """Class decorator adding an adapter to the registry used by create_llm_adapter()."""
+    def decorator(cls):
+        cls.backend_name = name
+        LLM_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+def create_llm_adapter(backend: str = LLM_BACKEND):
+    """Instantiates the configured backend (LLM_BACKEND by default)."""
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}'. Available: {', '.join(sorted(LLM_BACKENDS))}")
+    return LLM_BACKENDS[backend]()
+
+_record_lock = threading.Lock()
+
+def record_response(prompt: str, model_name: str, response: str, path: str = LLM_REPLAY_PATH):
+    """Appends a live answer to the replay file read by ReplayAdapter."""
+    line = json.dumps({"prompt_hash": prompt_hash(prompt), "model": model_name, "response": response})
+    with _record_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class BaseLLMAdapter:
+    """Shared front end of every backend: response cache, request scheduler and optional recording.
+
+    Subclasses set `model_name` and `generation_config_dict` and implement `_call_model(prompt) -> str`
+    and `_stream_model(prompt)`, a generator of text chunks. Both raise on API errors so the scheduler
+    can retry them. Backends that never touch a remote quota set `rate_limited = False`.
+    """
+    backend_name = None
+    rate_limited = True
+    model_name = ""
+    generation_config_dict = {}
+
+    def __init__(self):
+        self.cache = LLMResponseCache() if LLM_CACHE_ENABLED else None
+        self.scheduler = get_llm_scheduler() if self.rate_limited else None # Shared by every adapter in the process
+        self.record = LLM_RECORD_RESPONSES and self.backend_name != "replay"
+
+    def generate_text(self, prompt: str, use_cache: bool = True) -> str:
+        """Generates text with the configured model.
+
+        Identical prompts (same model and generation config) are answered from the response cache
+        unless `use_cache` is False. Failed generations are never cached.
+        Requests go through the shared scheduler (rate limits, retries, circuit breaker); raises
+        LLMRequestError when the API still fails after retries.
+        """
+        if self.cache is None:
+            return self._generate(prompt)
+        if not use_cache:
+            self.cache.record_bypass()
+            return self._generate(prompt)
+        key = make_cache_key(self.model_name, self.generation_config_dict, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"LLM response cache hit ({self.cache.get_stats()['hit_rate']:.0%} hit rate).")
+            return cached
+        text = self._generate(prompt)
+        if not is_generation_failure(text):
+            self.cache.put(key, self.model_name, text)
+        return text
+
+    def generate_text_stream(self, prompt: str, use_cache: bool = True):
+        """Yields the response in chunks as the model produces them.
+
+        Unlike generate_text this raises on API errors or blocked prompts, since part of the text
+        may already have been consumed. Cached responses are yielded as a single chunk.
+        """
+        key = make_cache_key(self.model_name, self.generation_config_dict, prompt)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("LLM response cache hit (streaming).")
+                yield cached
+                return
+        elif self.cache is not None:
+            self.cache.record_bypass()
+
+        slot = self.scheduler.slot() if self.scheduler else contextlib.nullcontext()
+        with slot, span("llm", backend=self.backend_name): # Held until the stream is fully consumed
+            # Retries cover opening the stream and its first chunk; nothing has been yielded yet at that point
+            chunk_iter, first_chunks = self._schedule(self._open_stream, prompt)
+            chunks = []
+            try:
+                for chunk in itertools.chain(first_chunks, chunk_iter):
+                    chunks.append(chunk)
+                    yield chunk
+            except LLMRequestError:
+                raise
+            except Exception as e:
+                raise LLMRequestError(f"LLM stream failed after {len(chunks)} chunk(s): {e}") from e
+        if not chunks:
+            raise LLMRequestError("No content generated by the model.")
+        text = "".join(chunks)
+        self._record_usage(prompt, text)
+        if self.cache is not None:
+            self.cache.put(key, self.model_name, text)
+        if self.record:
+            record_response(prompt, self.model_name, text)
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Prompt estimate plus the expected answer, reserved against the tokens-per-minute bucket."""
+        return len(prompt) // CHARS_PER_TOKEN + LLM_EXPECTED_OUTPUT_TOKENS
+
+    def _schedule(self, fn, prompt: str):
+        if self.scheduler is None:
+            try:
+                return fn(prompt)
+            except LLMRequestError:
+                raise
+            except Exception as e:
+                raise LLMRequestError(f"LLM request failed: {e}") from e
+        return self.scheduler.call(fn, prompt, estimated_tokens=self._estimate_tokens(prompt))
+
+    def _token_usage(self, prompt: str, text: str) -> tuple[int, int]:
+        """(prompt tokens, response tokens) of the last call; estimated from lengths unless the backend reports them."""
+        return len(prompt) // CHARS_PER_TOKEN, len(text) // CHARS_PER_TOKEN
+
+    def _record_usage(self, prompt: str, text: str):
+        prompt_tokens, response_tokens = self._token_usage(prompt, text)
+        get_telemetry().record_llm_tokens(prompt_tokens, response_tokens, backend=self.backend_name)
+
+    def _generate(self, prompt: str) -> str:
+        """Calls the model through the request scheduler (no caching)."""
+        slot = self.scheduler.slot() if self.scheduler else contextlib.nullcontext()
+        with slot, span("llm", backend=self.backend_name):
+            text = self._schedule(self._call_model, prompt)
+        self._record_usage(prompt, text)
+        if self.record and not is_generation_failure(text):
+            record_response(prompt, self.model_name, text)
+        return text
+
+    def _open_stream(self, prompt: str):
+        """Starts a streaming request and pulls its first chunk, so connection/quota errors surface here."""
+        chunk_iter = iter(self._stream_model(prompt))
+        first_chunks = list(itertools.islice(chunk_iter, 1))
+        return chunk_iter, first_chunks
+
+    def _call_model(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def _stream_model(self, prompt: str):
+        raise NotImplementedError
+
+@register_llm_backend("gemini")
+class GeminiAdapter(BaseLLMAdapter):
     def __init__(self):
         if not GOOGLE_API_KEY:
             logger.error("GOOGLE_API_KEY not found. Please set it in your .env file.")
             raise ValueError("GOOGLE_API_KEY not configured.")
-        
+        import google.generativeai as genai # Only this backend needs the SDK
+
         genai.configure(api_key=GOOGLE_API_KEY)
+        self.model_name = GEMINI_MODEL_NAME
         self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-        self.generation_config = genai.types.GenerationConfig(
-            temperature=GEMINI_TEMPERATURE,
-            max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS
-        )
+        self.generation_config_dict = {
+            "temperature": GEMINI_TEMPERATURE,
+            "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS,
+        }
+        self.generation_config = genai.types.GenerationConfig(**self.generation_config_dict)
+        self._usage = threading.local() # usage_metadata of the calling thread's last response
+        super().__init__()
         logger.info(f"Google Generative AI model '{GEMINI_MODEL_NAME}' initialized.")
 
-    def generate_text(self, prompt: str) -> str:
-        """Generates text using the configured Gemini model."""
+    def _remember_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and getattr(usage, "prompt_token_count", None):
+            self._usage.counts = (usage.prompt_token_count, usage.candidates_token_count or 0)
+
+    def _token_usage(self, prompt: str, text: str) -> tuple[int, int]:
+        counts, self._usage.counts = getattr(self._usage, "counts", None), None
+        return counts or super()._token_usage(prompt, text)
+
+    def _call_model(self, prompt: str) -> str:
+        """Single Gemini API call. API errors propagate so the scheduler can retry them."""
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self.generation_config
+        )
+        self._remember_usage(response)
+        # Handle cases where response might not have 'text' or is blocked
+        if response.parts:
+            return response.text
+        elif response.prompt_feedback and response.prompt_feedback.block_reason:
+            block_reason = response.prompt_feedback.block_reason
+            logger.warning(f"Content generation blocked. Reason: {block_reason}")
+            return f"Content generation blocked: {block_reason}. Please review prompt or safety settings."
+        else:
+            logger.warning(f"No content generated. Full response: {response}")
+            return "No content generated by the model."
+
+    def _stream_model(self, prompt: str):
+        response = self.model.generate_content(prompt, generation_config=self.generation_config, stream=True)
+        produced = False
+        for chunk in response:
+            if not chunk.parts:
+                continue # e.g. a final chunk carrying only finish metadata
+            produced = True
+            yield chunk.text
+        self._remember_usage(response) # Totals arrive with the last chunk
+        feedback = getattr(response, "prompt_feedback", None)
+        if not produced and feedback and feedback.block_reason:
+            raise LLMRequestError(f"Content generation blocked: {feedback.block_reason}")
+
+_ROLE_RE = re.compile(r"You are a specialized AI agent: ([^.,\n]+)")
+_FAKE_VOCABULARY = ("seismic", "hurricane", "flood", "insured losses", "supply chain", "commodity prices",
+                    "bond yields", "reinsurance", "grid outage", "port closures", "crop yields", "volatility",
+                    "freight rates", "energy futures", "emergency spending", "consumer demand")
+
+@register_llm_backend("fake")
+class FakeLLMAdapter(BaseLLMAdapter):
+    """Deterministic offline stand-in for load tests and benchmarks.
+
+    The answer depends only on the prompt (same prompt, same text) and follows the agent output
+    layout, so key-point extraction, early starts and headline alerts behave as with a real model.
+    Latency and throughput come from FAKE_LLM_LATENCY_SECONDS and FAKE_LLM_TOKENS_PER_SECOND.
+    """
+    def __init__(self, latency_seconds: float = FAKE_LLM_LATENCY_SECONDS,
+                 tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND, response_tokens: int = FAKE_LLM_RESPONSE_TOKENS):
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.model_name = "fake-llm"
+        self.generation_config_dict = {"latency": latency_seconds, "tokens_per_second": tokens_per_second,
+                                       "response_tokens": response_tokens}
+        super().__init__()
+        logger.info(f"Fake LLM backend initialized ({latency_seconds}s latency, {tokens_per_second} tokens/s).")
+
+    def render(self, prompt: str) -> str:
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        role = _ROLE_RE.search(prompt)
+        role = role.group(1) if role else "analyst"
+
+        def sentence() -> str:
+            a, b = rng.sample(_FAKE_VOCABULARY, 2)
+            return f"Signals on {a} point to pressure on {b} over the coming days."
+
+        lines = []
+        if HEADLINE_INSTRUCTION in prompt:
+            severity = rng.choice(("LOW", "MEDIUM", "HIGH"))
+            lines.append(f"HEADLINE: [SEVERITY: {severity}] Simulated {severity.lower()}-severity outlook from the {role}.")
+        sections = ("Key Observations", "Probable Scenarios & Likelihood", "Economic & Financial Market Implications",
+                    "Information Gaps & Next Steps")
+        per_section = max(1, self.response_tokens * CHARS_PER_TOKEN // len(sentence()) // (len(sections) * 2))
+        for number, section in enumerate(sections, start=1):
+            lines.append(f"{number}.  **{section}:**")
+            for _ in range(per_section):
+                lines.append(f"    *   {sentence()} {sentence()}")
+        return "\n".join(lines) + "\n"
+
+    def _call_model(self, prompt: str) -> str:
+        text = self.render(prompt)
+        time.sleep(self.latency_seconds + len(text) / CHARS_PER_TOKEN / self.tokens_per_second)
+        return text
+
+    def _stream_model(self, prompt: str):
+        text = self.render(prompt)
+        time.sleep(self.latency_seconds)
+        chunk_chars = 16 * CHARS_PER_TOKEN # ~16 tokens per chunk, similar to Gemini's stream granularity
+        for start in range(0, len(text), chunk_chars):
+            chunk = text[start:start + chunk_chars]
+            time.sleep(len(chunk) / CHARS_PER_TOKEN / self.tokens_per_second)
+            yield chunk
+
+@register_llm_backend("replay")
+class ReplayAdapter(BaseLLMAdapter):
+    """Answers prompts from a JSONL file of recorded responses (see LLM_RECORD / record_response).
+
+    Prompts are matched by normalized-prompt hash; an unknown prompt raises LLMRequestError.
+    """
+    rate_limited = False
+
+    def __init__(self, path: str = LLM_REPLAY_PATH):
+        if not os.path.exists(path):
+            raise ValueError(f"LLM replay file not found: {path}. Record one with LLM_RECORD=1.")
+        self.responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses[entry["prompt_hash"]] = entry["response"] # Latest recording wins
+        self.model_name = "replay"
+        self.generation_config_dict = {"path": os.path.abspath(path)}
+        super().__init__()
+        logger.info(f"Replay LLM backend loaded {len(self.responses)} recorded response(s) from {path}.")
+
+    def _call_model(self, prompt: str) -> str:
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            # Handle cases where response might not have 'text' or is blocked
-            if response.parts:
-                return response.text
-            elif response.prompt_feedback and response.prompt_feedback.block_reason:
-                block_reason = response.prompt_feedback.block_reason
-                logger.warning(f"Content generation blocked. Reason: {block_reason}")
-                return f"Content generation blocked: {block_reason}. Please review prompt or safety settings."
-            else:
-                logger.warning(f"No content generated. Full response: {response}")
-                return "No content generated by the model."
-
-        except Exception as e:
-            logger.error(f"Error during Google AI text generation: {e}", exc_info=True)
-            return f"Error generating text: {str(e)}"
-
-def generate_agent_prompt(agent_role_description: str, current_context: str, previous_insights: str = "") -> str:
+            return self.responses[prompt_hash(prompt)]
+        except KeyError:
+            raise LLMRequestError("No recorded response for this prompt.") from None
+
+    def _stream_model(self, prompt: str):
+        yield self._call_model(prompt)
+
+def generate_agent_prompt(agent_role_description: str, current_context: str, previous_insights: str = "",
+                          request_headline: bool = False) -> str:
     """
     Generates a structured prompt for an agent.
+    With `request_headline`, the answer must open with a severity-tagged headline (see parse_headline).
     """
     prompt = f"""
 You are a specialized AI agent: {agent_role_description}.
@@ -89,4 +385,6 @@ Your task is to analyze the provided information within a multi-agent system mon
 Provide your response in clear, concise text. Focus on actionable insights.
 Do not repeat the prompt. Start directly with your analysis.
 """
+    if request_headline:
+        prompt += HEADLINE_INSTRUCTION + "\n"
     return prompt
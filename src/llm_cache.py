@@ -0,0 +1,98 @@
+# src/llm_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapses whitespace so formatting-only differences map to the same cache entry."""
+    return " ".join(prompt.split())
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+def make_cache_key(model_name: str, generation_config: dict, prompt: str) -> str:
+    payload = json.dumps({
+        "model": model_name,
+        "config": generation_config,
+        "prompt": prompt_hash(prompt),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """Persistent prompt -> response cache in its own SQLite file.
+
+    Entries expire after `ttl_seconds`; above `max_entries` the least recently used ones are evicted.
+    """
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY,
+                                model TEXT,
+                                response TEXT,
+                                created_at REAL,
+                                last_access REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> str:
+        """Returns the cached response, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model_name: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, model_name, response, now, now))
+            self.stats["stores"] += 1
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def record_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def _evict_locked(self, now: float):
+        cur = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.stats["evictions"] += cur.rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            cur = self._conn.execute("DELETE FROM responses WHERE key IN "
+                                     "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                                     (count - self.max_entries,))
+            self.stats["evictions"] += cur.rowcount
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,214 @@
+# src/llm_scheduler.py
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config import (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES,
+                        LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS, LLM_CIRCUIT_FAILURE_THRESHOLD,
+                        LLM_CIRCUIT_RESET_SECONDS, LLM_ACQUIRE_TIMEOUT_SECONDS)
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    _RETRYABLE_API_ERRORS = (
+        google_exceptions.ResourceExhausted, # 429 / quota
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+    )
+except ImportError: # google-api-core ships with google-generativeai; other backends may not have it
+    _RETRYABLE_API_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+class LLMRequestError(Exception):
+    """Raised when an LLM request still fails after retries (or could not be scheduled in time)."""
+
+class CircuitOpenError(LLMRequestError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+def is_retryable(exc: Exception) -> bool:
+    return isinstance(exc, _RETRYABLE_API_ERRORS + (ConnectionError, TimeoutError))
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate_per_minute`, holding at most one minute's worth."""
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0, timeout: float = None) -> bool:
+        """Blocks until `amount` tokens are available. Returns False if that would take longer than `timeout`."""
+        amount = min(amount, self.capacity) # A single oversized request must still be able to go through
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill_locked()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate_per_second
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def refund(self, amount: float):
+        """Returns tokens reserved for work that never reached the API."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; after `reset_seconds` lets one trial call through."""
+    def __init__(self, failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = LLM_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_in_flight:
+                raise CircuitOpenError("LLM circuit breaker is open; skipping request.")
+            self._trial_in_flight = True # Half-open: only this call probes the API
+
+    def release_trial(self):
+        """Frees the half-open trial slot when the trial call did not tell whether the API recovered."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("LLM circuit breaker closed again.")
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_in_flight:
+                    logger.error(f"LLM circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class LLMRequestScheduler:
+    """Front door for all LLM calls: rate limits, bounded concurrency, retries and a circuit breaker.
+
+    Requests and tokens per minute are enforced with two token buckets, so parallel agents (or several
+    adapters sharing one scheduler) saturate the quota without tripping it. Callers block for at most
+    LLM_ACQUIRE_TIMEOUT_SECONDS waiting for capacity (backpressure) before LLMRequestError is raised.
+    """
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE, tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_retries: int = LLM_MAX_RETRIES,
+                 base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS, max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS,
+                 acquire_timeout: float = LLM_ACQUIRE_TIMEOUT_SECONDS, circuit_breaker: CircuitBreaker = None):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._concurrency = threading.BoundedSemaphore(max_concurrency)
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform(0, min(max_delay, base * 2^attempt))."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @contextmanager
+    def slot(self):
+        """Holds one concurrency slot for the duration of a (possibly streaming) request."""
+        if not self._concurrency.acquire(timeout=self.acquire_timeout):
+            self._count("rejected")
+            raise LLMRequestError("Timed out waiting for a free LLM concurrency slot.")
+        try:
+            yield
+        finally:
+            self._concurrency.release()
+
+    def _reserve_quota(self, estimated_tokens: int):
+        if not self.request_bucket.acquire(1, timeout=self.acquire_timeout):
+            self._count("rejected")
+            raise LLMRequestError("Timed out waiting for LLM request quota.")
+        if not self.token_bucket.acquire(estimated_tokens, timeout=self.acquire_timeout):
+            self.request_bucket.refund(1)
+            self._count("rejected")
+            raise LLMRequestError("Timed out waiting for LLM token quota.")
+
+    def call(self, fn, *args, estimated_tokens: int = 1, **kwargs):
+        """Calls `fn(*args, **kwargs)` under rate limits, retrying transient errors with jittered backoff.
+
+        Must be used inside `slot()` (see `run`). Non-retryable errors are raised immediately.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.circuit_breaker.before_call()
+            try:
+                self._reserve_quota(estimated_tokens)
+            except LLMRequestError:
+                self.circuit_breaker.release_trial()
+                raise
+            self._count("calls")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Neither an outage nor proof of recovery (e.g. invalid request): leave the breaker state
+                    # as is, only freeing a half-open trial slot so the next call can probe instead
+                    self.circuit_breaker.release_trial()
+                    self._count("failures")
+                    raise LLMRequestError(f"LLM request failed: {e}") from e
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    raise LLMRequestError(f"LLM request failed after {attempt + 1} attempt(s): {e}") from e
+                delay = self.backoff_delay(attempt)
+                self._count("retries")
+                logger.warning(f"Transient LLM error ({type(e).__name__}: {e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+    def run(self, fn, *args, estimated_tokens: int = 1, **kwargs):
+        """`call` inside a concurrency slot: the usual entry point for non-streaming requests."""
+        with self.slot():
+            return self.call(fn, *args, estimated_tokens=estimated_tokens, **kwargs)
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMRequestScheduler:
+    """Process-wide scheduler, so every adapter instance draws from the same quota."""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMRequestScheduler()
+        return _shared_scheduler
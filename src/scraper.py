@@ -1,16 +1,26 @@
 # src/scraper.py
 import logging
+import threading
 import time
-import requests
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 # from webdriver_manager.chrome import ChromeDriverManager # Option 1: Manage driver automatically
-from src.config import HEADLESS_BROWSER, SELENIUM_TIMEOUT, FRED_API_KEY
+from src.extraction import extract_main_text
+from src.telemetry import span
+from src.config import (HEADLESS_BROWSER, SELENIUM_TIMEOUT, FRED_API_KEY, FRED_API_BASE_URL, PAGE_READY_RULES,
+                        PAGE_READY_DEFAULT_RULE, EXTRACTION_MAX_CHARS)
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36" # Common user agent
+FRED_OBSERVATIONS_URL = f"{FRED_API_BASE_URL}/fred/series/observations"
+FRED_TIMEOUT = 10
+
 # Option 2: Specify chromedriver path if not using webdriver-manager
 # This is often better for Docker environments where you install it explicitly.
 # CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver" # Example path, adjust if needed
@@ -23,7 +33,7 @@ def get_selenium_driver():
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox') # Crucial for running in Docker/Linux as root
     options.add_argument('--disable-dev-shm-usage') # Overcomes limited resource problems
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36") # Common user agent
+    options.add_argument(f"user-agent={USER_AGENT}")
 
     try:
         # Option 1: Use webdriver-manager (uncomment import above)
@@ -43,16 +53,103 @@ def get_selenium_driver():
         # If using fixed path, ensure it's correct and executable.
         raise
 
-def get_page_content_selenium(url: str) -> str:
-    """Fetches page content using Selenium for JS-heavy sites."""
+LEGACY_FIXED_WAIT_SECONDS = 5 # The unconditional sleep readiness rules replaced; used to report time saved
+PAGE_READY_POLL_SECONDS = 0.25
+
+_page_ready_timings = {}
+_page_ready_lock = threading.Lock()
+
+def _record_page_ready(site_name: str, seconds: float, ready: bool):
+    with _page_ready_lock:
+        stats = _page_ready_timings.setdefault(site_name, {"count": 0, "timeouts": 0, "avg_seconds": 0.0})
+        stats["count"] += 1
+        if not ready:
+            stats["timeouts"] += 1
+        stats["last_seconds"] = round(seconds, 3)
+        stats["avg_seconds"] = round(stats["avg_seconds"] + (seconds - stats["avg_seconds"]) / stats["count"], 3)
+        stats["avg_saved_seconds"] = round(LEGACY_FIXED_WAIT_SECONDS - stats["avg_seconds"], 3)
+
+def get_page_ready_timings() -> dict:
+    """Returns measured time-to-ready per site: count, timeouts, last/avg seconds and avg seconds saved vs the old 5s sleep."""
+    with _page_ready_lock:
+        return {site: dict(stats) for site, stats in _page_ready_timings.items()}
+
+def _stable_value_condition(script: str, quiet_seconds: float):
+    """Builds a WebDriverWait condition that is true once the page is loaded and `script`'s value stops changing."""
+    state = {"value": None, "since": time.monotonic()}
+    def condition(driver):
+        if driver.execute_script("return document.readyState") != "complete":
+            return False
+        value = driver.execute_script(script)
+        now = time.monotonic()
+        if value != state["value"]:
+            state["value"], state["since"] = value, now
+            return False
+        return now - state["since"] >= quiet_seconds
+    return condition
+
+def wait_for_page_ready(driver, rule: dict) -> bool:
+    """Blocks until the page satisfies the readiness `rule` or its timeout expires. Returns False on timeout.
+
+    Rule types:
+    - "selector": a CSS `selector` is present in the DOM.
+    - "network_idle": no new resource requests for `quiet_seconds`.
+    - "dom_stable": element count and text length unchanged for `quiet_seconds`.
+    """
+    rule_type = rule.get("type", "dom_stable")
+    timeout = rule.get("timeout", SELENIUM_TIMEOUT)
+    quiet_seconds = rule.get("quiet_seconds", 1.0)
+    if rule_type == "selector":
+        condition = EC.presence_of_element_located((By.CSS_SELECTOR, rule["selector"]))
+    elif rule_type == "network_idle":
+        condition = _stable_value_condition("return performance.getEntriesByType('resource').length;", quiet_seconds)
+    elif rule_type == "dom_stable":
+        condition = _stable_value_condition(
+            "return [document.getElementsByTagName('*').length, document.body ? document.body.innerText.length : 0];",
+            quiet_seconds)
+    else:
+        raise ValueError(f"Unknown page readiness rule type: {rule_type}")
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=PAGE_READY_POLL_SECONDS).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+def _load_page_source(driver, url: str, site_name: str = None) -> str:
+    """Navigates an existing driver to `url`, waits for the site's readiness rule and returns the page source. Raises on failure."""
+    rule = PAGE_READY_RULES.get(site_name, PAGE_READY_DEFAULT_RULE)
+    driver.get(url)
+    started = time.monotonic()
+    ready = wait_for_page_ready(driver, rule)
+    elapsed = time.monotonic() - started
+    if ready:
+        logger.info(f"{site_name or url} ready after {elapsed:.2f}s ({rule.get('type')}).")
+    else:
+        # Keep whatever rendered so far; a partial page is still better than nothing
+        logger.warning(f"{site_name or url} not ready after {elapsed:.2f}s ({rule.get('type')} timeout); using current DOM.")
+    _record_page_ready(site_name or url, elapsed, ready)
+    return driver.page_source
+
+def get_page_content_selenium(url: str, driver_pool=None, site_name: str = None) -> str:
+    """Fetches page content using Selenium for JS-heavy sites.
+
+    If a `SeleniumDriverPool` is given, a warm driver is borrowed from it instead of starting a new browser.
+    `site_name` selects the readiness rule from config.PAGE_READY_RULES.
+    """
+    if driver_pool is not None:
+        try:
+            with driver_pool.lease() as driver:
+                page_source = _load_page_source(driver, url, site_name)
+            logger.info(f"Successfully fetched content from {url} using pooled Selenium driver.")
+            return page_source
+        except Exception as e:
+            logger.error(f"Error fetching page {url} with Selenium: {e}", exc_info=True)
+            return ""
+
     driver = None
     try:
         driver = get_selenium_driver()
-        driver.get(url)
-        # Wait for dynamic content to load. This is a generic wait.
-        # For specific sites like Toro, more sophisticated waits for specific elements are needed.
-        time.sleep(5) # Adjust as needed, or implement WebDriverWait
-        page_source = driver.page_source
+        page_source = _load_page_source(driver, url, site_name)
         logger.info(f"Successfully fetched content from {url} using Selenium.")
         return page_source
     except Exception as e:
@@ -62,55 +159,24 @@ def get_page_content_selenium(url: str) -> str:
         if driver:
             driver.quit()
 
-def get_page_content_requests(url: str) -> str:
-    """Fetches page content using requests for static sites."""
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=SELENIUM_TIMEOUT)
-        response.raise_for_status() # Raise an exception for HTTP errors
-        logger.info(f"Successfully fetched content from {url} using requests.")
-        return response.text
-    except requests.RequestException as e:
-        logger.error(f"Error fetching page {url} with requests: {e}", exc_info=True)
-        return ""
-
-def extract_text_from_html(html_content: str, max_length: int = 1500) -> str:
-    """Extracts clean text from HTML content."""
+def extract_text_from_html(html_content: str, max_length: int = EXTRACTION_MAX_CHARS, site_name: str = None) -> str:
+    """Extracts the main-content text of a page (see src/extraction.py)."""
     if not html_content:
         return ""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        # Remove script and style elements
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:max_length]
+        with span("extract", source=site_name or "unknown"):
+            return extract_main_text(html_content, site_name, max_length)
     except Exception as e:
         logger.warning(f"Could not parse HTML: {e}")
         return html_content[:max_length] # return raw snippet if parsing fails
 
 
-def fetch_fred_data(series_id: str = "FEDFUNDS") -> str:
-    """Fetches data from FRED API for a given series."""
-    if not FRED_API_KEY:
-        logger.warning("FRED_API_KEY not set. Skipping FRED data.")
-        return "FRED data not available (API key missing)."
-    try:
-        # Example: Get latest observation for Federal Funds Rate
-        url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json&sort_order=desc&limit=5"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        observations = data.get("observations", [])
-        if observations:
-            # Format for better readability by LLM
-            formatted_obs = [f"{obs['date']}: {obs['value']}" for obs in observations]
-            return f"Recent {series_id} observations: {'; '.join(formatted_obs)}"
-        logger.info(f"Fetched FRED data for {series_id}")
-        return f"No recent observations found for {series_id}."
-    except requests.RequestException as e:
-        logger.error(f"Error fetching FRED data for {series_id}: {e}", exc_info=True)
-        return f"Error fetching FRED data for {series_id}."
-    except Exception as e:
-        logger.error(f"Unexpected error processing FRED data for {series_id}: {e}", exc_info=True)
-        return f"Error processing FRED data for {series_id}."
+def build_fred_params(series_id: str, observation_start: str) -> dict:
+    """Query parameters for the observations of a FRED series from `observation_start` (YYYY-MM-DD) on."""
+    return {
+        "series_id": series_id,
+        "api_key": FRED_API_KEY,
+        "file_type": "json",
+        "sort_order": "asc",
+        "observation_start": observation_start,
+    }
@@ -0,0 +1,223 @@
+# src/source_scheduler.py
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from typing import NamedTuple
+
+from src.config import (MONITORED_SOURCES, FRED_SERIES, SOURCE_DEFAULT_REFRESH_SECONDS, SOURCE_REFRESH_SECONDS,
+                        SOURCE_REFRESH_JITTER, SOURCE_DEFAULT_DEADLINE_SECONDS, SOURCE_DEADLINE_SECONDS,
+                        SOURCE_RETRY_SECONDS, SNAPSHOT_MAX_AGE_SECONDS)
+from src.ingestion import FRED_CONTEXT_KEY, FAILED_FRED_PREFIXES, is_failed_source_text
+from src.utils import send_telegram_alert_async
+
+logger = logging.getLogger(__name__)
+
+FRED_KEY_PREFIX = "fred:"
+
+def fred_key(series_id: str) -> str:
+    return f"{FRED_KEY_PREFIX}{series_id}"
+
+def next_slot(anchor: float, interval: float, now: float) -> float:
+    """First point of the grid `anchor + k * interval` strictly after `now`. Missed slots are skipped
+    rather than replayed, and the grid never shifts by how long the work took (no drift)."""
+    if now < anchor:
+        return anchor
+    return anchor + (math.floor((now - anchor) / interval) + 1) * interval
+
+class Snapshot(NamedTuple):
+    text: str
+    fetched_at: float # time.time() of the fetch that produced `text`
+    ok: bool
+
+class SnapshotStore:
+    """Latest text of every source and FRED series. A failed fetch does not replace a good snapshot younger
+    than SNAPSHOT_MAX_AGE_SECONDS. `version` increases whenever some text actually changes, and readers
+    can block on it with `wait_for_change`.
+    """
+    def __init__(self, sources: list = None, fred_series: list = None):
+        self.sources = list(MONITORED_SOURCES if sources is None else sources)
+        self.fred_series = list(FRED_SERIES if fred_series is None else fred_series)
+        self._snapshots = {}
+        self._version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def keys(self) -> list:
+        return self.sources + [fred_key(series_id) for series_id in self.fred_series]
+
+    @property
+    def version(self) -> int:
+        with self._condition:
+            return self._version
+
+    def update(self, key: str, text: str, ok: bool) -> bool:
+        """Stores a fetch result; returns True if the served text changed."""
+        now = time.time()
+        with self._condition:
+            previous = self._snapshots.get(key)
+            if not ok and previous is not None and previous.ok and now - previous.fetched_at < SNAPSHOT_MAX_AGE_SECONDS:
+                logger.warning(f"Fetch of {key} failed; keeping the snapshot from {now - previous.fetched_at:.0f}s ago.")
+                return False
+            self._snapshots[key] = Snapshot(text, now, ok)
+            if previous is not None and previous.text == text:
+                return False
+            self._version += 1
+            self._condition.notify_all()
+            return True
+
+    def get(self, key: str) -> Snapshot:
+        with self._condition:
+            return self._snapshots.get(key)
+
+    def is_complete(self) -> bool:
+        with self._condition:
+            return all(key in self._snapshots for key in self.keys)
+
+    def wait_until_complete(self, timeout: float) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: all(key in self._snapshots for key in self.keys), timeout)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Blocks until `version` is outdated or `timeout` passes; returns the current version."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def source_texts(self) -> dict:
+        """Current snapshot in the shape of IntelligentMonitor.gather_source_texts (FRED series joined in one block)."""
+        with self._condition:
+            texts = {}
+            for site_name in self.sources:
+                snapshot = self._snapshots.get(site_name)
+                texts[site_name] = snapshot.text if snapshot else f"Failed to retrieve content from {site_name}."
+            fred_texts = []
+            for series_id in self.fred_series:
+                snapshot = self._snapshots.get(fred_key(series_id))
+                fred_texts.append(snapshot.text if snapshot else f"FRED data not available for {series_id} yet.")
+            texts[FRED_CONTEXT_KEY] = "\n".join(fred_texts)
+            return texts
+
+class SourceSchedule:
+    """Cadence of one source: runs sit on a fixed grid (anchor + k * interval) plus per-run jitter, so neither
+    fetch duration nor jitter accumulates. A failure schedules an early retry without moving the grid."""
+    def __init__(self, key: str, interval: float, deadline: float, jitter: float = SOURCE_REFRESH_JITTER,
+                 start: float = None):
+        self.key = key
+        self.interval = interval
+        self.deadline = deadline
+        self.jitter = jitter
+        self.anchor = time.monotonic() if start is None else start
+        self.slot = self.anchor # Grid point the next regular run belongs to
+        self.next_run = self.anchor # First fetch right away: analysis waits for a complete snapshot
+
+    def schedule_next(self, ok: bool, now: float = None) -> float:
+        now = time.monotonic() if now is None else now
+        if now >= self.slot - self.jitter * self.interval: # This run used up its slot (early retries do not)
+            self.slot = next_slot(self.anchor, self.interval, max(now, self.slot))
+        self.next_run = max(now, self.slot + random.uniform(-self.jitter, self.jitter) * self.interval)
+        if not ok:
+            self.next_run = min(self.next_run, now + SOURCE_RETRY_SECONDS)
+        return self.next_run
+
+class SourceScheduler:
+    """Keeps the SnapshotStore fresh: every web source and FRED series is fetched on its own cadence
+    (SOURCE_REFRESH_SECONDS) with its own deadline, on a background event loop sharing one HTTP session.
+    Slow or browser-bound sources never hold back the hot feeds.
+    """
+    def __init__(self, ingestor, store: SnapshotStore = None, sources: dict = None, fred_series: list = None):
+        self.ingestor = ingestor
+        self.sources = dict(MONITORED_SOURCES if sources is None else sources)
+        self.fred_series = list(FRED_SERIES if fred_series is None else fred_series)
+        self.store = store or SnapshotStore(list(self.sources), self.fred_series)
+        self.schedules = {
+            key: SourceSchedule(key, SOURCE_REFRESH_SECONDS.get(key, SOURCE_DEFAULT_REFRESH_SECONDS),
+                                SOURCE_DEADLINE_SECONDS.get(key, SOURCE_DEFAULT_DEADLINE_SECONDS))
+            for key in list(self.sources) + [fred_key(series_id) for series_id in self.fred_series]
+        }
+        self._thread = None
+        self._loop = None
+        self._stopping = None
+        self._session = None
+        self._pending_notifications = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        started = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main(started)), name="source-scheduler", daemon=True)
+        self._thread.start()
+        started.wait()
+        logger.info("Source scheduler started: " + ", ".join(f"{key} every {s.interval:g}s" for key, s in self.schedules.items()))
+
+    def stop(self, timeout: float = 10):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def notify(self, message: str):
+        """Sends a Telegram alert over the scheduler's session (queued until the loop is running)."""
+        with self._lock:
+            if self._loop is None or self._session is None:
+                self._pending_notifications.append(message)
+                return
+        asyncio.run_coroutine_threadsafe(send_telegram_alert_async(self._session, message), self._loop)
+
+    async def _main(self, started: threading.Event):
+        self._stopping = asyncio.Event()
+        async with self.ingestor.create_session() as session:
+            with self._lock:
+                self._loop = asyncio.get_running_loop()
+                self._session = session
+                notifications, self._pending_notifications = self._pending_notifications, []
+            started.set()
+            for message in notifications:
+                asyncio.create_task(send_telegram_alert_async(session, message))
+            tasks = [asyncio.create_task(self._run_source(session, schedule)) for schedule in self.schedules.values()]
+            await self._stopping.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            with self._lock:
+                self._session = None
+
+    async def _fetch(self, session, key: str) -> tuple[str, bool]:
+        if key.startswith(FRED_KEY_PREFIX):
+            text = await self.ingestor.fetch_fred(session, key[len(FRED_KEY_PREFIX):])
+            return text, not text.startswith(FAILED_FRED_PREFIXES)
+        _, text = await self.ingestor.fetch_source(session, key, self.sources[key])
+        return text, not is_failed_source_text(text)
+
+    async def _run_source(self, session, schedule: SourceSchedule):
+        while not self._stopping.is_set():
+            delay = schedule.next_run - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            started = time.monotonic()
+            try:
+                # A browser fetch that times out keeps its worker thread until Selenium gives up on its own
+                text, ok = await asyncio.wait_for(self._fetch(session, schedule.key), schedule.deadline)
+            except asyncio.TimeoutError:
+                logger.error(f"Fetch of {schedule.key} exceeded its {schedule.deadline:g}s deadline.")
+                text, ok = f"Error scraping {schedule.key}: deadline exceeded.", False
+            except Exception as e:
+                logger.error(f"Fetch of {schedule.key} failed: {e}", exc_info=True)
+                text, ok = f"Error scraping {schedule.key}.", False
+            changed = self.store.update(schedule.key, text, ok)
+            next_run = schedule.schedule_next(ok)
+            logger.info(f"Refreshed {schedule.key} in {time.monotonic() - started:.1f}s "
+                        f"({'changed' if changed else 'unchanged'}{'' if ok else ', failed'}); "
+                        f"next in {next_run - time.monotonic():.0f}s.")
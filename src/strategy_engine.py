@@ -1,10 +1,126 @@
 # src/strategy_engine.py
 import logging
+import re
+from typing import NamedTuple
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CAPITAL_FOR_ALERTS = 10000.0 # Capital padrão para alertas do Telegram
 
+DEFAULT_SHORT_ASSETS = ['PETR4.SA', 'VALE3.SA']
+DEFAULT_LONG_ASSETS = ['GOLD', 'AGRO3.SA']
+SHORT_ALLOC_RATIO = 0.30
+LONG_ALLOC_RATIO = 0.70
+
+# Tabela declarativa de regras. `keywords` é uma lista de grupos: a regra dispara quando TODOS os grupos
+# têm pelo menos uma palavra-chave presente no texto (minúsculo, busca por substring).
+STRATEGY_RULES = [
+    {"name": "inflation",
+     "keywords": [("inflation", "interest rates rising", "juros subindo")],
+     "long": ['USDBRL', 'IMA-B'], # Hedge contra desvalorização da moeda local; títulos atrelados à inflação
+     "short": []},
+    {"name": "recession",
+     "keywords": [("recession", "economic contraction", "contração econômica")],
+     "long": ['USD'], # Dólar como refúgio
+     "short": ['IBOV', 'SPY']}, # Short em índices amplos
+    {"name": "supply_chain",
+     "keywords": [("supply chain disruption", "quebra na cadeia")],
+     "long": ['COMMODITIES_INDEX_ETF'], # Placeholder para ETF de commodities
+     "short": []},
+    {"name": "tech_boom",
+     "keywords": [("tecnologia em alta", "tech boom")],
+     "long": ['QQQ'], # ETF de tecnologia (Nasdaq 100)
+     "short": []},
+    {"name": "emerging_markets",
+     "keywords": [("mercados emergentes",), ("oportunidade", "crescimento")],
+     "long": ['EEM'], # ETF de Mercados Emergentes
+     "short": []},
+]
+
+class StrategyMatrix(NamedTuple):
+    """Alocações de um lote de recomendações: linhas = recomendações, colunas = `assets` (ou `rule_names`)."""
+    assets: list
+    rule_names: list
+    long: np.ndarray # Capital alocado em cada ativo (compra)
+    short: np.ndarray # Capital alocado em cada ativo (venda)
+    rules_fired: np.ndarray # bool, quais regras dispararam
+
+class CompiledRules:
+    """Compila a tabela de regras em uma única regex (todas as palavras-chave) e em matrizes de incidência,
+    de modo que um lote inteiro é avaliado com uma varredura por texto e alguns produtos de matrizes."""
+    def __init__(self, rules: list = STRATEGY_RULES, default_long: list = DEFAULT_LONG_ASSETS,
+                 default_short: list = DEFAULT_SHORT_ASSETS):
+        self.rule_names = [rule["name"] for rule in rules]
+        keywords = sorted({kw for rule in rules for group in rule["keywords"] for kw in group}, key=lambda k: (-len(k), k))
+        self.keyword_index = {kw: i for i, kw in enumerate(keywords)}
+        # Lookahead: encontra palavras-chave sobrepostas, como o `in` original. Em cada posição só a mais longa
+        # é reportada, então uma palavra-chave que é prefixo de outra é implicada por ela.
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+        self.implied = [[self.keyword_index[other] for other in keywords if other != kw and kw.startswith(other)]
+                        for kw in keywords]
+
+        groups = [(r, group) for r, rule in enumerate(rules) for group in rule["keywords"]]
+        self.keyword_groups = np.zeros((len(keywords), len(groups)), dtype=np.int32) # palavra-chave -> grupo
+        self.group_rules = np.zeros((len(groups), len(rules)), dtype=np.int32) # grupo -> regra
+        for g, (r, group) in enumerate(groups):
+            self.group_rules[g, r] = 1
+            for kw in group:
+                self.keyword_groups[self.keyword_index[kw], g] = 1
+        self.groups_per_rule = self.group_rules.sum(axis=0)
+
+        self.assets = list(dict.fromkeys(default_long + default_short +
+                                         [a for rule in rules for a in rule["long"] + rule["short"]]))
+        asset_index = {asset: i for i, asset in enumerate(self.assets)}
+        self.rule_long = np.zeros((len(rules), len(self.assets)), dtype=np.int32)
+        self.rule_short = np.zeros((len(rules), len(self.assets)), dtype=np.int32)
+        for r, rule in enumerate(rules):
+            self.rule_long[r, [asset_index[a] for a in rule["long"]]] = 1
+            self.rule_short[r, [asset_index[a] for a in rule["short"]]] = 1
+        self.default_long = np.isin(self.assets, default_long)
+        self.default_short = np.isin(self.assets, default_short)
+
+    def keyword_hits(self, texts: list) -> np.ndarray:
+        hits = np.zeros((len(texts), len(self.keyword_index)), dtype=np.int32)
+        for row, text in enumerate(texts):
+            found = {self.keyword_index[match.group(1)] for match in self.pattern.finditer((text or "").lower())}
+            for i in list(found):
+                found.update(self.implied[i])
+            hits[row, list(found)] = 1
+        return hits
+
+    def evaluate(self, texts: list, capital=DEFAULT_CAPITAL_FOR_ALERTS) -> StrategyMatrix:
+        """Pontua `texts` de uma vez; `capital` pode ser um escalar ou um valor por recomendação."""
+        hits = self.keyword_hits(texts)
+        group_hit = (hits @ self.keyword_groups) > 0
+        fired = (group_hit.astype(np.int32) @ self.group_rules) == self.groups_per_rule
+
+        long_mask = ((fired.astype(np.int32) @ self.rule_long) > 0) | self.default_long
+        short_mask = ((fired.astype(np.int32) @ self.rule_short) > 0) | self.default_short
+        num_long = long_mask.sum(axis=1, keepdims=True)
+        num_short = short_mask.sum(axis=1, keepdims=True)
+
+        # Ajuste de alocação: se apenas um lado tiver ativos, aloca 100% para ele
+        long_ratio = np.where(num_short == 0, 1.0, np.where(num_long == 0, 0.0, LONG_ALLOC_RATIO))
+        short_ratio = np.where(num_long == 0, 1.0, np.where(num_short == 0, 0.0, SHORT_ALLOC_RATIO))
+        capital = np.asarray(capital, dtype=np.float64).reshape(-1, 1)
+        long_alloc = long_mask * (capital * long_ratio / np.maximum(num_long, 1))
+        short_alloc = short_mask * (capital * short_ratio / np.maximum(num_short, 1))
+        return StrategyMatrix(self.assets, self.rule_names, long_alloc, short_alloc, fired)
+
+_compiled_rules = None
+
+def get_compiled_rules() -> CompiledRules:
+    global _compiled_rules
+    if _compiled_rules is None:
+        _compiled_rules = CompiledRules()
+    return _compiled_rules
+
+def score_recommendations(recommendation_texts: list, capital=DEFAULT_CAPITAL_FOR_ALERTS) -> StrategyMatrix:
+    """API em lote: avalia milhares de recomendações históricas em matrizes de alocação NumPy."""
+    return get_compiled_rules().evaluate(list(recommendation_texts), capital)
+
 def generate_simulated_strategy(recommendation_text: str, capital_available: float = DEFAULT_CAPITAL_FOR_ALERTS):
     """
     Simula uma estratégia de alocação de ativos baseada em uma recomendação textual.
@@ -14,63 +130,15 @@ def generate_simulated_strategy(recommendation_text: str, capital_available: flo
         logger.warning("generate_simulated_strategy: Recommendation text is empty. Cannot generate strategy.")
         return {'short': {}, 'long': {}, 'message': "Nenhuma recomendação para basear a estratégia."}
 
-    short_assets = ['PETR4.SA', 'VALE3.SA'] # Default short
-    long_assets = ['GOLD', 'AGRO3.SA']    # Default long
-
-    lower_rec = recommendation_text.lower()
-    if "inflation" in lower_rec or "interest rates rising" in lower_rec or "juros subindo" in lower_rec:
-        long_assets.append('USDBRL') # Hedge contra desvalorização da moeda local
-        long_assets.append('IMA-B') # Títulos atrelados à inflação (exemplo Brasil)
-    if "recession" in lower_rec or "economic contraction" in lower_rec or "contração econômica" in lower_rec:
-        short_assets.extend(['IBOV', 'SPY']) # Short em índices amplos
-        long_assets.append('USD') # Dólar como refúgio
-    if "supply chain disruption" in lower_rec or "quebra na cadeia" in lower_rec:
-        # Isso é complexo, pode ser long em algumas commodities, short em outras
-        long_assets.append('COMMODITIES_INDEX_ETF') # Placeholder para ETF de commodities
-    if "tecnologia em alta" in lower_rec or "tech boom" in lower_rec:
-        long_assets.append('QQQ') # ETF de tecnologia (Nasdaq 100)
-    if "mercados emergentes" in lower_rec and ("oportunidade" in lower_rec or "crescimento" in lower_rec):
-        long_assets.append('EEM') # ETF de Mercados Emergentes
-
-    # Garante que as listas não fiquem vazias e sejam únicas
-    long_assets = list(set(long_assets))
-    short_assets = list(set(short_assets))
-
-    if not short_assets and not long_assets:
-        # Se nenhuma regra específica for acionada, estratégia neutra ou de erro
-        return {'short': {}, 'long': {}, 'message': "Nenhuma regra de estratégia acionada pela recomendação."}
-    
-    # Evita divisão por zero se uma das listas estiver vazia após as regras
-    num_short = len(short_assets) if short_assets else 1
-    num_long = len(long_assets) if long_assets else 1
-
-    # Ajuste de alocação: se apenas um lado tiver ativos, aloca 100% para ele
-    short_alloc_ratio = 0.30
-    long_alloc_ratio = 0.70
-
-    if not short_assets and long_assets:
-        short_alloc_ratio = 0.0
-        long_alloc_ratio = 1.0
-    elif short_assets and not long_assets:
-        short_alloc_ratio = 1.0
-        long_alloc_ratio = 0.0
-    elif not short_assets and not long_assets: # Deve ser pego pelo check anterior, mas por segurança
-        short_alloc_ratio = 0.0
-        long_alloc_ratio = 0.0
-
-
+    matrix = score_recommendations([recommendation_text], capital_available)
     allocation = {
-        'short': {},
-        'long': {},
-        'message': "Estratégia gerada."
+        'short': {asset: float(value) for asset, value in zip(matrix.assets, matrix.short[0]) if value > 0},
+        'long': {asset: float(value) for asset, value in zip(matrix.assets, matrix.long[0]) if value > 0},
+        'message': "Estratégia gerada.",
     }
-
-    if short_assets:
-        allocation['short'] = {asset: capital_available * short_alloc_ratio / num_short for asset in short_assets}
-    
-    if long_assets:
-        allocation['long'] = {asset: capital_available * long_alloc_ratio / num_long for asset in long_assets}
-        
+    if not allocation['short'] and not allocation['long']:
+        # Se nenhuma regra específica for acionada, estratégia neutra ou de erro
+        allocation['message'] = "Nenhuma regra de estratégia acionada pela recomendação."
     return allocation
 
 if __name__ == '__main__':
@@ -86,3 +154,7 @@ if __name__ == '__main__':
     rec3 = "Nada de muito novo no horizonte."
     strat3 = generate_simulated_strategy(rec3)
     print(f"Recomendação: {rec3}\nEstratégia: {strat3}\n")
+
+    batch = score_recommendations([rec1, rec2, rec3] * 1000)
+    print(f"Lote: {batch.long.shape[0]} recomendações x {len(batch.assets)} ativos; "
+          f"regras disparadas: {dict(zip(batch.rule_names, batch.rules_fired.sum(axis=0).tolist()))}")
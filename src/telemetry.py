@@ -0,0 +1,199 @@
+# src/telemetry.py
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "disaster_monitor"
+# Histogram buckets (seconds): from a cached extraction up to a slow browser render or LLM answer
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_active_cycle = contextvars.ContextVar("active_cycle", default=None)
+
+def span_key(name: str, labels: dict) -> str:
+    """Row name in the per-cycle timings, e.g. "scrape.static[marketwatch_news]"."""
+    return f"{name}[{','.join(str(v) for v in labels.values())}]" if labels else name
+
+class CycleRecorder:
+    """Span totals of one monitoring cycle (or fast-path analysis), persisted by database.store_cycle_timings."""
+    def __init__(self, cycle_id: str, kind: str):
+        self.cycle_id = cycle_id
+        self.kind = kind
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = {} # span key -> [count, total seconds, max seconds, prompt tokens, response tokens]
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> list:
+        return self.spans.setdefault(key, [0, 0.0, 0.0, 0, 0])
+
+    def add_span(self, key: str, seconds: float):
+        with self._lock:
+            entry = self._entry(key)
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def add_tokens(self, key: str, prompt_tokens: int, response_tokens: int):
+        with self._lock:
+            entry = self._entry(key)
+            entry[3] += prompt_tokens
+            entry[4] += response_tokens
+
+    def rows(self) -> list:
+        """[(span key, count, total seconds, max seconds, prompt tokens, response tokens)]"""
+        with self._lock:
+            return [(key, *entry) for key, entry in self.spans.items()]
+
+class Telemetry:
+    """In-process metrics: a latency histogram per span name and label set, plus counters and gauges.
+    Spans also add to the active CycleRecorder (a context variable, so it follows asyncio tasks and threads
+    started with a copied context)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {} # (name, labels) -> [bucket counts..., count, sum]
+        self._counters = {} # (name, labels) -> value
+        self._gauges = {}
+
+    def observe(self, name: str, seconds: float, **labels):
+        label_items = tuple(labels.items())
+        with self._lock:
+            histogram = self._histograms.get((name, label_items))
+            if histogram is None:
+                histogram = self._histograms[(name, label_items)] = [0] * (len(SPAN_BUCKETS) + 2)
+            for i, bound in enumerate(SPAN_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+        recorder = _active_cycle.get()
+        if recorder is not None:
+            recorder.add_span(span_key(name, labels), seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(labels.items()))] = value
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Times the block; exceptions are counted in <prefix>_span_errors_total and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("span_errors_total", span=name, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_llm_tokens(self, prompt_tokens: int, response_tokens: int, **labels):
+        self.inc("llm_prompt_tokens_total", prompt_tokens, **labels)
+        self.inc("llm_response_tokens_total", response_tokens, **labels)
+        recorder = _active_cycle.get()
+        if recorder is not None:
+            recorder.add_tokens(span_key("llm", labels), prompt_tokens, response_tokens)
+
+    @contextmanager
+    def cycle(self, cycle_id: str, kind: str = "regular"):
+        """Makes spans in this context (and contexts copied from it) count towards a CycleRecorder."""
+        recorder = CycleRecorder(cycle_id, kind)
+        token = _active_cycle.set(recorder)
+        start = time.perf_counter()
+        try:
+            yield recorder
+        finally:
+            recorder.duration = time.perf_counter() - start
+            _active_cycle.reset(token)
+            self.observe("cycle", recorder.duration, kind=kind)
+            recorder.add_span("cycle", recorder.duration)
+            self.set_gauge("last_cycle_seconds", recorder.duration, kind=kind)
+            self.set_gauge("last_cycle_timestamp_seconds", time.time(), kind=kind)
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        def fmt_labels(label_items, extra: tuple = ()) -> str:
+            items = list(label_items) + list(extra)
+            if not items:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        with self._lock:
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        lines = []
+        for metric_name in sorted({name for name, _ in histograms}):
+            full = f"{METRIC_PREFIX}_{metric_name.replace('.', '_')}_seconds"
+            lines += [f"# HELP {full} Duration of {metric_name} spans.", f"# TYPE {full} histogram"]
+            for (name, label_items), histogram in sorted(histograms.items()):
+                if name != metric_name:
+                    continue
+                for bound, count in zip(SPAN_BUCKETS, histogram):
+                    lines.append(f"{full}_bucket{fmt_labels(label_items, (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{full}_bucket{fmt_labels(label_items, (('le', '+Inf'),))} {histogram[-2]}")
+                lines.append(f"{full}_count{fmt_labels(label_items)} {histogram[-2]}")
+                lines.append(f"{full}_sum{fmt_labels(label_items)} {histogram[-1]:.6f}")
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for metric_name in sorted({name for name, _ in values}):
+                full = f"{METRIC_PREFIX}_{metric_name}"
+                lines.append(f"# TYPE {full} {kind}")
+                lines += [f"{full}{fmt_labels(label_items)} {value:g}"
+                          for (name, label_items), value in sorted(values.items()) if name == metric_name]
+        return "\n".join(lines) + "\n"
+
+_telemetry = Telemetry()
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+def span(name: str, **labels):
+    return _telemetry.span(name, **labels)
+
+def timed(name: str, **labels):
+    """Decorator form of span() for plain functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _telemetry.span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _telemetry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # Scrapes every few seconds would flood the log
+        logger.debug(f"/metrics request from {self.client_address[0]}")
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """Serves GET /metrics on a daemon thread; returns the server (call shutdown() to stop it), or None on failure."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start the metrics endpoint on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Prometheus metrics at http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,147 @@
+# src/timeseries.py
+import logging
+import os
+import threading
+
+import numpy as np
+
+from src.config import FRED_STORE_DIR, FRED_HISTORY_START, FRED_ZSCORE_WINDOW, FRED_PROMPT_RECENT_OBSERVATIONS
+
+logger = logging.getLogger(__name__)
+
+def parse_observations(data: dict) -> tuple[np.ndarray, np.ndarray]:
+    """FRED observations payload -> (dates as datetime64[D], values as float64 with NaN for missing ".")."""
+    observations = data.get("observations", [])
+    dates = np.array([obs["date"] for obs in observations], dtype="datetime64[D]")
+    raw = np.array([obs["value"] for obs in observations], dtype=object)
+    values = np.full(len(raw), np.nan)
+    present = raw != "."
+    values[present] = raw[present].astype(np.float64)
+    return dates, values
+
+def derived_metrics(dates: np.ndarray, values: np.ndarray, zscore_window: int = FRED_ZSCORE_WINDOW) -> dict:
+    """Vectorized per-observation metrics: change vs previous observation, year-over-year change and
+    the z-score of each value against the trailing `zscore_window` observations (itself included)."""
+    n = len(values)
+    delta = np.full(n, np.nan)
+    pct_change = np.full(n, np.nan)
+    if n > 1:
+        delta[1:] = values[1:] - values[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct_change[1:] = delta[1:] / values[:-1]
+
+    # YoY: compare with the latest observation at least one year older (works for any frequency)
+    year_ago = np.searchsorted(dates, dates - np.timedelta64(365, "D"), side="right") - 1
+    yoy = np.full(n, np.nan)
+    has_base = year_ago >= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy[has_base] = values[has_base] / values[year_ago[has_base]] - 1
+
+    # Rolling mean/std from cumulative sums (NaNs treated as absent)
+    filled = np.nan_to_num(values)
+    valid = (~np.isnan(values)).astype(np.float64)
+    csum = np.concatenate(([0.0], np.cumsum(filled)))
+    csum_sq = np.concatenate(([0.0], np.cumsum(filled * filled)))
+    ccount = np.concatenate(([0.0], np.cumsum(valid)))
+    end = np.arange(1, n + 1)
+    start = np.maximum(0, end - zscore_window)
+    count = ccount[end] - ccount[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (csum[end] - csum[start]) / count
+        var = (csum_sq[end] - csum_sq[start]) / count - mean * mean
+        std = np.sqrt(np.maximum(var, 0.0))
+        zscore = np.where((count >= 3) & (std > 0), (values - mean) / std, np.nan)
+    return {"delta": delta, "pct_change": pct_change, "yoy": yoy, "zscore": zscore}
+
+def _fmt_pct(value: float) -> str:
+    return "n/a" if np.isnan(value) else f"{value:+.2%}"
+
+class FredSeriesStore:
+    """Columnar local store of FRED series: one `<SERIES>.dates.npy` (datetime64[D]) and one
+    `<SERIES>.values.npy` (float64) per series, read through memory maps.
+
+    `sync_start` gives the observation_start for an incremental fetch (the last stored date, so the
+    newest point picks up revisions); `merge` folds fetched observations in and rewrites both files atomically.
+    """
+    def __init__(self, base_dir: str = FRED_STORE_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _paths(self, series_id: str) -> tuple[str, str]:
+        prefix = os.path.join(self.base_dir, series_id)
+        return f"{prefix}.dates.npy", f"{prefix}.values.npy"
+
+    def load(self, series_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """(dates, values) memory-mapped read-only; empty arrays for an unknown series."""
+        dates_path, values_path = self._paths(series_id)
+        if not os.path.exists(dates_path) or not os.path.exists(values_path):
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        return np.load(dates_path, mmap_mode="r"), np.load(values_path, mmap_mode="r")
+
+    def series_ids(self) -> list:
+        return sorted(name[:-len(".dates.npy")] for name in os.listdir(self.base_dir) if name.endswith(".dates.npy"))
+
+    def last_modified(self, series_id: str) -> float:
+        """Modification time of the series (0 if absent); a cheap cache key for readers."""
+        values_path = self._paths(series_id)[1]
+        return os.path.getmtime(values_path) if os.path.exists(values_path) else 0.0
+
+    def sync_start(self, series_id: str) -> str:
+        dates, _ = self.load(series_id)
+        return str(dates[-1]) if len(dates) else FRED_HISTORY_START
+
+    def merge(self, series_id: str, new_dates: np.ndarray, new_values: np.ndarray) -> int:
+        """Merges observations (new values win on equal dates); returns how many dates were not stored before."""
+        if not len(new_dates):
+            return 0
+        with self._lock:
+            dates, values = self.load(series_id)
+            all_dates = np.concatenate((new_dates, dates)) # New first, so np.unique keeps their values
+            all_values = np.concatenate((new_values, values))
+            merged_dates, first_index = np.unique(all_dates, return_index=True)
+            merged_values = all_values[first_index]
+            added = len(merged_dates) - len(dates)
+            if added == 0 and np.array_equal(merged_values, values, equal_nan=True):
+                return 0
+            del dates, values # Release the memory maps before replacing the files
+            for path, array in zip(self._paths(series_id), (merged_dates, merged_values)):
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp_path, path)
+        if added:
+            logger.info(f"FRED store: {added} new observation(s) for {series_id} (latest {merged_dates[-1]}).")
+        return added
+
+    def merge_payload(self, series_id: str, data: dict) -> int:
+        return self.merge(series_id, *parse_observations(data))
+
+    def metrics(self, series_id: str) -> dict:
+        dates, values = self.load(series_id)
+        return derived_metrics(np.asarray(dates), np.asarray(values))
+
+    def describe(self, series_id: str, recent: int = FRED_PROMPT_RECENT_OBSERVATIONS) -> str:
+        """Prompt text: the latest observations plus derived metrics of the newest one (missing values skipped)."""
+        dates, values = self.load(series_id)
+        present = ~np.isnan(values) # FRED publishes "." for missing observations
+        dates, values = np.asarray(dates)[present], np.asarray(values)[present]
+        if not len(dates):
+            return f"No recent observations found for {series_id}."
+        metrics = derived_metrics(dates, values)
+        latest = [f"{dates[i]}: {values[i]:g}" for i in range(len(dates) - 1, max(-1, len(dates) - 1 - recent), -1)]
+        zscore = metrics["zscore"][-1]
+        zscore_text = "n/a" if np.isnan(zscore) else f"{zscore:+.2f}"
+        return (f"Recent {series_id} observations: {'; '.join(latest)}. "
+                f"Latest vs previous: {_fmt_pct(metrics['pct_change'][-1])}; YoY: {_fmt_pct(metrics['yoy'][-1])}; "
+                f"z-score vs last {FRED_ZSCORE_WINDOW} obs: {zscore_text}.")
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_fred_store() -> FredSeriesStore:
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = FredSeriesStore()
+        return _shared_store
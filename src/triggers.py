@@ -0,0 +1,155 @@
+# src/triggers.py
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from src.config import (AGENT_ROLES, TRIGGER_RULES, TRIGGER_COOLDOWN_SECONDS, TRIGGER_MAX_EVENT_AGE_SECONDS)
+from src.feeds import SEVERITY_RANK, format_event, severity_rank
+from src.timeseries import get_fred_store
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_CONTEXT_KEY = "triggering_events" # Source name of the trigger block in fast-path prompts
+
+class TriggerMatch(NamedTuple):
+    rule: str
+    agents: list
+    key: str # Event id (or "<SERIES>@<date>" for FRED)
+    description: str # One line for the prompt and the alert
+
+def _event_age_seconds(event, now: float) -> float:
+    try:
+        return now - datetime.fromisoformat(event.time.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0 # Unknown time: treat as fresh
+
+def event_matches(rule: dict, event) -> bool:
+    """True if a FeedEvent satisfies every threshold of `rule` (cheap; no I/O)."""
+    if rule.get("kind") != event.kind:
+        return False
+    if "min_magnitude" in rule and (event.magnitude is None or event.magnitude < rule["min_magnitude"]):
+        return False
+    if "min_severity" in rule and severity_rank(event.severity) < SEVERITY_RANK[rule["min_severity"]]:
+        return False
+    return True
+
+def fred_matches(rule: dict, zscore: float, pct_change: float) -> bool:
+    if rule.get("kind") != "fred":
+        return False
+    if "min_abs_zscore" in rule and not (np.isfinite(zscore) and abs(zscore) >= rule["min_abs_zscore"]):
+        return False
+    if "min_abs_pct_change" in rule and not (np.isfinite(pct_change) and abs(pct_change) >= rule["min_abs_pct_change"]):
+        return False
+    return True
+
+def group_matches(matches: list) -> list:
+    """[(rule names, description)] with one entry per event, even if several rules matched it."""
+    grouped = {}
+    for match in matches:
+        rules, _ = grouped.setdefault(match.key, ([], match.description))
+        rules.append(match.rule)
+    return [(", ".join(rules), description) for rules, description in grouped.values()]
+
+def format_trigger_matches(matches: list) -> str:
+    events = group_matches(matches)
+    lines = [f"Fast-path analysis triggered by {len(events)} event(s):"]
+    lines += [f"- ({rules}) {description}" for rules, description in events]
+    return "\n".join(lines)
+
+class TriggerEngine:
+    """Always-on threshold stage between ingestion and the agents.
+
+    `on_events` / `on_fred_update` are called by the ingestor with newly ingested data and only evaluate
+    TRIGGER_RULES (no LLM, no network). Matches outside their rule's cooldown are queued and handed, coalesced,
+    to `run_analysis(agent_names, matches)` on a background thread, so ingestion never waits for the LLM.
+    """
+    def __init__(self, run_analysis, rules: list = TRIGGER_RULES, cooldown_seconds: float = TRIGGER_COOLDOWN_SECONDS,
+                 max_event_age_seconds: float = TRIGGER_MAX_EVENT_AGE_SECONDS):
+        self.run_analysis = run_analysis
+        self.rules = rules
+        self.cooldown_seconds = cooldown_seconds
+        self.max_event_age_seconds = max_event_age_seconds
+        self._last_fired = {} # rule name -> time.monotonic() of its last analysis
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def evaluate_events(self, events: list, now: float = None) -> list:
+        now = time.time() if now is None else now
+        matches = []
+        for event in events:
+            if _event_age_seconds(event, now) > self.max_event_age_seconds:
+                continue
+            for rule in self.rules:
+                if event_matches(rule, event):
+                    matches.append(TriggerMatch(rule["name"], rule["agents"], event.event_id, format_event(event)))
+        return matches
+
+    def evaluate_fred(self, series_id: str) -> list:
+        dates, values = get_fred_store().load(series_id)
+        present = ~np.isnan(values)
+        if present.sum() < 2:
+            return []
+        metrics = get_fred_store().metrics(series_id)
+        last = np.flatnonzero(present)[-1]
+        zscore, pct_change = metrics["zscore"][last], metrics["pct_change"][last]
+        description = (f"FRED {series_id} {dates[last]}: {values[last]:g} "
+                       f"(change {pct_change:+.2%}, z-score {zscore:+.2f})")
+        return [TriggerMatch(rule["name"], rule["agents"], f"{series_id}@{dates[last]}", description)
+                for rule in self.rules if fred_matches(rule, zscore, pct_change)]
+
+    def on_events(self, source: str, events: list):
+        self.submit(self.evaluate_events(events))
+
+    def on_fred_update(self, series_id: str):
+        self.submit(self.evaluate_fred(series_id))
+
+    def submit(self, matches: list):
+        """Queues matches whose rule is out of cooldown; the rest are dropped (logged)."""
+        if not matches:
+            return
+        now = time.monotonic()
+        rules = {rule["name"]: rule for rule in self.rules}
+        accepted = []
+        with self._condition:
+            for name in dict.fromkeys(match.rule for match in matches):
+                cooldown = rules.get(name, {}).get("cooldown_seconds", self.cooldown_seconds)
+                last = self._last_fired.get(name)
+                if last is not None and now - last < cooldown:
+                    logger.info(f"Trigger {name} matched but is cooling down ({cooldown - (now - last):.0f}s left).")
+                    continue
+                self._last_fired[name] = now
+                accepted += [match for match in matches if match.rule == name]
+            if not accepted:
+                return
+            self._pending.extend(accepted)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="trigger-analysis", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        logger.warning(f"Trigger(s) fired: {', '.join(dict.fromkeys(m.rule for m in accepted))} "
+                       f"({len(accepted)} event(s)); fast-path analysis queued.")
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopped)
+                if self._stopped:
+                    return
+                matches, self._pending = self._pending, [] # Coalesce everything queued meanwhile
+            wanted = {agent for match in matches for agent in match.agents}
+            agent_names = [name for name in AGENT_ROLES if name in wanted]
+            try:
+                self.run_analysis(agent_names, matches)
+            except Exception as e:
+                logger.error(f"Fast-path analysis failed: {e}", exc_info=True)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
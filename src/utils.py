@@ -1,24 +1,55 @@
 # src/utils.py
 import logging
+import aiohttp
 import requests
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_BASE_URL
+from src.telemetry import span
 
 logger = logging.getLogger(__name__)
 
-def send_telegram_alert(message: str):
-    """Sends an alert message via Telegram."""
+TELEGRAM_TIMEOUT = 10
+
+def telegram_is_configured() -> bool:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         logger.warning("Telegram Bot Token or Chat ID not set. Skipping notification.")
-        return
+        return False
+    return True
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+def build_telegram_request(message: str) -> tuple[str, dict]:
+    """Returns the (url, form payload) for a Telegram sendMessage call."""
+    url = f"{TELEGRAM_API_BASE_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "Markdown"}
+    return url, payload
+
+def send_telegram_alert(message: str):
+    """Sends an alert message via Telegram."""
+    if not telegram_is_configured():
+        return
+
+    url, payload = build_telegram_request(message)
     
     try:
-        response = requests.post(url, data=payload, timeout=10)
-        response.raise_for_status() # Raise an exception for HTTP errors
+        with span("alert", channel="telegram"):
+            response = requests.post(url, data=payload, timeout=TELEGRAM_TIMEOUT)
+            response.raise_for_status() # Raise an exception for HTTP errors
         logger.info("Telegram alert sent successfully.")
     except requests.RequestException as e:
         logger.error(f"Error sending Telegram message: {e}", exc_info=True)
     except Exception as e: # Catch any other unexpected errors
         logger.error(f"Unexpected error sending Telegram message: {e}", exc_info=True)
+
+
+async def send_telegram_alert_async(session, message: str):
+    """Sends an alert message via Telegram over a shared aiohttp session."""
+    if not telegram_is_configured():
+        return
+
+    url, payload = build_telegram_request(message)
+
+    try:
+        with span("alert", channel="telegram"):
+            async with session.post(url, data=payload, timeout=aiohttp.ClientTimeout(total=TELEGRAM_TIMEOUT)) as response:
+                response.raise_for_status()
+        logger.info("Telegram alert sent successfully.")
+    except Exception as e:
+        logger.error(f"Error sending Telegram message: {e}", exc_info=True)
@@ -0,0 +1,33 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'fixtures')
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# src.config validates credentials and creates the data directory at import: run offline, away from data/
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("DISASTER_MONITOR_DATA_DIR", tempfile.mkdtemp(prefix="disaster_monitor_tests_"))
+
+@pytest.fixture
+def feed_payload():
+    """Reads a file of fixtures/feeds as bytes."""
+    def read(name: str) -> bytes:
+        with open(os.path.join(FIXTURES_DIR, 'feeds', name), 'rb') as f:
+            return f.read()
+    return read
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh, migrated SQLite database for the test."""
+    from src import database
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    yield database
+    database.close_db()
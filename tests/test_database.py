@@ -0,0 +1,35 @@
+# tests/test_database.py
+import time
+
+import pytest
+
+def test_final_checkpoint_is_resumable_until_its_cycle_is_cleared(database):
+    database.checkpoint_agent_output("cycle-1", "seismologist", "Key Observations: ...", "hash-a")
+    assert database.load_final_checkpoint("seismologist", "hash-a") is None # Partial output is never resumed
+    database.checkpoint_agent_output("cycle-1", "seismologist", "Full analysis", "hash-a", is_final=True)
+    assert database.load_final_checkpoint("seismologist", "hash-a") == "Full analysis"
+    assert database.load_final_checkpoint("seismologist", "hash-b") is None # Different prompt
+    database.clear_agent_checkpoints("cycle-1")
+    assert database.load_final_checkpoint("seismologist", "hash-a") is None
+
+def test_clear_agent_checkpoints_prunes_old_cycles(database):
+    database.checkpoint_agent_output("old", "climatologist", "Old analysis", "hash-a", is_final=True)
+    database.checkpoint_agent_output("other", "climatologist", "Other analysis", "hash-b", is_final=True)
+    database.clear_agent_checkpoints("current", prune_before=time.time() + 5)
+    assert database.load_final_checkpoint("climatologist", "hash-a") is None
+    assert database.load_final_checkpoint("climatologist", "hash-b") is None
+    database.checkpoint_agent_output("recent", "climatologist", "Recent analysis", "hash-c", is_final=True)
+    database.clear_agent_checkpoints("current", prune_before=time.time() - 3600)
+    assert database.load_final_checkpoint("climatologist", "hash-c") == "Recent analysis"
+
+def test_nested_transaction_failure_rolls_back_only_its_own_writes(database):
+    with database.transaction() as conn:
+        scenario_id = database.store_scenario("Recommendation", {"seismologist": "Analysis"})
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                conn.execute("INSERT INTO seen_events (event_id, source, updated, seen_at) VALUES ('e', 's', '1', 0)")
+                raise RuntimeError("write failed")
+        assert conn.in_transaction # The batch goes on and commits once at the end
+    assert database.get_scenario(scenario_id)["recommendation"] == "Recommendation"
+    assert database.load_agent_outputs(scenario_id) == {"seismologist": "Analysis"}
+    assert database.load_seen_events(0) == {}
@@ -0,0 +1,42 @@
+# tests/test_driver_pool.py
+import time
+
+from src import driver_pool
+from src.driver_pool import SeleniumDriverPool
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+def test_idle_drivers_are_reaped_without_further_leases(monkeypatch):
+    drivers = []
+    monkeypatch.setattr(driver_pool, "get_selenium_driver", lambda: drivers.append(FakeDriver()) or drivers[-1])
+    pool = SeleniumDriverPool(max_size=2, idle_seconds=0.05, reap_interval=0.01)
+    try:
+        with pool.lease():
+            pass
+        assert pool.size == 1
+        deadline = time.monotonic() + 5
+        while pool.size and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.size == 0
+        assert drivers[0].quit_called
+    finally:
+        pool.close()
+
+def test_reap_idle_keeps_recently_used_drivers(monkeypatch):
+    monkeypatch.setattr(driver_pool, "get_selenium_driver", FakeDriver)
+    pool = SeleniumDriverPool(max_size=1, idle_seconds=3600)
+    try:
+        with pool.lease():
+            pass
+        assert pool.reap_idle() == 0
+        assert pool.size == 1
+    finally:
+        pool.close()
@@ -0,0 +1,64 @@
+# tests/test_feeds.py
+from src.feeds import EventDeduplicator, FeedEvent, filter_events, parse_feed
+
+def test_parse_usgs_geojson_skips_non_earthquakes(feed_payload):
+    events = list(parse_feed(feed_payload("usgs_2.5_day.geojson"), "usgs_geojson"))
+    assert len(events) == 6 # The quarry blast is skipped
+    taiwan = events[0]
+    assert taiwan.event_id == "us7000n7n8"
+    assert taiwan.kind == "earthquake"
+    assert taiwan.magnitude == 7.1
+    assert taiwan.depth_km == 34.8
+    assert taiwan.time == "2024-04-03T00:00:00Z"
+    assert taiwan.updated == "1712106000000"
+    assert taiwan.severity == "Extreme"
+    assert "tsunami info issued" in taiwan.details
+    kermadec = next(event for event in events if event.event_id == "us7000n7r9")
+    assert kermadec.severity == "Severe" # M 6.2, PAGER green
+
+def test_parse_cap_atom_keeps_actual_alerts_only(feed_payload):
+    events = list(parse_feed(feed_payload("nws_alerts_active.atom"), "cap_atom"))
+    assert [event.title for event in events] == ["Tornado Warning", "Flood Warning", "Wind Advisory"] # Test message skipped
+    tornado = events[0]
+    assert tornado.kind == "alert"
+    assert tornado.severity == "Extreme"
+    assert tornado.area == "Poinsett, AR; Mississippi, AR"
+    assert tornado.time == "2024-04-03T05:58:00Z" # Effective time, converted to UTC
+    assert "urgency Immediate" in tornado.details
+
+def test_parse_nhc_rss_yields_one_event_per_cyclone(feed_payload):
+    events = list(parse_feed(feed_payload("nhc_index_at.xml"), "nhc_rss"))
+    assert [event.event_id for event in events] == ["AL052024", "AL062024"]
+    ernesto, six = events
+    assert ernesto.title == "Hurricane Ernesto"
+    assert ernesto.wind_mph == 85.0
+    assert (ernesto.latitude, ernesto.longitude) == (21.6, -66.3)
+    assert ernesto.severity == "Severe" # Below category 3
+    assert six.severity == "Minor"
+
+def test_filter_events_drops_unknown_minor_and_small_quakes(feed_payload):
+    quakes = list(parse_feed(feed_payload("usgs_2.5_day.geojson"), "usgs_geojson"))
+    alerts = list(parse_feed(feed_payload("nws_alerts_active.atom"), "cap_atom"))
+    unknown_quake = quakes[0]._replace(event_id="unknown", magnitude=None, severity="Unknown")
+    minor_alert = alerts[0]._replace(event_id="minor", severity="Minor")
+    kept = [event.event_id for event in filter_events(quakes + alerts + [unknown_quake, minor_alert], min_magnitude=4.5,
+                                                       min_severity={"earthquake": "Minor", "alert": "Severe"})]
+    assert kept == ["us7000n7n8", "us7000n7p2", "us7000n7q5", "us7000n7r9", alerts[0].event_id, alerts[1].event_id]
+
+def test_filter_events_keeps_small_quakes_rated_severe():
+    quake = FeedEvent("small", "earthquake", "earthquake_usgs", "M 4.0 - Somewhere", "2024-04-02T20:00:00Z", "1",
+                      "Severe", magnitude=4.0)
+    assert list(filter_events([quake], min_magnitude=4.5, min_severity={})) == [quake]
+
+def test_deduplicator_reports_revised_events_again(database, feed_payload):
+    events = list(parse_feed(feed_payload("nhc_index_at.xml"), "nhc_rss"))
+    deduplicator = EventDeduplicator()
+    assert deduplicator.new_events(events) == events
+    assert deduplicator.new_events(events) == []
+    revised = events[0]._replace(updated="2024-08-14T18:00:00Z 2:00 PM AST Wed Aug 14") # New advisory
+    assert deduplicator.new_events([revised, events[1]]) == [revised]
+
+def test_deduplicator_remembers_events_across_restarts(database, feed_payload):
+    events = list(parse_feed(feed_payload("usgs_2.5_day.geojson"), "usgs_geojson"))
+    EventDeduplicator().new_events(events)
+    assert EventDeduplicator().new_events(events) == []
@@ -0,0 +1,48 @@
+# tests/test_triggers.py
+import queue
+from datetime import datetime
+
+import pytest
+
+from src.feeds import parse_feed
+from src.triggers import TriggerEngine, TriggerMatch
+
+RULES = [
+    {"name": "major_earthquake", "kind": "earthquake", "min_magnitude": 6.5, "agents": ["seismologist"]},
+    {"name": "hurricane_advisory", "kind": "cyclone", "min_severity": "Severe", "agents": ["climatologist"],
+     "cooldown_seconds": 0},
+]
+
+@pytest.fixture
+def engine():
+    analyses = queue.Queue()
+    engine = TriggerEngine(lambda agent_names, matches: analyses.put((agent_names, matches)), rules=RULES,
+                           cooldown_seconds=3600, max_event_age_seconds=3 * 3600)
+    engine.analyses = analyses
+    yield engine
+    engine.stop()
+
+def test_evaluate_events_matches_fresh_events_only(engine, feed_payload):
+    events = list(parse_feed(feed_payload("usgs_2.5_day.geojson"), "usgs_geojson"))
+    taiwan_time = datetime.fromisoformat("2024-04-03T00:00:00+00:00").timestamp()
+    matches = engine.evaluate_events(events, now=taiwan_time + 60)
+    assert [(match.rule, match.key) for match in matches] == [("major_earthquake", "us7000n7n8")]
+    assert engine.evaluate_events(events, now=taiwan_time + 4 * 3600) == [] # Too old to trigger
+
+def test_submit_drops_rules_in_cooldown(engine):
+    quake = TriggerMatch("major_earthquake", ["seismologist"], "us7000n7n8", "M 7.1 - Taiwan")
+    hurricane = TriggerMatch("hurricane_advisory", ["climatologist"], "AL052024", "Hurricane Ernesto")
+
+    engine.submit([quake])
+    agent_names, matches = engine.analyses.get(timeout=5)
+    assert agent_names == ["seismologist"]
+    assert matches == [quake]
+
+    engine.submit([quake, hurricane]) # major_earthquake is cooling down; hurricane_advisory has no cooldown
+    agent_names, matches = engine.analyses.get(timeout=5)
+    assert agent_names == ["climatologist"]
+    assert matches == [hurricane]
+
+    engine.submit([quake])
+    with pytest.raises(queue.Empty):
+        engine.analyses.get(timeout=0.2)